@@ -3,12 +3,25 @@ from bs4 import BeautifulSoup
 import json
 import re
 import argparse
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from backfill_log import BackfillLog, select_filings
+from columnar_export import export_filing_tables
+from filing_cells import KIND_NUMBER, KIND_PERCENT
+from filing_tables import tidy_multi_year_table
+from filing_index import get_filing_index
+from instrumentation import count, span
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from table_cache import DEFAULT_CACHE_DIR, TableCache, accession_from_url
+from text_index import collect_sections, index_filings
+
 CIK = '320193'  # Apple
 HEADERS = {'User-Agent': "apple-dashboard@example.com"}
-SEC_SUBMISSIONS_URL = f'https://data.sec.gov/submissions/CIK{int(CIK):010d}.json'
+
+log = get_logger('extract_10k_summary_tables')
 
 # --- Argument Parsing ---
 def get_arg_parser():
@@ -18,25 +31,21 @@ def get_arg_parser():
     group.add_argument('--last-n', type=int, default=5, help='Fetch last N 10-Ks (default 5)')
     parser.add_argument('--url', type=str, default=None, help='Specific SEC 10-K filing URL to process')
     parser.add_argument('--output', type=str, default='10k_summary_data.json', help='Output JSON file')
+    parser.add_argument('--cache-dir', type=str, default=str(DEFAULT_CACHE_DIR), help='Parsed-table cache directory')
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--no-cache', action='store_true', help='Always download and parse filings, bypassing the table cache')
+    cache_mode.add_argument('--retidy', action='store_true', help='Re-tidy every cached 10-K from the table cache (no network)')
+    parser.add_argument('--columnar', choices=['parquet', 'arrow'], help='Also export the tidy tables as a columnar dataset (requires pyarrow)')
+    parser.add_argument('--text-index', action='store_true', help='Also add MD&A and risk factor text of new filings to the full-text index')
+    parser.add_argument('--resume', action='store_true', help='Skip filings already completed in the backfill log (data/backfill/)')
+    parser.add_argument('--retry-failures', action='store_true', help='Only re-run the filings that failed in the backfill log')
+    add_logging_arguments(parser)
     return parser
 
 # --- SEC Filing Utilities ---
 def get_10k_filing_urls(count=None):
-    resp = requests.get(SEC_SUBMISSIONS_URL, headers=HEADERS)
-    resp.raise_for_status()
-    data = resp.json()
-    filings = data['filings']['recent']
-    urls = []
-    for i, form in enumerate(filings['form']):
-        if form == '10-K':
-            accession = filings['accessionNumber'][i].replace('-', '')
-            primary_doc = filings['primaryDocument'][i]
-            filing_date = filings['filingDate'][i]
-            doc_url = f'https://www.sec.gov/Archives/edgar/data/{int(CIK)}/{accession}/{primary_doc}'
-            urls.append({'url': doc_url, 'date': filing_date, 'accession': filings['accessionNumber'][i]})
-            if count and len(urls) >= count:
-                break
-    return urls
+    # Full history (recent + older shards), shared with the other extractors
+    return get_filing_index(CIK).filter('10-K', count)
 
 # --- Table Extraction ---
 def find_section_table(soup, section_title):
@@ -69,290 +78,146 @@ def extract_table_data(table):
             rows.append(row)
     return rows
 
-# Helper to find the first non-empty header row (with at least 2 columns)
-def find_header_row(table_data):
-    for i, row in enumerate(table_data):
-        if len(row) > 1 and any(str(cell).strip() for cell in row[1:]):
-            return i, row
-    return 0, table_data[0] if table_data else []
-
-def clean_number(val):
-    if isinstance(val, (int, float)):
-        return val
-    if not isinstance(val, str):
-        return None
-    # Remove $, commas, parentheses, and % signs
-    val = val.replace('$', '').replace(',', '').replace('(', '-').replace(')', '').replace('%', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
 def clean_label(label):
     # Remove trailing footnote markers like (1), (2), etc.
     return re.sub(r'\s*\([0-9]+\)$', '', label).strip()
 
-def find_year_value(row, year_cols, idx):
+def find_year_value(cells, r, year_cols, idx):
     col_idx, year = year_cols[idx]
     # Look for the value in the next cell after the year
     value_idx = col_idx + 1
-    if value_idx < len(row):
-        val = row[value_idx]
-        # Skip if it's just a '$' sign
-        if val == '$':
-            value_idx += 1
-            if value_idx < len(row):
-                val = row[value_idx]
-        return clean_number(val)
-    return None
+    # Skip if it's just a '$' sign
+    if cells.text(r, value_idx) == '$':
+        value_idx += 1
+    # Net sales are plain numbers; a '—' or a percent here is not an amount
+    return cells.value(r, value_idx, kinds=(KIND_NUMBER,))
 
-def find_percent_change(row, year_cols, idx):
+def find_percent_change(cells, r, year_cols, idx):
     col_idx, year = year_cols[idx]
     # Look for the percent change in the cell after the value
     change_idx = col_idx + 2
-    if change_idx < len(row):
-        val = row[change_idx]
-        # Handle cases where the percent sign is in a separate cell
-        if isinstance(val, str) and '%' in val:
-            return clean_number(val)
-        elif change_idx + 1 < len(row) and row[change_idx + 1] == '%':
-            return clean_number(val)
-    return None
-
-def is_year(val):
-    try:
-        year = int(str(val).strip())
-        return 2000 <= year <= 2100
-    except Exception:
-        return False
-
-def is_numeric(val):
-    if val is None:
-        return False
-    val = str(val).replace(',', '').replace('$', '').strip()
-    return re.match(r'^-?\d+(\.\d+)?$', val) is not None
-
-def is_percent(val):
-    if val is None:
-        return False
-    val = str(val).replace('%', '').replace('(', '-').replace(')', '').strip()
-    return re.match(r'^-?\d+(\.\d+)?$', val) is not None
-
-def clean_numeric(val):
-    if val is None:
-        return None
-    val = str(val).replace(',', '').replace('$', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
-def clean_percent(val):
-    if val is None:
-        return None
-    val = str(val).replace('%', '').replace('(', '-').replace(')', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
-def get_year_col_map(header):
-    # Returns a list of dicts: [{'year': 2023, 'year_idx': i, 'change_idx': j}, ...]
-    year_col_map = []
-    for i, col in enumerate(header):
-        if is_year(col):
-            year = int(col)
-            # Find the next 'Change' column after the year
-            change_idx = None
-            for j in range(i+1, len(header)):
-                if isinstance(header[j], str) and 'change' in header[j].lower():
-                    change_idx = j
-                    break
-                if is_year(header[j]):
-                    break
-            year_col_map.append({'year': year, 'year_idx': i, 'change_idx': change_idx})
-    return year_col_map
-
-def find_valid_numeric(row, start_idx):
-    # Find the next valid numeric value in the row after start_idx
-    for i in range(start_idx+1, len(row)):
-        val = row[i]
-        if is_numeric(val):
-            return i, clean_numeric(val)
-    return None, None
-
-def find_valid_percent(row, change_idx):
-    if change_idx is not None and change_idx < len(row):
-        val = row[change_idx]
-        if is_percent(val):
-            return clean_percent(val)
+    if cells.kind(r, change_idx) == KIND_PERCENT:
+        return cells.value(r, change_idx)
+    # Handle cases where the percent sign is in a separate cell
+    if cells.text(r, change_idx + 1) == '%':
+        return cells.value(r, change_idx, kinds=(KIND_NUMBER,))
     return None
 
 def tidy_products_services_table(table_data):
-    if not table_data or len(table_data) < 2:
-        return []
-    
-    # Find header row with years
-    header_idx, header = find_header_row(table_data)
-    year_cols = [(i, int(col)) for i, col in enumerate(header) if is_year(col)]
-    
-    tidy_rows = []
-    products = set()
-    
-    # First pass: collect all product names
-    for row in table_data[header_idx+1:]:
-        if not row or not isinstance(row[0], str):
-            continue
-        label = clean_label(row[0].strip())
-        if not label:
-            continue
-        if label.lower().startswith('total'):
-            products.add(('total', label))
-        else:
-            products.add(('product', label))
-    
-    # Second pass: extract data for each product
-    for row_type, label in products:
-        for idx, (col_idx, year) in enumerate(year_cols):
-            found_row = None
-            for row in table_data[header_idx+1:]:
-                if not row or not isinstance(row[0], str):
-                    continue
-                if clean_label(row[0].strip()) == label:
-                    found_row = row
-                    break
-            
-            if found_row:
-                net_sales = find_year_value(found_row, year_cols, idx)
-                percent_change = find_percent_change(found_row, year_cols, idx)
-                
-                # Only create record if we have net sales data
-                if net_sales is not None:
-                    record = {
-                        "type": row_type,
-                        "product": label,
-                        "year": year,
-                        "net_sales": net_sales
-                    }
-                    
-                    if percent_change is not None:
-                        record["percent_change"] = percent_change
-                    
-                    # Add previous year data if available
-                    if idx + 1 < len(year_cols):
-                        prev_year = year_cols[idx + 1][1]
-                        prev_net_sales = find_year_value(found_row, year_cols, idx + 1)
-                        if prev_net_sales is not None:
-                            record.update({
-                                "previous_year": prev_year,
-                                "previous_year_net_sales": prev_net_sales
-                            })
-                    
-                    tidy_rows.append(record)
-    
-    return tidy_rows
+    return tidy_multi_year_table(
+        table_data, 'product', 'product', clean_label, find_year_value,
+        change_fn=find_percent_change, include_previous=True
+    )
 
 def tidy_segment_operating_table(table_data):
-    if not table_data or len(table_data) < 2:
-        return []
-    
-    # Find header row with years
-    header_idx, header = find_header_row(table_data)
-    year_cols = [(i, int(col)) for i, col in enumerate(header) if is_year(col)]
-    
-    tidy_rows = []
-    regions = set()
-    
-    # First pass: collect all region names
-    for row in table_data[header_idx+1:]:
-        if not row or not isinstance(row[0], str):
-            continue
-        label = clean_label(row[0].strip())
-        if not label:
-            continue
-        if label.lower().startswith('total'):
-            regions.add(('total', label))
-        else:
-            regions.add(('region', label))
-    
-    # Second pass: extract data for each region
-    for row_type, label in regions:
-        for idx, (col_idx, year) in enumerate(year_cols):
-            found_row = None
-            for row in table_data[header_idx+1:]:
-                if not row or not isinstance(row[0], str):
-                    continue
-                if clean_label(row[0].strip()) == label:
-                    found_row = row
-                    break
-            
-            if found_row:
-                net_sales = find_year_value(found_row, year_cols, idx)
-                percent_change = find_percent_change(found_row, year_cols, idx)
-                
-                # Only create record if we have net sales data
-                if net_sales is not None:
-                    record = {
-                        "type": row_type,
-                        "region": label,
-                        "year": year,
-                        "net_sales": net_sales
-                    }
-                    
-                    if percent_change is not None:
-                        record["percent_change"] = percent_change
-                    
-                    # Add previous year data if available
-                    if idx + 1 < len(year_cols):
-                        prev_year = year_cols[idx + 1][1]
-                        prev_net_sales = find_year_value(found_row, year_cols, idx + 1)
-                        if prev_net_sales is not None:
-                            record.update({
-                                "previous_year": prev_year,
-                                "previous_year_net_sales": prev_net_sales
-                            })
-                    
-                    tidy_rows.append(record)
-    
-    return tidy_rows
+    return tidy_multi_year_table(
+        table_data, 'region', 'region', clean_label, find_year_value,
+        change_fn=find_percent_change, include_previous=True
+    )
 
 # --- Main Extraction Logic ---
-def extract_10k_summary(url):
-    resp = requests.get(url, headers=HEADERS)
+# Tables cached per accession: spec -> section title to search for
+TABLE_SPECS = {
+    '10-K:products_and_services': 'Products and Services Performance',
+    '10-K:segment_operating': 'Segment Operating Performance',
+}
+
+def fetch_filing_html(url):
+    with span('fetch', url=url):
+        resp = requests.get(url, headers=HEADERS)
     resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, 'lxml')
-    prod_table = find_section_table(soup, 'Products and Services Performance')
-    prod_data = tidy_products_services_table(extract_table_data(prod_table)) if prod_table else []
-    seg_table = find_section_table(soup, 'Segment Operating Performance')
-    seg_data = tidy_segment_operating_table(extract_table_data(seg_table)) if seg_table else []
+    count('bytes_fetched', len(resp.content), source='10-K')
+    return resp.text
+
+def parse_filing_tables(html):
+    with span('parse', form='10-K'):
+        soup = BeautifulSoup(html, 'lxml')
+        tables = {}
+        for spec, section_title in TABLE_SPECS.items():
+            table = find_section_table(soup, section_title)
+            tables[spec] = extract_table_data(table) if table else None
+    return tables
+
+def load_filing_tables(url, accession=None, date=None, cache=None, on_html=None):
+    # on_html(url, html) sees every filing that is downloaded (not cache hits)
+    accession = accession or accession_from_url(url)
+    tables = cache.get_tables(accession, TABLE_SPECS) if cache else None
+    if tables is None:
+        html = fetch_filing_html(url)
+        if on_html:
+            on_html(url, html)
+        tables = parse_filing_tables(html)
+        if cache:
+            cache.put_tables(accession, tables, form='10-K', url=url, date=date)
+    return tables
+
+def tidy_10k_tables(url, tables):
+    prod_rows = tables.get('10-K:products_and_services')
+    seg_rows = tables.get('10-K:segment_operating')
+    prod_data = tidy_products_services_table(prod_rows) if prod_rows else []
+    seg_data = tidy_segment_operating_table(seg_rows) if seg_rows else []
     return {'url': url, 'products_and_services': prod_data, 'segment_operating': seg_data}
 
+def extract_10k_summary(url, accession=None, date=None, cache=None, on_html=None):
+    return tidy_10k_tables(url, load_filing_tables(url, accession, date, cache, on_html))
+
 # --- Main Entrypoint ---
 def main():
     parser = get_arg_parser()
     args = parser.parse_args()
-    filings = []
-    if args.url:
+    configure_from_args(args)
+    cache = None if args.no_cache else TableCache(args.cache_dir)
+    results = []
+    if args.retidy:
+        # Re-run tidy logic over every cached 10-K without downloading anything
+        for entry in cache.entries(form='10-K'):
+            summary = tidy_10k_tables(entry.get('url'), entry['tables'])
+            summary['date'] = entry.get('date')
+            summary['accession'] = entry['accession']
+            results.append(summary)
+        if not results:
+            # Never replace the committed output with an empty list (data/table_cache/ is not in git)
+            parser.error(f"No cached 10-K tables in {args.cache_dir}; run without --retidy to download them first")
+        filings = []
+    elif args.retry_failures:
+        filings = []  # taken from the failure ledger below
+    elif args.url:
         filings = [{'url': args.url}]
     elif args.all:
         filings = get_10k_filing_urls()
     else:
         filings = get_10k_filing_urls(count=args.last_n)
-    results = []
+    # Every filing is checkpointed as it finishes, so a killed backfill can --resume
+    backfill = None if args.retidy else BackfillLog.for_output(args.output)
+    if backfill is not None:
+        filings = select_filings(backfill, filings, args.resume, args.retry_failures)
+    # Narrative sections of the filings downloaded below, so --text-index need not fetch them again
+    prefetched = {}
+    on_html = collect_sections(prefetched) if args.text_index else None
     for filing in filings:
-        print(f"Extracting: {filing['url']}")
+        log.info('Extracting: %s', filing['url'])
         try:
-            summary = extract_10k_summary(filing['url'])
+            summary = extract_10k_summary(filing['url'], filing.get('accession'), filing.get('date'), cache, on_html)
             summary['date'] = filing.get('date')
             summary['accession'] = filing.get('accession')
-            results.append(summary)
+            backfill.record_success(filing, summary)
         except Exception as e:
-            print(f"Error extracting {filing['url']}: {e}")
+            log.error('Error extracting %s: %s', filing['url'], e)
+            backfill.record_failure(filing, e)
+    if backfill is not None:
+        results = backfill.results()
+        failures = backfill.failures()
+        if failures:
+            log.warning('%d filings failed; run again with --retry-failures to retry only those', len(failures))
     # Write output
     out_path = Path(__file__).parent / args.output
     with open(out_path, 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Saved {len(results)} filings to {out_path}")
+    if args.columnar:
+        print(f"Columnar tables saved to {export_filing_tables(results, '10-K', file_format=args.columnar)}")
+    if args.text_index:
+        print(f"Indexed narrative text of {index_filings(results, '10-K', prefetched=prefetched)} new filings")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
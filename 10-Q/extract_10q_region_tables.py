@@ -1,38 +1,49 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import logging
 import re
 import argparse
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from columnar_export import export_filing_tables
+from filing_cells import KIND_NUMBER, normalize_table
+from filing_tables import columns_to_records, concat_columns, new_columns, tidy_multi_year_table
+from filing_index import get_filing_index
+from instrumentation import count, span
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from table_cache import DEFAULT_CACHE_DIR, TableCache, accession_from_url
+
 # Example usage:
 # Single filing: python3 extract_10q_region_tables.py --url <10-Q-url> --output <output-file>
 # Batch mode (latest N filings): python3 extract_10q_region_tables.py --last-n 8 --output <output-file>
 
 HEADERS = {'User-Agent': "apple-dashboard@example.com"}
 CIK = '320193'  # Apple
-SEC_SUBMISSIONS_URL = f'https://data.sec.gov/submissions/CIK{int(CIK):010d}.json'
+
+log = get_logger('extract_10q_region_tables')
 
 # --- Table Extraction ---
 def find_section_table(soup, section_title):
     header_tags = soup.find_all(['b', 'strong', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div'], string=True)
-    print('[DEBUG] All section headers:')
-    for tag in header_tags:
-        print('  -', tag.get_text(strip=True))
+    debug = log.isEnabledFor(logging.DEBUG)
+    if debug:
+        log.debug('All section headers: %s', [tag.get_text(strip=True) for tag in header_tags])
     for tag in header_tags:
         if section_title.lower() in tag.get_text(strip=True).lower():
-            print(f'[DEBUG] Matched section header: {tag.get_text(strip=True)}')
+            log.debug('Matched section header: %s', tag.get_text(strip=True))
             next_table = tag.find_next('table')
             if next_table:
-                print('[DEBUG] Found table after header. First 3 rows:')
-                rows = []
-                for i, tr in enumerate(next_table.find_all('tr')):
-                    if i >= 3:
-                        break
-                    row = [td.get_text(separator=' ', strip=True) for td in tr.find_all(['td', 'th'], recursive=False)]
-                    print('   ', row)
+                if debug:
+                    rows = [
+                        [td.get_text(separator=' ', strip=True) for td in tr.find_all(['td', 'th'], recursive=False)]
+                        for tr in next_table.find_all('tr', limit=3)
+                    ]
+                    log.debug('Found table after header. First 3 rows: %s', rows)
                 return next_table
-    print('[DEBUG] No matching section header found for:', section_title)
+    log.debug('No matching section header found for: %s', section_title)
     return None
 
 def extract_table_data(table):
@@ -51,102 +62,32 @@ def extract_table_data(table):
             rows.append(row)
     return rows
 
-def clean_number(val):
-    if isinstance(val, (int, float)):
-        return val
-    if not isinstance(val, str):
-        return None
-    val = val.replace('$', '').replace(',', '').replace('(', '-').replace(')', '').replace('%', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
 def clean_label(label):
     return re.sub(r'\s*\([0-9]+\)$', '', label).strip()
 
-def is_year(val):
-    try:
-        year = int(str(val).strip())
-        return 2000 <= year <= 2100
-    except Exception:
-        return False
-
-def is_numeric(val):
-    if val is None:
-        return False
-    val = str(val).replace(',', '').replace('$', '').strip()
-    return re.match(r'^-?\d+(\.\d+)?$', val) is not None
-
-def find_header_row(table_data):
-    for i, row in enumerate(table_data):
-        if len(row) > 1 and any(str(cell).strip() for cell in row[1:]):
-            return i, row
-    return 0, table_data[0] if table_data else []
+def find_year_value(cells, r, year_cols, idx):
+    col_idx, year = year_cols[idx]
+    value_idx = col_idx + 1
+    if cells.text(r, value_idx) == '$':
+        value_idx += 1
+    return cells.value(r, value_idx, kinds=(KIND_NUMBER,))
 
 def tidy_segment_operating_table(table_data):
-    if not table_data or len(table_data) < 2:
-        return []
-    header_idx, header = find_header_row(table_data)
-    year_cols = [(i, int(col)) for i, col in enumerate(header) if is_year(col)]
-    tidy_rows = []
-    regions = set()
-    # First pass: collect all region names
-    for row in table_data[header_idx+1:]:
-        if not row or not isinstance(row[0], str):
-            continue
-        label = clean_label(row[0].strip())
-        if not label:
-            continue
-        if label.lower().startswith('total'):
-            regions.add(('total', label))
-        else:
-            regions.add(('region', label))
-    # Second pass: extract data for each region
-    for row_type, label in regions:
-        for idx, (col_idx, year) in enumerate(year_cols):
-            found_row = None
-            for row in table_data[header_idx+1:]:
-                if not row or not isinstance(row[0], str):
-                    continue
-                if clean_label(row[0].strip()) == label:
-                    found_row = row
-                    break
-            if found_row:
-                net_sales = None
-                if col_idx + 1 < len(found_row):
-                    val = found_row[col_idx + 1]
-                    if val == '$' and col_idx + 2 < len(found_row):
-                        val = found_row[col_idx + 2]
-                        net_sales = clean_number(val)
-                    else:
-                        net_sales = clean_number(val)
-                if net_sales is not None:
-                    record = {
-                        "type": row_type,
-                        "region": label,
-                        "year": year,
-                        "net_sales": net_sales
-                    }
-                    tidy_rows.append(record)
-    return tidy_rows
+    return tidy_multi_year_table(table_data, 'region', 'region', clean_label, find_year_value)
 
-# New function to extract region data from the actual table structure
+REGIONS = ['Americas', 'Europe', 'Greater China', 'Japan', 'Rest of Asia Pacific', 'Total net sales']
+REGION_FIELDS = ('type', 'region', 'period', 'net_sales', 'percent_change')
+DATE_REGEX = re.compile(r'(\w+ \d{1,2}, \d{4})')
 
-def extract_region_data_from_table(table_data):
-    # Find the header row with region names
-    header_row_idx = None
-    for i, row in enumerate(table_data):
-        if any('Americas' in cell for cell in row):
-            header_row_idx = i
-            break
-    if header_row_idx is None:
-        print('[DEBUG] No region header row found.')
-        return []
-    header_row = table_data[header_row_idx]
-    # The period row is usually 2 rows above the region row
-    period_type_row = table_data[header_row_idx-2] if header_row_idx >= 2 else table_data[0]
-    date_row = table_data[header_row_idx-1] if header_row_idx >= 1 else table_data[0]
+def build_region_column_map(header_row, period_type_row, date_row):
+    """
+    Map each data column to (period, comparison_period) once per table.
+
+    comparison_period is only set for 'Change' columns: it is the date of the
+    nearest column to the left with the same period type, so a change column
+    reads e.g. 'Three Months Ended Change March 30, 2024'. Change columns
+    with no such column are left out, as they were never emitted.
+    """
     # Build a map of column index to period label (e.g., 'Three Months Ended March 29, 2025')
     col_period_map = {}
     col_period_type_map = {}
@@ -163,114 +104,177 @@ def extract_region_data_from_table(table_data):
         elif date:
             col_period_map[idx] = date
             col_period_type_map[idx] = ''
-    # Now extract region rows
-    regions = ['Americas', 'Europe', 'Greater China', 'Japan', 'Rest of Asia Pacific', 'Total net sales']
-    region_data = []
-    date_regex = re.compile(r'(\w+ \d{1,2}, \d{4})')
-    for row in table_data[header_row_idx:]:
+    column_map = {}
+    # Latest dated column seen so far for each period type, filled left to right
+    last_dated = {}
+    for idx in sorted(col_period_map):
+        if idx == 0:
+            continue
+        period = col_period_map[idx]
+        period_type = col_period_type_map[idx]
+        if 'change' in period.lower():
+            if period_type in last_dated:
+                column_map[idx] = (period, last_dated[period_type])
+        else:
+            column_map[idx] = (period, None)
+        date_match = DATE_REGEX.search(period)
+        if date_match:
+            last_dated[period_type] = date_match.group(1)
+    return column_map
+
+def extract_region_columns(table_data, **constants):
+    """
+    Extract region net sales and percent changes as columns.
+
+    Returns {field: [values...]} for REGION_FIELDS plus one column per keyword
+    in `constants` (e.g. accession=...), so results from many filings can be
+    merged with filing_tables.concat_columns.
+    """
+    columns = new_columns(REGION_FIELDS + tuple(constants))
+    # Find the header row with region names
+    header_row_idx = None
+    for i, row in enumerate(table_data):
+        if any('Americas' in cell for cell in row):
+            header_row_idx = i
+            break
+    if header_row_idx is None:
+        log.debug('No region header row found.')
+        return columns
+    header_row = table_data[header_row_idx]
+    # The period row is usually 2 rows above the region row
+    period_type_row = table_data[header_row_idx-2] if header_row_idx >= 2 else table_data[0]
+    date_row = table_data[header_row_idx-1] if header_row_idx >= 1 else table_data[0]
+    column_map = build_region_column_map(header_row, period_type_row, date_row)
+    cells = normalize_table(table_data)
+    seen = set()
+    for r in range(header_row_idx, len(table_data)):
+        row = table_data[r]
         if not row or not isinstance(row[0], str):
             continue
         region = row[0].strip()
-        if region not in regions:
+        if region not in REGIONS:
             continue
         row_type = 'total' if region == 'Total net sales' else 'region'
-        for idx, val in enumerate(row):
-            if idx == 0:
+        for idx, (period, comparison_period) in column_map.items():
+            num_val = cells.value(r, idx)
+            # Only include valid, non-duplicate, non-spurious values
+            if num_val is None or num_val == 0 or (isinstance(num_val, float) and abs(num_val) < 1e-6):
                 continue
-            period = col_period_map.get(idx)
-            period_type = col_period_type_map.get(idx, '')
-            if not period:
+            if comparison_period:
+                period = f"{period} {comparison_period}"
+            key = (region, period)
+            if key in seen:
                 continue
-            num_val = clean_number(val)
-            # Only include valid, non-duplicate, non-spurious values
-            if num_val is not None and num_val != 0 and not (isinstance(num_val, float) and abs(num_val) < 1e-6):
-                # For 'Change' columns, append the last period label to the left that has the same period type and contains a date
-                if 'change' in period.lower():
-                    prev_date = ''
-                    prev_idx = idx - 1
-                    while prev_idx > 0:
-                        prev_period = col_period_map.get(prev_idx, '')
-                        prev_period_type = col_period_type_map.get(prev_idx, '')
-                        prev_date_match = date_regex.search(prev_period)
-                        # Only match if period type matches and prev_period has a date
-                        if prev_period_type == period_type and prev_date_match:
-                            prev_date = prev_date_match.group(1)
-                            break
-                        prev_idx -= 1
-                    unique_period = period
-                    if prev_date:
-                        unique_period = f"{period} {prev_date}"
-                    if prev_date and not any(d['region'] == region and d['period'] == unique_period for d in region_data):
-                        region_data.append({
-                            'type': row_type,
-                            'region': region,
-                            'period': unique_period,
-                            'percent_change': num_val
-                        })
-                else:
-                    if not any(d['region'] == region and d['period'] == period for d in region_data):
-                        region_data.append({
-                            'type': row_type,
-                            'region': region,
-                            'period': period,
-                            'net_sales': num_val
-                        })
-    return region_data
+            seen.add(key)
+            columns['type'].append(row_type)
+            columns['region'].append(region)
+            columns['period'].append(period)
+            columns['net_sales'].append(None if comparison_period else num_val)
+            columns['percent_change'].append(num_val if comparison_period else None)
+            for field, value in constants.items():
+                columns[field].append(value)
+    return columns
+
+def region_results(filing_tables):
+    """
+    Build the per-filing output from [(filing, table_data), ...].
+
+    Every filing's columns are tagged with its position, merged into one
+    column set and turned into records in a single pass; filings whose table
+    cannot be tidied are reported and left out.
+    """
+    column_sets = []
+    results = {}
+    for i, (filing, table_data) in enumerate(filing_tables):
+        try:
+            column_sets.append(extract_region_columns(table_data, filing=i))
+        except Exception as e:
+            log.error('Error extracting %s: %s', filing['url'], e)
+            continue
+        results[i] = {
+            'url': filing['url'],
+            'date': filing.get('date'),
+            'accession': filing.get('accession'),
+            'region_operating': [],
+        }
+    for record in columns_to_records(concat_columns(column_sets)):
+        results[record.pop('filing')]['region_operating'].append(record)
+    return list(results.values())
 
 def get_10q_filing_urls(count=None):
-    resp = requests.get(SEC_SUBMISSIONS_URL, headers=HEADERS)
-    resp.raise_for_status()
-    data = resp.json()
-    filings = data['filings']['recent']
-    urls = []
-    for i, form in enumerate(filings['form']):
-        if form == '10-Q':
-            accession = filings['accessionNumber'][i].replace('-', '')
-            primary_doc = filings['primaryDocument'][i]
-            filing_date = filings['filingDate'][i]
-            doc_url = f'https://www.sec.gov/Archives/edgar/data/{int(CIK)}/{accession}/{primary_doc}'
-            urls.append({'url': doc_url, 'date': filing_date, 'accession': filings['accessionNumber'][i]})
-            if count and len(urls) >= count:
-                break
-    return urls
+    # Full history (recent + older shards), shared with the other extractors
+    return get_filing_index(CIK).filter('10-Q', count)
+
+REGION_TABLE_SPEC = '10-Q:region_segment'
+REGION_SECTION_TITLE = 'The following table shows net sales by reportable segment'
+
+def region_table_from_soup(soup):
+    table = find_section_table(soup, REGION_SECTION_TITLE)
+    return extract_table_data(table) if table else None
+
+def load_region_table(url, accession=None, date=None, cache=None):
+    accession = accession or accession_from_url(url)
+    tables = cache.get_tables(accession, [REGION_TABLE_SPEC]) if cache else None
+    if tables is None:
+        with span('fetch', url=url):
+            resp = requests.get(url, headers=HEADERS)
+        resp.raise_for_status()
+        count('bytes_fetched', len(resp.content), source='10-Q')
+        with span('parse', form='10-Q region'):
+            tables = {REGION_TABLE_SPEC: region_table_from_soup(BeautifulSoup(resp.text, 'lxml'))}
+        if cache:
+            cache.put_tables(accession, tables, form='10-Q', url=url, date=date)
+    return tables[REGION_TABLE_SPEC]
 
 def main():
     parser = argparse.ArgumentParser(description="Apple 10-Q Region Table Extractor")
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('--url', type=str, help='SEC 10-Q filing URL to process')
     group.add_argument('--last-n', type=int, help='Fetch and process the latest N 10-Q filings')
+    group.add_argument('--retidy', action='store_true', help='Re-tidy every cached 10-Q from the table cache (no network)')
     parser.add_argument('--output', type=str, default='10q_region_data.json', help='Output JSON file')
+    parser.add_argument('--cache-dir', type=str, default=str(DEFAULT_CACHE_DIR), help='Parsed-table cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='Always download and parse filings, bypassing the table cache')
+    parser.add_argument('--columnar', choices=['parquet', 'arrow'], help='Also export the tidy tables as a columnar dataset (requires pyarrow)')
+    add_logging_arguments(parser)
     args = parser.parse_args()
+    configure_from_args(args)
+    if args.retidy and args.no_cache:
+        parser.error('argument --no-cache: not allowed with argument --retidy')
+    cache = None if args.no_cache else TableCache(args.cache_dir)
     filings = []
     if args.url:
         filings = [{'url': args.url}]
     elif args.last_n:
         filings = get_10q_filing_urls(count=args.last_n)
-    results = []
+    elif args.retidy:
+        filings = [
+            {'url': entry.get('url'), 'date': entry.get('date'), 'accession': entry['accession']}
+            for entry in cache.entries(form='10-Q')
+            if REGION_TABLE_SPEC in entry['tables']
+        ]
+        if not filings:
+            # Never replace the committed output with an empty list (data/table_cache/ is not in git)
+            parser.error(f"No cached 10-Q region tables in {args.cache_dir}; run without --retidy to download them first")
+    filing_tables = []
     for filing in filings:
-        print(f"Extracting: {filing['url']}")
+        log.info('Extracting: %s', filing['url'])
         try:
-            resp = requests.get(filing['url'], headers=HEADERS)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, 'lxml')
-            table = find_section_table(soup, 'The following table shows net sales by reportable segment')
-            if not table:
-                print(f"No region table found for {filing['url']}")
-                continue
-            table_data = extract_table_data(table)
-            region_data = extract_region_data_from_table(table_data)
-            results.append({
-                'url': filing['url'],
-                'date': filing.get('date'),
-                'accession': filing.get('accession'),
-                'region_operating': region_data
-            })
+            table_data = load_region_table(filing['url'], filing.get('accession'), filing.get('date'), cache)
         except Exception as e:
-            print(f"Error extracting {filing['url']}: {e}")
+            log.error('Error extracting %s: %s', filing['url'], e)
+            continue
+        if table_data is None:
+            log.warning('No region table found for %s', filing['url'])
+            continue
+        filing_tables.append((filing, table_data))
+    results = region_results(filing_tables)
     out_path = Path(__file__).parent / args.output
     with open(out_path, 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Saved {len(results)} filings to {out_path}")
+    if args.columnar:
+        print(f"Columnar tables saved to {export_filing_tables(results, '10-Q', file_format=args.columnar)}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -1,11 +1,23 @@
 import requests
 from bs4 import BeautifulSoup
 import json
+import logging
 import re
 import argparse
+import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
+from backfill_log import BackfillLog, select_filings
+from columnar_export import export_filing_tables
+from filing_cells import KIND_NUMBER, normalize_table
+from filing_index import get_filing_index
+from instrumentation import count, span
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from table_cache import DEFAULT_CACHE_DIR, TableCache, accession_from_url
+from text_index import collect_sections, index_filings
+
 # Example usage:
 # Single filing: python3 extract_10q_summary_tables.py --url <10-Q-url> --output <output-file>
 # Batch mode (latest N filings): python3 extract_10q_summary_tables.py --last-n 8 --output <output-file>
@@ -13,7 +25,8 @@ from pathlib import Path
 
 CIK = '320193'  # Apple
 HEADERS = {'User-Agent': "apple-dashboard@example.com"}
-SEC_SUBMISSIONS_URL = f'https://data.sec.gov/submissions/CIK{int(CIK):010d}.json'
+
+log = get_logger('extract_10q_summary_tables')
 
 # --- Argument Parsing ---
 def get_arg_parser():
@@ -23,25 +36,21 @@ def get_arg_parser():
     group.add_argument('--last-n', type=int, default=5, help='Fetch last N 10-Qs (default 5)')
     parser.add_argument('--url', type=str, default=None, help='Specific SEC 10-Q filing URL to process')
     parser.add_argument('--output', type=str, default='10q_summary_data.json', help='Output JSON file')
+    parser.add_argument('--cache-dir', type=str, default=str(DEFAULT_CACHE_DIR), help='Parsed-table cache directory')
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--no-cache', action='store_true', help='Always download and parse filings, bypassing the table cache')
+    cache_mode.add_argument('--retidy', action='store_true', help='Re-tidy every cached 10-Q from the table cache (no network)')
+    parser.add_argument('--columnar', choices=['parquet', 'arrow'], help='Also export the tidy tables as a columnar dataset (requires pyarrow)')
+    parser.add_argument('--text-index', action='store_true', help='Also add MD&A and risk factor text of new filings to the full-text index')
+    parser.add_argument('--resume', action='store_true', help='Skip filings already completed in the backfill log (data/backfill/)')
+    parser.add_argument('--retry-failures', action='store_true', help='Only re-run the filings that failed in the backfill log')
+    add_logging_arguments(parser)
     return parser
 
 # --- SEC Filing Utilities ---
 def get_10q_filing_urls(count=None):
-    resp = requests.get(SEC_SUBMISSIONS_URL, headers=HEADERS)
-    resp.raise_for_status()
-    data = resp.json()
-    filings = data['filings']['recent']
-    urls = []
-    for i, form in enumerate(filings['form']):
-        if form == '10-Q':
-            accession = filings['accessionNumber'][i].replace('-', '')
-            primary_doc = filings['primaryDocument'][i]
-            filing_date = filings['filingDate'][i]
-            doc_url = f'https://www.sec.gov/Archives/edgar/data/{int(CIK)}/{accession}/{primary_doc}'
-            urls.append({'url': doc_url, 'date': filing_date, 'accession': filings['accessionNumber'][i]})
-            if count and len(urls) >= count:
-                break
-    return urls
+    # Full history (recent + older shards), shared with the other extractors
+    return get_filing_index(CIK).filter('10-Q', count)
 
 # --- Table Extraction ---
 def find_section_table(soup, keywords):
@@ -77,25 +86,6 @@ def extract_table_data(table):
             rows.append(row)
     return rows
 
-# Helper to find the first non-empty header row (with at least 2 columns)
-def find_header_row(table_data):
-    for i, row in enumerate(table_data):
-        if len(row) > 1 and any(str(cell).strip() for cell in row[1:]):
-            return i, row
-    return 0, table_data[0] if table_data else []
-
-def clean_number(val):
-    if isinstance(val, (int, float)):
-        return val
-    if not isinstance(val, str):
-        return None
-    # Remove $, commas, parentheses, and % signs
-    val = val.replace('$', '').replace(',', '').replace('(', '-').replace(')', '').replace('%', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
 def clean_label(label):
     # Remove trailing footnote markers like (1), (2), etc. and trailing colons
     label = re.sub(r'[:\s]*$', '', re.sub(r'\s*\([0-9]+\)$', '', label)).strip()
@@ -104,107 +94,7 @@ def clean_label(label):
     label = re.sub(r'\s+', ' ', label)  # Collapse multiple spaces
     return label.strip().lower()
 
-def find_year_value(row, year_cols, idx):
-    col_idx, year = year_cols[idx]
-    # Look for the value in the next cell after the year
-    value_idx = col_idx + 1
-    if value_idx < len(row):
-        val = row[value_idx]
-        # Skip if it's just a '$' sign
-        if val == '$':
-            value_idx += 1
-            if value_idx < len(row):
-                val = row[value_idx]
-        return clean_number(val)
-    return None
-
-def find_percent_change(row, year_cols, idx):
-    col_idx, year = year_cols[idx]
-    # Look for the percent change in the cell after the value
-    change_idx = col_idx + 2
-    if change_idx < len(row):
-        val = row[change_idx]
-        # Handle cases where the percent sign is in a separate cell
-        if isinstance(val, str) and '%' in val:
-            return clean_number(val)
-        elif change_idx + 1 < len(row) and row[change_idx + 1] == '%':
-            return clean_number(val)
-    return None
-
-def is_year(val):
-    try:
-        year = int(str(val).strip())
-        return 2000 <= year <= 2100
-    except Exception:
-        return False
-
-def is_numeric(val):
-    if val is None:
-        return False
-    val = str(val).replace(',', '').replace('$', '').strip()
-    return re.match(r'^-?\d+(\.\d+)?$', val) is not None
-
-def is_percent(val):
-    if val is None:
-        return False
-    val = str(val).replace('%', '').replace('(', '-').replace(')', '').strip()
-    return re.match(r'^-?\d+(\.\d+)?$', val) is not None
-
-def clean_numeric(val):
-    if val is None:
-        return None
-    val = str(val).replace(',', '').replace('$', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
-def clean_percent(val):
-    if val is None:
-        return None
-    val = str(val).replace('%', '').replace('(', '-').replace(')', '').strip()
-    try:
-        return float(val)
-    except Exception:
-        return None
-
-def get_year_col_map(header):
-    # Returns a list of dicts: [{'year': 2023, 'year_idx': i, 'change_idx': j}, ...]
-    year_col_map = []
-    for i, col in enumerate(header):
-        if is_year(col):
-            year = int(col)
-            # Find the next 'Change' column after the year
-            change_idx = None
-            for j in range(i+1, len(header)):
-                if isinstance(header[j], str) and 'change' in header[j].lower():
-                    change_idx = j
-                    break
-                if is_year(header[j]):
-                    break
-            year_col_map.append({'year': year, 'year_idx': i, 'change_idx': change_idx})
-    return year_col_map
-
-def find_valid_numeric(row, start_idx):
-    # Find the next valid numeric value in the row after start_idx
-    for i in range(start_idx+1, len(row)):
-        val = row[i]
-        if is_numeric(val):
-            return i, clean_numeric(val)
-    return None, None
-
-def find_valid_percent(row, change_idx):
-    if change_idx is not None and change_idx < len(row):
-        val = row[change_idx]
-        if is_percent(val):
-            return clean_percent(val)
-    return None
-
 def tidy_products_services_table(table_data):
-    # Debug: print the full table_data for investigation
-    print('[DEBUG] Full revenue table_data:')
-    for row in table_data:
-        print(row)
     if not table_data or len(table_data) < 3:
         return []
     # Find the header rows: period type and date
@@ -236,17 +126,19 @@ def tidy_products_services_table(table_data):
     if len(period_labels) < max_row_len:
         period_labels += [period_labels[-1]] * (max_row_len - len(period_labels))
     # Extract product rows
+    cells = normalize_table(table_data)
     products = []
-    for row in table_data[date_row_idx + 1:]:
+    for r in range(date_row_idx + 1, len(table_data)):
+        row = table_data[r]
         if not row or not row[0]:
             continue
         product = row[0].strip()
         if not product or product.lower() == "total net sales":
             continue
         # Extract numeric values and their column indices
-        for i, cell in enumerate(row):
-            if cell and cell.replace(",", "").replace("$", "").strip().replace(".", "").isdigit():
-                value = float(cell.replace(",", "").replace("$", ""))
+        for i in range(len(row)):
+            value = cells.value(r, i, kinds=(KIND_NUMBER,))
+            if value is not None and value >= 0:
                 period = period_labels[i] if i < len(period_labels) else ''
                 if period:
                     products.append({
@@ -295,35 +187,36 @@ def tidy_segment_operating_table(table_data):
         "japan",
         "rest of asia pacific"
     ]
+    cells = normalize_table(table_data)
     tidy_rows = []
     current_region = None
-    for row in table_data[date_row_idx+1:]:
-        print('[DEBUG] Row:', row)
+    for r in range(date_row_idx + 1, len(table_data)):
+        row = table_data[r]
+        log.debug('Segment row: %s', row)
         if not row or not isinstance(row[0], str):
             continue
         label = clean_label(row[0].strip())
-        print('[DEBUG] Cleaned label:', label)
+        log.debug('Cleaned label: %s', label)
         if not label:
             continue
         # Check for region header
         if any(region in label for region in valid_regions):
             current_region = row[0].strip()
-            print('[DEBUG] Set current_region:', current_region)
+            log.debug('Set current_region: %s', current_region)
             continue
         # Only extract 'Net sales' sub-rows for regions
         if current_region and label == "net sales":
-            print('[DEBUG] Extracting net sales for region:', current_region)
-            for i, val in enumerate(row):
-                if is_numeric(val):
+            log.debug('Extracting net sales for region: %s', current_region)
+            for i in range(len(row)):
+                num = cells.value(r, i, kinds=(KIND_NUMBER,))
+                if num is not None:
                     period = period_labels[i] if i < len(period_labels) else ''
-                    num = clean_number(val)
-                    if num is not None:
-                        tidy_rows.append({
-                            "type": "region",
-                            "region": current_region,
-                            "period": period,
-                            "net_sales": num
-                        })
+                    tidy_rows.append({
+                        "type": "region",
+                        "region": current_region,
+                        "period": period,
+                        "net_sales": num
+                    })
     return tidy_rows
 
 def find_relevant_tables(soup, keywords):
@@ -340,57 +233,123 @@ def find_relevant_tables(soup, keywords):
     return relevant_tables
 
 # --- Main Extraction Logic ---
-def extract_10q_summary(url):
-    resp = requests.get(url, headers=HEADERS)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, 'lxml')
-    revenue_tables = find_relevant_tables(soup, ['disaggregated net sales', 'net sales', 'revenue'])
-    segment_tables = find_relevant_tables(soup, [
+# Tables cached per accession: spec -> section keywords passed to find_relevant_tables
+TABLE_SPECS = {
+    '10-Q:revenue': ['disaggregated net sales', 'net sales', 'revenue'],
+    '10-Q:segment': [
         'segment information and geographic data',
         'segment',
         'geographic',
         'operating performance'
-    ])
+    ],
+}
+
+def fetch_filing_html(url):
+    with span('fetch', url=url):
+        resp = requests.get(url, headers=HEADERS)
+    resp.raise_for_status()
+    count('bytes_fetched', len(resp.content), source='10-Q')
+    return resp.text
+
+def parse_filing_html(html):
+    with span('parse', form='10-Q'):
+        return BeautifulSoup(html, 'lxml')
+
+def tables_from_soup(soup):
+    tables = {}
+    for spec, keywords in TABLE_SPECS.items():
+        relevant_tables = find_relevant_tables(soup, keywords)
+        tables[spec] = extract_table_data(relevant_tables[0]) if relevant_tables else None
+    return tables
+
+def load_filing_tables(url, accession=None, date=None, cache=None, on_html=None):
+    # on_html(url, html) sees every filing that is downloaded (not cache hits)
+    accession = accession or accession_from_url(url)
+    tables = cache.get_tables(accession, TABLE_SPECS) if cache else None
+    if tables is None:
+        html = fetch_filing_html(url)
+        if on_html:
+            on_html(url, html)
+        tables = tables_from_soup(parse_filing_html(html))
+        if cache:
+            cache.put_tables(accession, tables, form='10-Q', url=url, date=date)
+    return tables
+
+def tidy_10q_tables(url, tables):
     prod_data = []
     seg_data = []
-    if revenue_tables:
-        revenue_rows = extract_table_data(revenue_tables[0])
-        print("[DEBUG] Revenue table rows:")
-        for row in revenue_rows:
-            print(row)
+    revenue_rows = tables.get('10-Q:revenue')
+    segment_rows = tables.get('10-Q:segment')
+    if revenue_rows is not None:
+        log.debug('%s: revenue table rows %s', url, revenue_rows)
         prod_data = tidy_products_services_table(revenue_rows)
-    if segment_tables:
-        segment_rows = extract_table_data(segment_tables[0])
-        print("[DEBUG] Segment table rows:", segment_rows)
+    if segment_rows is not None:
+        log.debug('%s: segment table rows %s', url, segment_rows)
         seg_data = tidy_segment_operating_table(segment_rows)
     return {'url': url, 'products_and_services': prod_data, 'segment_operating': seg_data}
 
+def extract_10q_summary(url, accession=None, date=None, cache=None, on_html=None):
+    return tidy_10q_tables(url, load_filing_tables(url, accession, date, cache, on_html))
+
 # --- Main Entrypoint ---
 def main():
     parser = get_arg_parser()
     args = parser.parse_args()
-    filings = []
-    if args.url:
+    configure_from_args(args)
+    cache = None if args.no_cache else TableCache(args.cache_dir)
+    results = []
+    if args.retidy:
+        # Re-run tidy logic over every cached 10-Q without downloading anything
+        for entry in cache.entries(form='10-Q'):
+            if not all(spec in entry['tables'] for spec in TABLE_SPECS):
+                continue
+            summary = tidy_10q_tables(entry.get('url'), entry['tables'])
+            summary['date'] = entry.get('date')
+            summary['accession'] = entry['accession']
+            results.append(summary)
+        if not results:
+            # Never replace the committed output with an empty list (data/table_cache/ is not in git)
+            parser.error(f"No cached 10-Q tables in {args.cache_dir}; run without --retidy to download them first")
+        filings = []
+    elif args.retry_failures:
+        filings = []  # taken from the failure ledger below
+    elif args.url:
         filings = [{'url': args.url}]
     elif args.all:
         filings = get_10q_filing_urls()
     else:
         filings = get_10q_filing_urls(count=args.last_n)
-    results = []
+    # Every filing is checkpointed as it finishes, so a killed backfill can --resume
+    backfill = None if args.retidy else BackfillLog.for_output(args.output)
+    if backfill is not None:
+        filings = select_filings(backfill, filings, args.resume, args.retry_failures)
+    # Narrative sections of the filings downloaded below, so --text-index need not fetch them again
+    prefetched = {}
+    on_html = collect_sections(prefetched) if args.text_index else None
     for filing in filings:
-        print(f"Extracting: {filing['url']}")
+        log.info('Extracting: %s', filing['url'])
         try:
-            summary = extract_10q_summary(filing['url'])
+            summary = extract_10q_summary(filing['url'], filing.get('accession'), filing.get('date'), cache, on_html)
             summary['date'] = filing.get('date')
             summary['accession'] = filing.get('accession')
-            results.append(summary)
+            backfill.record_success(filing, summary)
         except Exception as e:
-            print(f"Error extracting {filing['url']}: {e}")
+            log.error('Error extracting %s: %s', filing['url'], e)
+            backfill.record_failure(filing, e)
+    if backfill is not None:
+        results = backfill.results()
+        failures = backfill.failures()
+        if failures:
+            log.warning('%d filings failed; run again with --retry-failures to retry only those', len(failures))
     # Write output
     out_path = Path(__file__).parent / args.output
     with open(out_path, 'w') as f:
         json.dump(results, f, indent=2)
     print(f"Saved {len(results)} filings to {out_path}")
+    if args.columnar:
+        print(f"Columnar tables saved to {export_filing_tables(results, '10-Q', file_format=args.columnar)}")
+    if args.text_index:
+        print(f"Indexed narrative text of {index_filings(results, '10-Q', prefetched=prefetched)} new filings")
 
 def extract_revenue_table(table):
     """Extract revenue data from the table."""
@@ -413,9 +372,8 @@ def extract_revenue_table(table):
             if label:
                 valid_labels.add(label)
     
-    print("\nCandidate labels from revenue table:")
-    for label in sorted(valid_labels):
-        print(f"  - {label}")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('Candidate labels from revenue table: %s', sorted(valid_labels))
     
     # Second pass: extract data
     for row in table.find_all('tr'):
@@ -1,15 +1,27 @@
+import argparse
 import requests
-import json
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import warnings
 from dateutil.relativedelta import relativedelta
+from pathlib import Path
 warnings.filterwarnings('ignore')
 
+from columnar_export import COLUMNAR_DIR, export_facts
+from dashboard_shards import COMPACT_DASHBOARD_DIR, save_compact_dashboard
+from fact_warehouse import WAREHOUSE_PATH, populate_from_outputs
+from instrumentation import count, span
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from output_writer import write_if_changed
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+
 # Update data file references to use the new data/ subfolder
 DASHBOARD_DATA_PATH = './apple_sec_dashboard_data.json'
 SQL_GUIDE_PATH = 'data/sql_study_guide.md'
+CHANGE_SUMMARY_PATH = 'data/dashboard_changes.json'
+
+log = get_logger('apple_sec_data_parser')
 
 class AppleSECDataParser:
     def __init__(self):
@@ -18,14 +30,18 @@ class AppleSECDataParser:
         self.base_url = "https://data.sec.gov/api/xbrl/companyfacts/CIK"
         self.raw_data = None
         self.processed_data = {}
+        self.last_change = None
         
     def fetch_sec_data(self):
         """Fetch SEC data from the API"""
         url = f"{self.base_url}{self.cik}.json"
         try:
-            response = requests.get(url, headers=self.headers)
+            with span('fetch', url=url):
+                response = requests.get(url, headers=self.headers)
             response.raise_for_status()
-            self.raw_data = response.json()
+            count('bytes_fetched', len(response.content), source='companyfacts')
+            with span('parse', source='companyfacts'):
+                self.raw_data = response.json()
             print(f"Successfully fetched SEC data for {self.raw_data.get('entityName', 'Apple Inc.')}")
             return True
         except requests.exceptions.RequestException as e:
@@ -133,17 +149,17 @@ class AppleSECDataParser:
             # Extract USD values
             if 'units' in current_data and 'USD' in current_data['units']:
                 df = pd.DataFrame(current_data['units']['USD'])
-                print(f"\nExtracting {metric_name} from {metric_path}")
-                print("Columns:", df.columns.tolist())
-                print("Sample data:", df.head())
+                count('facts_processed', len(df))
+                log.debug('Extracting %s from %s; columns %s', metric_name, metric_path, list(df.columns))
                 # Check for required columns
                 if 'end' not in df.columns or 'val' not in df.columns or 'form' not in df.columns:
-                    print(f"[WARN] Missing required columns for {metric_name}: must have at least 'end', 'val', 'form'. Skipping this metric.")
+                    log.warning("Missing required columns for %s: must have at least 'end', 'val', 'form'. Skipping this metric.",
+                                metric_name)
                     return None
                 if df.empty:
-                    print(f"[WARN] DataFrame is empty for {metric_name}. Skipping this metric.")
+                    log.warning('DataFrame is empty for %s. Skipping this metric.', metric_name)
                     return None
-                print(f"[DEBUG] {metric_name}: DataFrame shape before deduplication: {df.shape}")
+                log.debug('%s: DataFrame shape before deduplication: %s', metric_name, df.shape)
                 # Filter out data points that span more than 3 months for quarterly data
                 if 'start' in df.columns and 'end' in df.columns:
                     df['start'] = pd.to_datetime(df['start'], errors='coerce')
@@ -154,7 +170,10 @@ class AppleSECDataParser:
                         # Only filter out data points that are explicitly marked as quarterly but span more than 4 months
                         quarterly_mask = (df['form'] == '10-Q') & (df['date_diff'] > 120)
                         df = df[~quarterly_mask]
-                        print(f"[DEBUG] Filtered out {quarterly_mask.sum()} quarterly data points spanning more than 4 months")
+                        dropped = int(quarterly_mask.sum())
+                        count('rows_dropped', dropped, rule='quarterly_span')
+                        log.debug('%s: filtered out %d quarterly data points spanning more than 4 months',
+                                  metric_name, dropped)
                     df = df.drop('date_diff', axis=1)
                 # Enhanced deduplication for quarterly data: prefer correct fp and frame
                 if 'fp' in df.columns and 'end' in df.columns:
@@ -172,7 +191,8 @@ class AppleSECDataParser:
                     before = df.shape[0]
                     df = df.drop_duplicates(subset=['end'], keep='first')
                     after = df.shape[0]
-                    print(f"[DEBUG] Enhanced deduplication: Dropped {before - after} rows by preferring correct fp and frame")
+                    count('rows_dropped', before - after, rule='duplicate_end_fp_frame')
+                    log.debug('%s: dropped %d rows by preferring correct fp and frame', metric_name, before - after)
                 else:
                     df['end'] = pd.to_datetime(df['end'], errors='coerce')
                     if 'frame' in df.columns:
@@ -185,10 +205,11 @@ class AppleSECDataParser:
                     if df['end'].duplicated().any():
                         df = df.drop_duplicates(subset=['end'], keep='first')
                         after = df.shape[0]
-                        print(f"[DEBUG] {metric_name}: Dropped {before - after} rows by deduplication (end only)")
+                        count('rows_dropped', before - after, rule='duplicate_end')
+                        log.debug('%s: dropped %d rows by deduplication (end only)', metric_name, before - after)
                     else:
-                        print(f"[DEBUG] {metric_name}: No duplicate 'end' values, no deduplication performed.")
-                print(f"[DEBUG] {metric_name}: DataFrame shape after deduplication: {df.shape}")
+                        log.debug("%s: no duplicate 'end' values, no deduplication performed", metric_name)
+                log.debug('%s: DataFrame shape after deduplication: %s', metric_name, df.shape)
                 df = df.sort_values('end')
                 # --- Q4 Calculation Logic ---
                 # For each fiscal year, if Q1, Q2, Q3, and annual (10-K) are present but Q4 is missing, calculate Q4
@@ -389,7 +410,8 @@ class AppleSECDataParser:
                     'latest_annual_period': latest_annual['end'] if latest_annual is not None else None
                 }
         except (KeyError, IndexError, TypeError) as e:
-            print(f"Could not extract {metric_name}: {e}")
+            # Expected while fallback paths are tried; process_all_metrics reports metrics with no data at all
+            log.debug('Could not extract %s from %s: %r', metric_name, metric_path, e)
             return None
     
     def calculate_growth_rates(self, data_series):
@@ -504,19 +526,21 @@ class AppleSECDataParser:
         
         # Extract each metric
         for key, config in metrics_config.items():
-            primary_path = config['path']
-            metric_data = self.extract_financial_metric(primary_path, config['name'])
-            used_path = primary_path
-            
-            # Try fallback paths if primary path fails
-            if not metric_data and 'fallback_paths' in config:
-                print(f"  Primary path failed for {config['name']}, trying fallbacks...")
-                for fallback_path in config['fallback_paths']:
-                    metric_data = self.extract_financial_metric(fallback_path, config['name'])
-                    if metric_data:
-                        used_path = fallback_path
-                        print(f"  ✓ Found data using fallback: {fallback_path.split('.')[-1]}")
-                        break
+            with span('extract', metric=key):
+                primary_path = config['path']
+                metric_data = self.extract_financial_metric(primary_path, config['name'])
+                used_path = primary_path
+
+                # Try fallback paths if primary path fails
+                if not metric_data and 'fallback_paths' in config:
+                    print(f"  Primary path failed for {config['name']}, trying fallbacks...")
+                    for fallback_path in config['fallback_paths']:
+                        count('fallback_attempts', metric=key)
+                        metric_data = self.extract_financial_metric(fallback_path, config['name'])
+                        if metric_data:
+                            used_path = fallback_path
+                            print(f"  ✓ Found data using fallback: {fallback_path.split('.')[-1]}")
+                            break
             
             if metric_data:
                 # Calculate growth rates
@@ -613,18 +637,70 @@ class AppleSECDataParser:
         
         return dashboard_data
     
-    def save_dashboard_data(self, filename=DASHBOARD_DATA_PATH):
-        """Save processed data to JSON file for dashboard consumption"""
-        dashboard_data = self.generate_dashboard_data()
+    def save_dashboard_data(self, filename=DASHBOARD_DATA_PATH, compact=False, compact_dir=COMPACT_DASHBOARD_DIR,
+                            summary_path=CHANGE_SUMMARY_PATH):
+        """Save processed data to JSON file for dashboard consumption.
+
+        The file is only rewritten when the data changed (last_updated is
+        ignored); each real change also rewrites the change summary at
+        `summary_path`. With compact=True, also write the sharded summary +
+        per-metric layout (with .gz/.br siblings) that demo.html loads lazily.
+        """
+        with span('derive', output='dashboard'):
+            dashboard_data = self.generate_dashboard_data()
         if dashboard_data:
-            with open(filename, 'w') as f:
-                json.dump(dashboard_data, f, indent=2, default=str)
-            print(f"Dashboard data saved to {filename}")
+            with span('save', path=Path(filename).name):
+                self.last_change = write_if_changed(filename, dashboard_data, summary_path)
+            if not self.last_change['changed']:
+                print(f"Dashboard data unchanged, kept {filename}")
+            else:
+                print(f"Dashboard data saved to {filename}")
+            if compact and (self.last_change['changed'] or not (Path(compact_dir) / 'summary.json').exists()):
+                summary_path = save_compact_dashboard(dashboard_data, compact_dir)
+                print(f"Compact dashboard data saved to {summary_path.parent}")
             return True
         return False
 
+    def export_columnar(self, out_dir=COLUMNAR_DIR, file_format='parquet'):
+        """Write processed facts as a typed dataset partitioned by metric (requires pyarrow)"""
+        if not self.processed_data:
+            print("No processed data available. Please process metrics first.")
+            return False
+        path = export_facts(self.processed_data, out_dir, file_format)
+        print(f"Columnar facts saved to {path}")
+        return True
+
+    def populate_warehouse(self, path=WAREHOUSE_PATH):
+        """Rebuild the SQLite fact warehouse from companyfacts and the extractor outputs"""
+        if not self.raw_data:
+            print("No SEC data available. Please fetch data first.")
+            return False
+        counts = populate_from_outputs(self.raw_data, path)
+        print(f"Fact warehouse saved to {path} ({', '.join(f'{n} {table}' for table, n in counts.items())})")
+        return True
+
+    def record_snapshot(self, root=SNAPSHOT_DIR):
+        """Append the current dashboard data to the snapshot history (skipped when unchanged)"""
+        dashboard_data = self.generate_dashboard_data()
+        if not dashboard_data:
+            return False
+        entry = SnapshotStore(root).record(dashboard_data)
+        if entry is None:
+            print(f"Snapshot history unchanged ({root})")
+        else:
+            print(f"Snapshot {entry['id']} ({entry['kind']}) saved to {root}")
+        return True
+
 def main():
     """Main function to run the SEC data parser"""
+    arg_parser = argparse.ArgumentParser(description="Fetch and process Apple SEC data for the dashboard")
+    arg_parser.add_argument('--compact', action='store_true', help='Also write the sharded, precompressed dashboard files')
+    arg_parser.add_argument('--columnar', choices=['parquet', 'arrow'], help='Also export processed facts as a columnar dataset')
+    arg_parser.add_argument('--warehouse', action='store_true', help='Also rebuild the SQLite fact warehouse')
+    arg_parser.add_argument('--snapshot', action='store_true', help='Also record the data in the snapshot history')
+    add_logging_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
     parser = AppleSECDataParser()
     
     print("Fetching Apple SEC data...")
@@ -632,7 +708,13 @@ def main():
         print("\nProcessing financial metrics...")
         if parser.process_all_metrics():
             print("\nGenerating dashboard data...")
-            if parser.save_dashboard_data():
+            if parser.save_dashboard_data(compact=args.compact):
+                if args.columnar:
+                    parser.export_columnar(file_format=args.columnar)
+                if args.warehouse:
+                    parser.populate_warehouse()
+                if args.snapshot:
+                    parser.record_snapshot()
                 print("\n✅ SEC data processing complete!")
                 
                 # Display summary
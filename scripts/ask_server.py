@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Local backend for the dashboards' chat panel (POST http://localhost:8001/ask).
+
+`demo.html` and `apple_sales_dashboard.html` send {"question": "..."} and
+render the "answer" field of the reply. Questions are parsed against the
+entities in the data and answered from a table precomputed when the data
+loads (question_parser.py), so the service needs no network access and
+answers in well under a millisecond. Other questions are searched in the
+filings' MD&A and risk factor text when data/text_index/ has been built. The
+indexes and answers are rebuilt in the background whenever the dashboard,
+10-K/10-Q outputs or text index change on disk.
+
+    GET  /health    {"status", "loaded_at", "last_updated"}
+    POST /ask       {"question": "What was iPhone revenue in Q2 2025?"} -> {"answer": "..."}
+
+Usage: python scripts/ask_server.py [--host 127.0.0.1] [--port 8001]
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+from async_http import App, HTTPError, Response, serve
+from data_index import RELOAD_INTERVAL, SOURCE_PATHS, DataIndex, IndexLoader
+from question_parser import AnswerEngine
+from text_index import TEXT_INDEX_DIR, TextIndex
+
+DEFAULT_PORT = 8001
+TEXT_INDEX_MANIFEST = TEXT_INDEX_DIR / 'manifest.json'
+
+
+def build_index(paths):
+    """Load the data and precompute its answers, so the swap publishes both together."""
+    index = DataIndex.from_paths(paths)
+    manifest = paths.get('text_index')
+    text_index = TextIndex(Path(manifest).parent) if manifest and Path(manifest).exists() else None
+    index.engine = AnswerEngine(index, text_index=text_index)
+    return index
+
+
+def close_index(index):
+    """Unmap a replaced index's text segments; without this every reload leaks their file handles."""
+    if index.engine.text_index is not None:
+        index.engine.text_index.close()
+
+
+def create_app(loader):
+    app = App()
+
+    @app.route('GET', '/health')
+    async def health(request):
+        index = loader.index
+        return Response.json({
+            'status': 'ok' if index else 'loading',
+            'loaded_at': index.loaded_at if index else None,
+            'last_updated': index.last_updated if index else None,
+        })
+
+    @app.route('POST', '/ask')
+    async def ask(request):
+        # The chat panels render `answer` whatever the status, so errors are answers too
+        try:
+            body = request.json()
+        except HTTPError as e:
+            return Response.json({'answer': e.message}, e.status)
+        question = body.get('question') if isinstance(body, dict) else None
+        if not isinstance(question, str) or not question.strip():
+            return Response.json({'answer': 'Please type a question.'}, 400)
+        index = loader.index
+        if index is None:
+            return Response.json({'answer': 'The financial data is not loaded yet.'}, 503)
+        return Response.json({'answer': index.engine.ask(question)})
+
+    return app
+
+
+async def run(host, port, reload_interval):
+    loader = IndexLoader(dict(SOURCE_PATHS, text_index=TEXT_INDEX_MANIFEST), build=build_index, retire=close_index)
+    loader.reload_if_changed()
+    watcher = asyncio.ensure_future(loader.watch(reload_interval))
+    try:
+        await serve(create_app(loader), host, port)
+    finally:
+        watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the dashboards' /ask endpoint from local data")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help='Seconds between checks for changed data files')
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+"""
+Minimal asyncio HTTP/1.1 server for the local dashboard backends.
+
+The dashboards are static pages opened from disk or `python -m http.server`
+and call the backends cross-origin, so every response carries permissive
+CORS headers and OPTIONS preflights are answered for any route. Only the
+standard library is used, so the services run fully offline:
+
+    app = App()
+
+    @app.route('POST', '/ask')
+    async def ask(request):
+        return Response.json({'answer': ...})
+
+    asyncio.run(serve(app, '127.0.0.1', 8001))
+
+Routes are exact paths or patterns with `{name}` segments, or a trailing
+`{name:path}` that also matches slashes (available as `request.params`).
+Connections are kept alive between requests; a handler can instead return a
+`StreamResponse` to push its body incrementally until the connection closes.
+"""
+
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from log_setup import get_logger
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+IDLE_TIMEOUT = 30.0
+
+log = get_logger('async_http')
+
+REASONS = {
+    200: 'OK', 204: 'No Content', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 406: 'Not Acceptable', 413: 'Payload Too Large', 500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
+    'Access-Control-Max-Age': '86400',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or REASONS.get(status, ''))
+        self.status = status
+        self.message = message or REASONS.get(status, '')
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parts = urlsplit(target)
+        self.path = unquote(parts.path)
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.params = {}
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def json(self):
+        if not self.body:
+            raise HTTPError(400, 'Expected a JSON body')
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, 'Malformed JSON body')
+
+
+class Response:
+    streaming = False
+
+    def __init__(self, status=200, body=b'', headers=None, content_type='text/plain; charset=utf-8'):
+        self.status = status
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.headers = {'Content-Type': content_type}
+        self.headers.update(headers or {})
+
+    @classmethod
+    def json(cls, obj, status=200, headers=None):
+        body = json.dumps(obj, separators=(',', ':'), default=str)
+        return cls(status, body, headers, 'application/json')
+
+    def encode_head(self, keep_alive):
+        headers = dict(CORS_HEADERS)
+        headers.update(self.headers)
+        if self.body is not None:
+            headers['Content-Length'] = str(len(self.body))
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines = [f'HTTP/1.1 {self.status} {REASONS.get(self.status, "")}']
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def write(self, writer, keep_alive, head_only=False):
+        writer.write(self.encode_head(keep_alive))
+        if not head_only and self.status not in (204, 304):
+            writer.write(self.body)
+        await writer.drain()
+
+
+class StreamResponse(Response):
+    """
+    Response whose body is an async generator of byte chunks, written as they
+    are produced. There is no Content-Length, so the body ends when the
+    connection closes (used for Server-Sent Events).
+    """
+
+    streaming = True
+
+    def __init__(self, chunks, status=200, headers=None, content_type='text/event-stream'):
+        super().__init__(status, None, headers, content_type)
+        self.chunks = chunks
+
+    async def write(self, writer, keep_alive=False, head_only=False):
+        try:
+            writer.write(self.encode_head(keep_alive=False))
+            await writer.drain()
+            if head_only:
+                return
+            async for chunk in self.chunks:
+                writer.write(chunk)
+                await writer.drain()
+        finally:
+            # Runs the generator's cleanup when the client went away mid-stream
+            await self.chunks.aclose()
+
+
+def accepted_encodings(header):
+    """{'br': 1.0, 'gzip': 0.8, 'identity': 0.0, ...} from an Accept-Encoding header (q=0 means refused)."""
+    encodings = {}
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header lists `etag` (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip()) == bare
+               for tag in if_none_match.split(','))
+
+
+def _compile(pattern):
+    regex = re.escape(pattern)
+    regex = re.sub(r'\\\{(\w+):path\\\}', r'(?P<\1>.+)', regex)
+    regex = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', regex)
+    return re.compile(f'^{regex}$')
+
+
+class App:
+    """Route table plus the per-request dispatch, error handling and CORS preflight."""
+
+    def __init__(self):
+        self.routes = []
+
+    def route(self, method, pattern):
+        def register(handler):
+            self.add_route(method, pattern, handler)
+            return handler
+        return register
+
+    def add_route(self, method, pattern, handler):
+        self.routes.append((method.upper(), _compile(pattern), handler))
+
+    def match(self, method, path):
+        allowed = set()
+        for route_method, regex, handler in self.routes:
+            match = regex.match(path)
+            if match:
+                if route_method == method or (method == 'HEAD' and route_method == 'GET'):
+                    return handler, match.groupdict(), allowed
+                allowed.add(route_method)
+        return None, {}, allowed
+
+    async def handle(self, request):
+        handler, params, allowed = self.match(request.method, request.path)
+        if request.method == 'OPTIONS':
+            if handler is None and not allowed:
+                return error_response(404)
+            return Response(204)
+        if handler is None:
+            return error_response(405 if allowed else 404)
+        request.params = params
+        try:
+            return await handler(request)
+        except HTTPError as e:
+            return error_response(e.status, e.message)
+        except Exception as e:
+            log.exception('%s %s failed', request.method, request.path)
+            return error_response(500)
+
+
+def error_response(status, message=None):
+    return Response.json({'error': message or REASONS.get(status, '')}, status)
+
+
+async def read_request(reader):
+    """Parse one request from the stream; None on a cleanly closed connection."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HTTPError(400, 'Truncated request')
+    except asyncio.LimitOverrunError:
+        raise HTTPError(400, 'Request header too large')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HTTPError(400, 'Malformed request line')
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HTTPError(400, 'Malformed Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413)
+    body = await reader.readexactly(length) if length else b''
+    return Request(method.upper(), target, version, headers, body)
+
+
+async def handle_connection(app, reader, writer):
+    try:
+        while True:
+            try:
+                request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+            except HTTPError as e:
+                await error_response(e.status, e.message).write(writer, keep_alive=False)
+                break
+            if request is None:
+                break
+            response = await app.handle(request)
+            keep_alive = request.keep_alive and not response.streaming
+            await response.write(writer, keep_alive, head_only=request.method == 'HEAD')
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def start_server(app, host='127.0.0.1', port=0):
+    return await asyncio.start_server(
+        lambda reader, writer: handle_connection(app, reader, writer), host, port, limit=MAX_HEADER_BYTES,
+    )
+
+
+async def serve(app, host='127.0.0.1', port=8001):
+    server = await start_server(app, host, port)
+    print(f"Listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Append-only checkpoint log for the filing extractors' backfills.
+
+An `--all` run of extract_10k_summary_tables.py / extract_10q_summary_tables.py
+appends one JSON line per filing to data/backfill/<output name>.jsonl as
+soon as that filing is done:
+
+    {"key": accession, "accession", "url", "date", "status": "ok", "result": {...}, "at": ...}
+    {"key": accession, "accession", "url", "date", "status": "failed", "error": "...", "at": ...}
+
+The latest line per filing wins. A run killed halfway loses at most the
+filing it was on: `--resume` skips every filing whose latest status is ok,
+and `--retry-failures` re-runs only the failure ledger (filings whose latest
+status is failed). The extractor output is rebuilt from the log's ok results
+at the end of every run, so it always covers everything completed so far.
+A line torn by a crash is ignored.
+
+Usage: python scripts/backfill_log.py status 10q_summary_data.json
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+BACKFILL_DIR = Path(__file__).resolve().parent.parent / 'data' / 'backfill'
+
+
+def filing_key(filing):
+    return filing.get('accession') or filing['url']
+
+
+class BackfillLog:
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @classmethod
+    def for_output(cls, output, root=BACKFILL_DIR):
+        """The log that checkpoints the extractor output file `output`."""
+        return cls(Path(root) / f'{Path(output).stem}.jsonl')
+
+    def entries(self):
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # The line a crash cut short; its filing is simply not done
+                continue
+
+    def latest(self):
+        """{key: latest entry} in first-seen order."""
+        latest = {}
+        for entry in self.entries():
+            latest[entry['key']] = entry
+        return latest
+
+    def completed(self):
+        return {key for key, entry in self.latest().items() if entry['status'] == 'ok'}
+
+    def failures(self):
+        """The failure ledger: filings whose latest attempt failed, as {'url', 'date', 'accession', 'error'} dicts."""
+        return [
+            {'url': entry['url'], 'date': entry['date'], 'accession': entry['accession'], 'error': entry['error']}
+            for entry in self.latest().values() if entry['status'] == 'failed'
+        ]
+
+    def results(self):
+        """Results of every completed filing, newest filing date first (the extractors' output order)."""
+        done = [entry for entry in self.latest().values() if entry['status'] == 'ok']
+        done.sort(key=lambda entry: entry.get('date') or '', reverse=True)
+        return [entry['result'] for entry in done]
+
+    def start(self, resume=False):
+        """Begin a run; without `resume` the previous run's checkpoints are discarded."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not resume:
+            self.path.write_text('')
+            return
+        with open(self.path, 'ab+') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    # End the torn line so the next checkpoint starts on a line of its own
+                    f.write(b'\n')
+
+    def _append(self, entry):
+        entry['at'] = datetime.now().isoformat(timespec='seconds')
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_success(self, filing, result):
+        self._append({'key': filing_key(filing), 'accession': filing.get('accession'), 'url': filing['url'],
+                      'date': filing.get('date'), 'status': 'ok', 'result': result})
+
+    def record_failure(self, filing, error):
+        self._append({'key': filing_key(filing), 'accession': filing.get('accession'), 'url': filing['url'],
+                      'date': filing.get('date'), 'status': 'failed', 'error': str(error)})
+
+
+def select_filings(log, filings, resume=False, retry_failures=False):
+    """The filings a run should process, after starting the log for it."""
+    if retry_failures:
+        log.start(resume=True)
+        return log.failures()
+    log.start(resume)
+    if not resume:
+        return filings
+    done = log.completed()
+    return [filing for filing in filings if filing_key(filing) not in done]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect an extractor backfill log')
+    commands = parser.add_subparsers(dest='command', required=True)
+    status = commands.add_parser('status', help='Show completed and failed filings for an output file')
+    status.add_argument('output', help="The extractor's output file name, e.g. 10q_summary_data.json")
+    args = parser.parse_args()
+    log = BackfillLog.for_output(args.output)
+    failures = log.failures()
+    print(f"{log.path}: {len(log.completed())} completed, {len(failures)} failed")
+    for failure in failures:
+        print(f"  [FAILED] {failure['accession'] or failure['url']} ({failure['date']}): {failure['error']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Change notifications for open dashboards, published as Server-Sent Events.
+
+`refresh_data.py` records a snapshot whenever the dashboard data really
+changes (snapshot_store.py). `ChangeFeed.watch` polls the snapshot manifest
+and, for each new snapshot, publishes a compact summary of what it changed:
+
+    event: change
+    id: 20250801T034153
+    data: {"snapshot", "previous", "taken_at", "metrics": [...], "new_periods": [...],
+           "sections": [...], "shards": ["data/dashboard/summary.json", "data/dashboard/metrics/revenue.json"]}
+
+so a page refetches only the listed shards instead of everything.
+
+Every subscriber is a bounded asyncio.Queue of pre-encoded messages: an
+event is serialized once and handed to all queues, and one shared heartbeat
+task keeps idle connections open, so thousands of idle subscribers cost a
+queue each and no timers. A subscriber that stops reading gets its backlog
+replaced by a single `resync` event. Reconnecting clients send Last-Event-ID
+and are replayed the events they missed, or told to resync when those are no
+longer buffered.
+"""
+
+import asyncio
+import json
+from collections import deque
+
+from dashboard_shards import COMPACT_DASHBOARD_DIR, shard_name
+from data_index import fact_period, period_order
+from log_setup import get_logger
+from sales_series import REPO_ROOT
+from snapshot_store import SnapshotStore, diff_states
+
+POLL_INTERVAL = 2.0
+HEARTBEAT_INTERVAL = 15.0
+MAX_PENDING = 16
+REPLAY_EVENTS = 32
+RETRY_MS = 5000
+
+log = get_logger('change_feed')
+
+COMPACT_PREFIX = COMPACT_DASHBOARD_DIR.relative_to(REPO_ROOT).as_posix()
+HEARTBEAT = b': keep-alive\n\n'
+
+
+def encode_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.extend(f'data: {line}' for line in json.dumps(data, separators=(',', ':')).split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+RESYNC = encode_event('resync', {'reason': 'missed events'})
+
+
+def _periods(state):
+    periods = set()
+    for key in state:
+        if key[0] == 'fact' and key[2] == 'data':
+            period = fact_period(dict(zip(('start', 'end', 'form'), key[3:])))
+            if period is not None:
+                periods.add(period)
+    return periods
+
+
+def summarize_change(old_state, new_state):
+    """Changed metrics, sections and fiscal periods between two flattened snapshot states."""
+    changes = diff_states(old_state, new_state)
+    metrics, sections = set(), set()
+    for key in changes['added'] + changes['removed'] + [change['key'] for change in changes['changed']]:
+        if key[0] in ('fact', 'metric'):
+            metrics.add(key[1])
+        elif key[0] == 'section':
+            sections.add(key[1])
+    metrics = sorted(metrics)
+    return {
+        'metrics': metrics,
+        'new_periods': sorted(_periods(new_state) - _periods(old_state), key=period_order),
+        'sections': sorted(sections),
+        'shards': [f'{COMPACT_PREFIX}/summary.json'] + [f'{COMPACT_PREFIX}/{shard_name(key)}' for key in metrics],
+    }
+
+
+class ChangeFeed:
+    """Fan-out of change events to SSE subscribers on one event loop."""
+
+    def __init__(self, store=None):
+        self.store = store or SnapshotStore()
+        self.subscribers = set()
+        self.recent = deque(maxlen=REPLAY_EVENTS)
+        snapshots = self.store.snapshots()
+        self.last_id = snapshots[-1]['id'] if snapshots else None
+
+    def publish(self, message):
+        for queue in self.subscribers:
+            if queue.full():
+                # A stalled client gets one resync instead of an unbounded backlog
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+            else:
+                queue.put_nowait(message)
+
+    def publish_change(self, summary):
+        message = encode_event('change', summary, summary['snapshot'])
+        self.recent.append((summary['snapshot'], message))
+        self.last_id = summary['snapshot']
+        self.publish(message)
+
+    def replay(self, last_event_id):
+        """Messages a client reconnecting with `last_event_id` missed."""
+        if not last_event_id or last_event_id == self.last_id:
+            return []
+        ids = [event_id for event_id, _ in self.recent]
+        if last_event_id not in ids:
+            return [RESYNC]
+        return [message for _, message in list(self.recent)[ids.index(last_event_id) + 1:]]
+
+    async def stream(self, last_event_id=None):
+        queue = asyncio.Queue(MAX_PENDING)
+        self.subscribers.add(queue)
+        try:
+            yield f'retry: {RETRY_MS}\n\n'.encode('ascii')
+            for message in self.replay(last_event_id):
+                yield message
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.subscribers.discard(queue)
+
+    def close(self):
+        """End every open stream (on shutdown)."""
+        for queue in self.subscribers:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def new_changes(self):
+        """Summaries of the snapshots recorded since the last one published, oldest first."""
+        snapshots = self.store.snapshots()
+        ids = [entry['id'] for entry in snapshots]
+        start = ids.index(self.last_id) + 1 if self.last_id in ids else 0
+        summaries = []
+        for i in range(start, len(snapshots)):
+            entry = snapshots[i]
+            previous = snapshots[i - 1] if i else None
+            # The first snapshot ever is compared with nothing, so everything in it is new
+            old_state = self.store.state(previous['taken_at']) if previous else {}
+            summary = {'snapshot': entry['id'], 'previous': previous and previous['id'], 'taken_at': entry['taken_at']}
+            summary.update(summarize_change(old_state, self.store.state(entry['taken_at'])))
+            summaries.append(summary)
+        return summaries
+
+    async def watch(self, interval=POLL_INTERVAL):
+        """Poll the snapshot manifest; state reconstruction runs in a worker thread."""
+        loop = asyncio.get_running_loop()
+        stamp = None
+        while True:
+            try:
+                current = self.store.manifest_path.stat().st_mtime_ns
+            except OSError:
+                current = None
+            if current != stamp:
+                stamp = current
+                try:
+                    summaries = await loop.run_in_executor(None, self.new_changes)
+                except (OSError, ValueError, LookupError) as e:
+                    log.warning('Could not read new snapshots: %s', e)
+                    summaries = []
+                for summary in summaries:
+                    self.publish_change(summary)
+            await asyncio.sleep(interval)
+
+    async def heartbeat(self, interval=HEARTBEAT_INTERVAL):
+        while True:
+            await asyncio.sleep(interval)
+            self.publish(HEARTBEAT)
@@ -0,0 +1,198 @@
+"""
+Columnar (Parquet / Arrow IPC) export of processed series.
+
+Every output of the pipeline is nested JSON, so analysis over the history has
+to re-parse it and rebuild DataFrames. This module writes the same data as
+typed, hive-partitioned datasets under data/columnar/<format>/:
+
+    facts/metric=<key>/part-0.parquet               companyfacts series per dashboard metric
+    filing_tables/form=<form>/section=<s>/...       tidy 10-K/10-Q table rows
+    sales_series/form=<form>/...                    consolidated series incl. derived Q4
+
+Amounts from companyfacts are int64, dates are date32, fiscal years int64.
+Use format 'arrow' (Arrow IPC) for files that can be memory-mapped without
+a decode step:
+
+    import pyarrow.dataset as ds
+    ds.dataset('data/columnar/parquet/facts', format='parquet', partitioning='hive').to_table()
+
+pyarrow is optional; it is only imported by the export functions.
+"""
+
+from datetime import date, datetime
+from pathlib import Path
+
+from sales_series import SOURCES, normalize_member, parse_period_label
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+    ds = None
+
+COLUMNAR_DIR = Path(__file__).resolve().parent.parent / 'data' / 'columnar'
+FORMATS = ('parquet', 'arrow')
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Columnar export requires pyarrow (pip install pyarrow)")
+
+
+def to_date(value):
+    """'2024-09-28', '2024-09-28 00:00:00', datetime or Timestamp -> date (None stays None)."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def to_int(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _schema():
+    return {
+        'facts': pa.schema([
+            ('metric', pa.string()), ('source_field', pa.string()), ('start', pa.date32()),
+            ('end', pa.date32()), ('val', pa.int64()), ('fy', pa.int64()), ('form', pa.string()),
+        ]),
+        'filing_tables': pa.schema([
+            ('form', pa.string()), ('section', pa.string()), ('accession', pa.string()),
+            ('filed', pa.date32()), ('dimension', pa.string()), ('label', pa.string()),
+            ('member', pa.string()), ('period', pa.string()), ('fiscal_year', pa.int64()),
+            ('fiscal_period', pa.string()), ('end', pa.date32()), ('net_sales', pa.float64()),
+            ('percent_change', pa.float64()),
+        ]),
+        'sales_series': pa.schema([
+            ('dimension', pa.string()), ('member', pa.string()), ('period', pa.string()),
+            ('fiscal_year', pa.int64()), ('fiscal_period', pa.string()), ('end', pa.date32()),
+            ('net_sales', pa.float64()), ('percent_change', pa.float64()), ('form', pa.string()),
+            ('accession', pa.string()), ('filed', pa.date32()), ('derived', pa.bool_()),
+        ]),
+    }
+
+
+def _table(name, columns):
+    return pa.Table.from_pydict(columns, schema=_schema()[name])
+
+
+def facts_table(raw_metrics):
+    """One row per companyfacts record in each metric's `data` series."""
+    require_pyarrow()
+    columns = {field: [] for field in _schema()['facts'].names}
+    for metric, meta in raw_metrics.items():
+        for record in meta.get('data') or []:
+            columns['metric'].append(metric)
+            columns['source_field'].append(meta.get('source_field'))
+            columns['start'].append(to_date(record.get('start')))
+            columns['end'].append(to_date(record.get('end')))
+            columns['val'].append(to_int(record.get('val')))
+            columns['fy'].append(to_int(record.get('fy')))
+            columns['form'].append(record.get('form'))
+    return _table('facts', columns)
+
+
+def filing_tables_table(filings, form):
+    """Tidy extractor rows with fiscal periods resolved; change columns keep null fiscal fields."""
+    require_pyarrow()
+    columns = {field: [] for field in _schema()['filing_tables'].names}
+    for filing in filings:
+        for section, dimension in SOURCES.items():
+            for row in filing.get(section) or []:
+                if 'year' in row:
+                    period, parsed = str(row['year']), (to_int(row['year']), 'FY', None)
+                else:
+                    period = row.get('period')
+                    parsed = parse_period_label(period) or (None, None, None)
+                columns['form'].append(form)
+                columns['section'].append(section)
+                columns['accession'].append(filing.get('accession'))
+                columns['filed'].append(to_date(filing.get('date')))
+                columns['dimension'].append(dimension)
+                columns['label'].append(row.get(dimension))
+                columns['member'].append(normalize_member(row.get(dimension)))
+                columns['period'].append(period)
+                columns['fiscal_year'].append(parsed[0])
+                columns['fiscal_period'].append(parsed[1])
+                columns['end'].append(to_date(parsed[2]))
+                columns['net_sales'].append(to_float(row.get('net_sales')))
+                columns['percent_change'].append(to_float(row.get('percent_change')))
+    return _table('filing_tables', columns)
+
+
+def sales_series_table(records):
+    require_pyarrow()
+    schema = _schema()['sales_series']
+    columns = {field: [] for field in schema.names}
+    for record in records:
+        for field in schema.names:
+            value = record.get(field)
+            if field in ('end', 'filed'):
+                value = to_date(value)
+            elif field == 'derived':
+                value = bool(value)
+            columns[field].append(value)
+    return _table('sales_series', columns)
+
+
+def write_dataset(table, name, partition_cols, out_dir=COLUMNAR_DIR, file_format='parquet'):
+    """
+    Write `table` as a hive-partitioned dataset under out_dir/<format>/name. Only the
+    partitions present in `table` are replaced, so the 10-Q summary and
+    region extractors can each refresh their own sections.
+    """
+    require_pyarrow()
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown columnar format {file_format!r}; expected one of {FORMATS}")
+    root = Path(out_dir) / file_format / name
+    root.mkdir(parents=True, exist_ok=True)
+    ds.write_dataset(
+        table, root,
+        format=file_format,
+        partitioning=partition_cols,
+        partitioning_flavor='hive',
+        existing_data_behavior='delete_matching',
+        basename_template=f'part-{{i}}.{file_format}',
+    )
+    return root
+
+
+def read_dataset(name, out_dir=COLUMNAR_DIR, file_format='parquet'):
+    """Open a written dataset; partition columns come back as regular columns."""
+    require_pyarrow()
+    return ds.dataset(Path(out_dir) / file_format / name, format=file_format, partitioning='hive')
+
+
+def export_facts(raw_metrics, out_dir=COLUMNAR_DIR, file_format='parquet'):
+    return write_dataset(facts_table(raw_metrics), 'facts', ['metric'], out_dir, file_format)
+
+
+def export_filing_tables(filings, form, out_dir=COLUMNAR_DIR, file_format='parquet'):
+    return write_dataset(filing_tables_table(filings, form), 'filing_tables', ['form', 'section'],
+                         out_dir, file_format)
+
+
+def export_sales_series(records, out_dir=COLUMNAR_DIR, file_format='parquet'):
+    return write_dataset(sales_series_table(records), 'sales_series', ['form'], out_dir, file_format)
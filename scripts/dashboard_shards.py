@@ -0,0 +1,152 @@
+"""
+Compact, sharded variant of the dashboard JSON.
+
+`apple_sec_dashboard_data.json` repeats every record of a metric in
+`raw_metrics.<key>.data`, `annual_data` and `quarterly_data`, and the page
+has to download all of it before first paint. The compact layout splits it
+into a small summary plus one lazily loaded shard per metric:
+
+    data/dashboard/summary.json            everything except raw_metrics, plus
+                                           {"metric_shards": {key: {"name", "shard", "records"}}}
+    data/dashboard/metrics/<key>.json      {"version", "meta", "fields", "records",
+                                            "data", "annual", "quarterly"}
+
+Each distinct record is stored once as a row under `fields`; `data`,
+`annual` and `quarterly` are index lists into `records`. Every file gets a
+precompressed `.gz` sibling, plus `.br` when the `brotli` module is installed.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPACT_VERSION = 1
+COMPACT_DASHBOARD_DIR = Path(__file__).resolve().parent.parent / 'data' / 'dashboard'
+SERIES_KEYS = {'data': 'data', 'annual_data': 'annual', 'quarterly_data': 'quarterly'}
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), default=str)
+
+
+def shard_name(key):
+    """Path of a metric's shard relative to the compact dashboard directory."""
+    return f'metrics/{key}.json'
+
+
+def _write_bytes(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_precompressed(path, text):
+    """Write `text` to `path` plus .gz (and .br) siblings. Returns the paths written."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = text.encode('utf-8')
+    written = [path, path.with_name(path.name + '.gz')]
+    _write_bytes(written[0], payload)
+    _write_bytes(written[1], gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        written.append(path.with_name(path.name + '.br'))
+        _write_bytes(written[2], brotli.compress(payload))
+    return written
+
+
+def compact_metric(meta):
+    """Normalize one raw_metrics entry into a shard with each record stored once."""
+    fields = []
+    rows = []
+    positions = {}
+    shard = {'version': COMPACT_VERSION, 'meta': {}, 'fields': fields, 'records': rows}
+    for key, value in meta.items():
+        if key not in SERIES_KEYS:
+            shard['meta'][key] = value
+    for series_key, shard_key in SERIES_KEYS.items():
+        indexes = []
+        for record in meta.get(series_key) or []:
+            identity = _dumps(sorted(record.items()))
+            position = positions.get(identity)
+            if position is None:
+                for field in record:
+                    if field not in fields:
+                        fields.append(field)
+                position = positions[identity] = len(rows)
+                rows.append(record)
+            indexes.append(position)
+        shard[shard_key] = indexes
+    shard['records'] = [[record.get(field) for field in fields] for record in rows]
+    return shard
+
+
+def expand_metric(shard):
+    """Inverse of `compact_metric`, for consumers that want the legacy shape."""
+    records = [
+        {field: value for field, value in zip(shard['fields'], row) if value is not None}
+        for row in shard['records']
+    ]
+    meta = dict(shard['meta'])
+    for series_key, shard_key in SERIES_KEYS.items():
+        meta[series_key] = [records[i] for i in shard[shard_key]]
+    return meta
+
+
+def compact_dashboard(dashboard_data):
+    """Split a dashboard payload into (summary, {metric_key: shard})."""
+    summary = {key: value for key, value in dashboard_data.items() if key != 'raw_metrics'}
+    summary['compact_version'] = COMPACT_VERSION
+    shards = {}
+    summary['metric_shards'] = {}
+    for key, meta in (dashboard_data.get('raw_metrics') or {}).items():
+        shards[key] = compact_metric(meta)
+        summary['metric_shards'][key] = {
+            'name': meta.get('metric_name'),
+            'shard': shard_name(key),
+            'records': len(shards[key]['records']),
+        }
+    return summary, shards
+
+
+def save_compact_dashboard(dashboard_data, out_dir=COMPACT_DASHBOARD_DIR):
+    """Write the summary and per-metric shards. Returns the summary path."""
+    out_dir = Path(out_dir)
+    summary, shards = compact_dashboard(dashboard_data)
+    for key, shard in shards.items():
+        write_precompressed(out_dir / summary['metric_shards'][key]['shard'], _dumps(shard))
+    # Drop shards of metrics that are no longer produced
+    metrics_dir = out_dir / 'metrics'
+    live = {f'{key}.json' for key in shards}
+    for path in metrics_dir.glob('*.json*'):
+        if path.name.split('.json')[0] + '.json' not in live:
+            path.unlink()
+    # Summary last, so it never points at shards that are not written yet
+    summary_path = out_dir / 'summary.json'
+    write_precompressed(summary_path, _dumps(summary))
+    return summary_path
+
+
+def load_compact_dashboard(out_dir=COMPACT_DASHBOARD_DIR):
+    """Reassemble the legacy dashboard shape from a compact directory."""
+    out_dir = Path(out_dir)
+    with open(out_dir / 'summary.json') as f:
+        summary = json.load(f)
+    dashboard = {key: value for key, value in summary.items() if key not in ('metric_shards', 'compact_version')}
+    dashboard['raw_metrics'] = {}
+    for key, info in summary['metric_shards'].items():
+        with open(out_dir / info['shard']) as f:
+            dashboard['raw_metrics'][key] = expand_metric(json.load(f))
+    return dashboard
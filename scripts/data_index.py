@@ -0,0 +1,217 @@
+"""
+In-memory indexes over the dashboard and 10-K/10-Q outputs for the local backends.
+
+The JSON outputs are loaded once into plain dicts keyed the way questions and
+chart slices ask for them, so a lookup is a couple of dict hits:
+
+    index.metrics[key]                 {'key', 'name', 'source_field', 'points': {period: point}, 'periods': [...]}
+    index.sales[(dimension, member)]   {'dimension', 'member', 'points': {period: point}, 'periods': [...]}
+    index.members[dimension]           display names of the products / regions in the data
+
+Periods use the sales series' fiscal labels ('FY2024', 'FY2025-Q2', 'FY2025-H1'),
+resolved from each fact's own dates. `periods` lists are ordered oldest first.
+Sales points carry `net_sales` in millions as reported plus `value` in USD.
+
+`IndexLoader` owns the current index. It stats the source files and, when one
+changed, builds a complete new index off the event loop before swapping the
+reference, so requests always see either the old or the new data, never a mix.
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+
+from log_setup import get_logger
+from reconcile_xbrl import TABLE_SCALE, period_months
+from sales_series import (
+    FISCAL_PERIOD_ORDER, REPO_ROOT, TEN_K_SUMMARY_PATH, TEN_Q_REGION_PATH, TEN_Q_SUMMARY_PATH, add_derived_q4,
+    build_series, fiscal_period_for, load_filings, member_key, period_key
+)
+
+DASHBOARD_PATH = REPO_ROOT / 'apple_sec_dashboard_data.json'
+SOURCE_PATHS = {
+    'dashboard': DASHBOARD_PATH,
+    'ten_k': TEN_K_SUMMARY_PATH,
+    'ten_q': TEN_Q_SUMMARY_PATH,
+    'ten_q_region': TEN_Q_REGION_PATH,
+}
+DIMENSIONS = ('product', 'region')
+RELOAD_INTERVAL = 2.0
+
+log = get_logger('data_index')
+
+
+def _date(value):
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def period_order(period):
+    """'FY2025-Q2' -> (2025, 2); works as a sort key for any period label."""
+    year, _, fiscal_period = period[2:].partition('-')
+    return int(year), FISCAL_PERIOD_ORDER.get(fiscal_period or 'FY', 99)
+
+
+def fact_period(record):
+    """
+    Fiscal period label of a dashboard fact. Duration facts use their own
+    start/end dates; instant facts (balances) take the quarter they fall in,
+    or the fiscal year when reported on a 10-K.
+    """
+    end = _date(record['end'])
+    if record.get('start'):
+        months = period_months(_date(record['start']), end)
+    else:
+        months = 12 if record.get('form') == '10-K' else 3
+    fiscal_year, fiscal_period = fiscal_period_for(end, months)
+    if fiscal_period is None:
+        return None
+    return period_key(fiscal_year, fiscal_period)
+
+
+def _finish(entry):
+    entry['periods'] = sorted(entry['points'], key=period_order)
+    # Latest discrete period: a 6/9-month cumulative figure ends on the same date as its quarter
+    discrete = [p for p in entry['periods'] if entry['points'][p]['fiscal_period'] not in ('H1', '9M')]
+    entry['latest'] = (discrete or entry['periods'] or [None])[-1]
+    return entry
+
+
+class DataIndex:
+    """Immutable snapshot of the indexed outputs; build a new one to reload."""
+
+    def __init__(self, dashboard=None, ten_k=(), ten_q=(), ten_q_region=(), stamps=None):
+        dashboard = dashboard or {}
+        self.last_updated = dashboard.get('last_updated')
+        self.stamps = stamps or {}
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        self.metrics = {}
+        for key, meta in (dashboard.get('raw_metrics') or {}).items():
+            entry = {'key': key, 'name': meta.get('metric_name') or key,
+                     'source_field': meta.get('source_field'), 'points': {}}
+            for record in meta.get('data') or []:
+                period = fact_period(record)
+                if period is None or record.get('val') is None:
+                    continue
+                fiscal_year, _, fiscal_period = period[2:].partition('-')
+                entry['points'][period] = {
+                    'period': period, 'fiscal_year': int(fiscal_year), 'fiscal_period': fiscal_period or 'FY',
+                    'value': float(record['val']), 'start': record.get('start'), 'end': record['end'],
+                    'form': record.get('form'),
+                }
+            self.metrics[key] = _finish(entry)
+        self.sales = {}
+        self.members = {dimension: [] for dimension in DIMENSIONS}
+        for record in add_derived_q4(build_series(ten_k, ten_q, ten_q_region)):
+            key = (record['dimension'], member_key(record['member']))
+            entry = self.sales.get(key)
+            if entry is None:
+                entry = self.sales[key] = {'dimension': record['dimension'], 'member': record['member'], 'points': {}}
+                self.members.setdefault(record['dimension'], []).append(record['member'])
+            point = dict(record)
+            point['value'] = record['net_sales'] * TABLE_SCALE
+            entry['points'][record['period']] = point
+        for entry in self.sales.values():
+            _finish(entry)
+
+    @classmethod
+    def from_paths(cls, paths=None):
+        paths = paths or SOURCE_PATHS
+        stamps = file_stamps(paths)
+        with open(paths['dashboard']) as f:
+            dashboard = json.load(f)
+        return cls(
+            dashboard,
+            load_filings(paths.get('ten_k')) if paths.get('ten_k') else [],
+            load_filings(paths.get('ten_q')) if paths.get('ten_q') else [],
+            load_filings(paths.get('ten_q_region')) if paths.get('ten_q_region') else [],
+            stamps,
+        )
+
+    def metric_point(self, key, period=None):
+        """The point for `period`, or the latest quarter/year when period is None."""
+        entry = self.metrics.get(key)
+        if entry is None:
+            return None
+        return entry['points'].get(period or entry['latest'])
+
+    def sales_entry(self, dimension, member):
+        return self.sales.get((dimension, member_key(member)))
+
+    def sales_point(self, dimension, member, period=None):
+        entry = self.sales_entry(dimension, member)
+        if entry is None:
+            return None
+        return entry['points'].get(period or entry['latest'])
+
+
+def file_stamps(paths):
+    """{name: (mtime_ns, size)} for each source; None for missing files."""
+    stamps = {}
+    for name, path in paths.items():
+        try:
+            stat = Path(path).stat()
+            stamps[name] = (stat.st_mtime_ns, stat.st_size)
+        except (OSError, TypeError):
+            stamps[name] = None
+    return stamps
+
+
+class IndexLoader:
+    """
+    Holds the current DataIndex and swaps in a rebuilt one when a source file
+    changes. `retire(index)`, if given, is called with each replaced index once
+    no request can still be using it, to release what the index holds open.
+    """
+
+    def __init__(self, paths=None, build=DataIndex.from_paths, retire=None):
+        self.paths = dict(paths or SOURCE_PATHS)
+        self.build = build
+        self.retire = retire
+        self.index = None
+        self.failed_stamps = None
+
+    def load(self):
+        self.index = self.build(self.paths)
+        return self.index
+
+    def changed(self):
+        stamps = file_stamps(self.paths)
+        if stamps == self.failed_stamps:
+            return False
+        return self.index is None or stamps != self.index.stamps
+
+    def _reload(self):
+        """(reloaded, replaced index or None); keeps the old index if the new files do not load."""
+        if not self.changed():
+            return False, None
+        stamps = file_stamps(self.paths)
+        previous = self.index
+        try:
+            self.load()
+        except (OSError, ValueError) as e:
+            # Not retried until the files change again
+            self.failed_stamps = stamps
+            log.warning('Data load failed, keeping previous data: %s', e)
+            return False, None
+        return True, previous
+
+    def _retire(self, previous):
+        if previous is not None and self.retire is not None:
+            self.retire(previous)
+
+    def reload_if_changed(self):
+        """Synchronous reload; keeps serving the old index if the new files do not load."""
+        reloaded, previous = self._reload()
+        self._retire(previous)
+        return reloaded
+
+    async def watch(self, interval=RELOAD_INTERVAL):
+        """Poll the sources; rebuild in a worker thread so lookups never wait on a reload."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if self.changed():
+                _, previous = await loop.run_in_executor(None, self._reload)
+                # Lookups run on the event loop without awaiting, so none is still using the old index here
+                self._retire(previous)
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Static and slice server for the dashboards (replaces `python -m http.server`).
+
+Serves the repository's pages and JSON outputs with strong ETags,
+`Cache-Control: no-cache` (browsers revalidate and get 304s while the file is
+unchanged) and gzip/brotli negotiation. Precompressed `.gz`/`.br` siblings
+written by dashboard_shards.py are used when they are at least as new as the
+file; anything else is compressed once and cached until the file changes.
+
+Slice endpoints answer from the same in-memory DataIndex as the /ask backend,
+so a chart can fetch one series instead of the whole dashboard file:
+
+    GET /api/metrics                              metric and product/region catalogue
+    GET /api/metrics/{key}?from=FY2023&to=FY2025  one metric's points, optionally in a period range
+    GET /api/sales/{dimension}/{member}?from=&to= one product or region's net sales
+    GET /api/periods/{period}                     every metric and sales point for one period
+    GET /api/facts/{concept}?form=10-Q&start=&end=  every companyfacts fact for a concept (fact warehouse)
+    GET /api/facts/{concept}/latest?form=         the concept's most recent fact
+    GET /api/facts?form=10-Q&fy=2025&fp=Q1        the facts a form reported for a fiscal period
+    GET /api/filings/{accession}                  one filing's facts and extracted table rows
+    GET /events                                   Server-Sent Events: a summary of each new snapshot
+                                                  (change_feed.py), so pages refetch only changed shards
+
+Period bounds are fiscal labels ('FY2024', 'FY2025-Q2') and are inclusive; a
+bare year includes its quarters.
+
+The /api/facts and /api/filings endpoints read the SQLite fact warehouse
+(fact_warehouse.py), which keeps the full companyfacts history rather than the
+dashboard's trimmed series. They answer 503 until data/facts.sqlite has been
+built; each request opens the file afresh, so a rebuild is picked up at once.
+
+Usage: python scripts/data_server.py [--host 127.0.0.1] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from pathlib import Path
+
+from async_http import App, HTTPError, Response, StreamResponse, accepted_encodings, etag_matches, serve
+from change_feed import ChangeFeed
+from data_index import DIMENSIONS, RELOAD_INTERVAL, IndexLoader, period_order
+from fact_warehouse import WAREHOUSE_PATH, FactWarehouse
+from sales_series import REPO_ROOT, member_key
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_PORT = 8000
+INDEX_PAGE = 'demo.html'
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.json': 'application/json',
+    '.js': 'text/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.ico': 'image/x-icon',
+}
+COMPRESSIBLE = ('.html', '.json', '.js', '.css', '.svg')
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ('br', 'gzip', 'identity')
+SIBLING_SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+MIN_COMPRESS_BYTES = 512
+# Slice bodies kept per index (with their compressed variants)
+SLICE_CACHE_SIZE = 512
+CACHE_CONTROL = 'no-cache'
+_PERIOD_LABEL_RE = re.compile(r'^FY\d{4}(?:-(?:Q[1-4]|H1|9M))?$')
+_ISO_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def compress(body, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(body)
+    return body
+
+
+def available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, offered):
+    """Best of `offered` (plus identity) for an Accept-Encoding header; None if nothing is acceptable."""
+    if not accept_encoding:
+        return 'identity'
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get('*')
+    best, best_q = None, 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding != 'identity' and encoding not in offered:
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q is None:
+            # identity stays acceptable unless it is refused explicitly or through "*;q=0"
+            q = 0.001 if encoding == 'identity' else 0.0
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Representations:
+    """One resource's identity body plus its compressed variants, each with a strong ETag."""
+
+    def __init__(self, body, content_type, compressible=True):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {'identity': body}
+        self.compressible = compressible and len(body) >= MIN_COMPRESS_BYTES
+
+    def offered(self):
+        return available_encodings() if self.compressible else ()
+
+    def etag(self, encoding):
+        return f'"{self.digest}"' if encoding == 'identity' else f'"{self.digest}-{encoding}"'
+
+    def body(self, encoding):
+        if encoding not in self.bodies:
+            self.bodies[encoding] = compress(self.bodies['identity'], encoding)
+        return self.bodies[encoding]
+
+    def response(self, request):
+        encoding = negotiate_encoding(request.headers.get('accept-encoding'), self.offered())
+        if encoding is None:
+            raise HTTPError(406, 'No acceptable Content-Encoding')
+        etag = self.etag(encoding)
+        headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+        if self.compressible:
+            headers['Vary'] = 'Accept-Encoding'
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            return Response(304, b'', headers, self.content_type)
+        return Response(200, self.body(encoding), headers, self.content_type)
+
+
+def _stamp(path):
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileCache:
+    """Representations of static files, keyed by path and rebuilt when (mtime, size) changes."""
+
+    def __init__(self, root=REPO_ROOT):
+        self.root = Path(root).resolve()
+        self.entries = {}
+
+    def resolve(self, relative):
+        """Absolute path for a request path, or None when it is not a servable file."""
+        parts = [part for part in relative.split('/') if part]
+        if not parts or any(part.startswith('.') for part in parts):
+            return None
+        path = self.root.joinpath(*parts).resolve()
+        if self.root not in path.parents or path.suffix not in CONTENT_TYPES or not path.is_file():
+            return None
+        return path
+
+    def get(self, path):
+        stamp = _stamp(path)
+        cached = self.entries.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        representations = Representations(
+            path.read_bytes(), CONTENT_TYPES[path.suffix], path.suffix in COMPRESSIBLE,
+        )
+        if representations.compressible:
+            for encoding, suffix in SIBLING_SUFFIXES.items():
+                sibling = path.with_name(path.name + suffix)
+                try:
+                    fresh = sibling.stat().st_mtime_ns >= stamp[0]
+                except OSError:
+                    continue
+                if fresh and encoding in representations.offered():
+                    representations.bodies[encoding] = sibling.read_bytes()
+        self.entries[path] = (stamp, representations)
+        return representations
+
+
+def _bound(query, name):
+    value = query.get(name)
+    if value is None:
+        return None
+    value = value.upper()
+    if not _PERIOD_LABEL_RE.match(value):
+        raise HTTPError(400, f"'{name}' must be a fiscal period like FY2024 or FY2025-Q2")
+    if name == 'from' and '-' not in value:
+        # A bare year covers the whole fiscal year, its quarters included
+        return int(value[2:]), 0
+    return period_order(value)
+
+
+def select_points(entry, query):
+    """The entry's points, oldest first, limited to the inclusive ?from=&to= period range."""
+    low, high = _bound(query, 'from'), _bound(query, 'to')
+    points = []
+    for period in entry['periods']:
+        order = period_order(period)
+        if (low is None or order >= low) and (high is None or order <= high):
+            points.append(entry['points'][period])
+    return points
+
+
+def catalogue(index):
+    return {
+        'last_updated': index.last_updated,
+        'metrics': [
+            {'key': key, 'name': entry['name'], 'periods': len(entry['periods']),
+             'first': (entry['periods'] or [None])[0], 'latest': entry['latest']}
+            for key, entry in index.metrics.items()
+        ],
+        'sales': {
+            dimension: [{'key': member_key(member), 'member': member} for member in index.members.get(dimension, [])]
+            for dimension in DIMENSIONS
+        },
+    }
+
+
+def period_slice(index, period):
+    metrics = {key: entry['points'][period] for key, entry in index.metrics.items() if period in entry['points']}
+    sales = {dimension: {} for dimension in DIMENSIONS}
+    for (dimension, key), entry in index.sales.items():
+        if period in entry['points']:
+            sales.setdefault(dimension, {})[key] = entry['points'][period]
+    if not metrics and not any(sales.values()):
+        raise HTTPError(404, f'No data for {period}')
+    return {'period': period, 'metrics': metrics, 'sales': sales}
+
+
+def _date_bound(query, name):
+    value = query.get(name)
+    if value is not None and not _ISO_DATE_RE.match(value):
+        raise HTTPError(400, f"'{name}' must be a date like 2024-09-28")
+    return value
+
+
+def _fiscal_year(query):
+    value = query.get('fy')
+    if value is None or not value.isdigit():
+        raise HTTPError(400, "'fy' must be a fiscal year like 2025")
+    return int(value)
+
+
+def warehouse_lookup(path, lookup):
+    """Run lookup(warehouse) against the warehouse at path; 503 while it has not been built."""
+    if not Path(path).exists():
+        raise HTTPError(503, 'The fact warehouse has not been built (python scripts/fact_warehouse.py)')
+    with FactWarehouse(path) as warehouse:
+        return lookup(warehouse)
+
+
+class SliceCache:
+    """
+    Serialized slice bodies for the current index; dropped wholesale when the
+    index is swapped. Keys include the query string, so the most recently used
+    `max_entries` are kept rather than one per distinct URL ever requested.
+    """
+
+    def __init__(self, loader, max_entries=SLICE_CACHE_SIZE):
+        self.loader = loader
+        self.max_entries = max_entries
+        self.index = None
+        self.entries = OrderedDict()
+
+    def get(self, target, build):
+        index = self.loader.index
+        if index is None:
+            raise HTTPError(503, 'The financial data is not loaded yet')
+        if index is not self.index:
+            self.index, self.entries = index, OrderedDict()
+        representations = self.entries.get(target)
+        if representations is not None:
+            self.entries.move_to_end(target)
+            return representations
+        body = json.dumps(build(index), separators=(',', ':'), default=str).encode('utf-8')
+        representations = self.entries[target] = Representations(body, 'application/json')
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return representations
+
+
+def create_app(loader, root=REPO_ROOT, feed=None, warehouse_path=WAREHOUSE_PATH):
+    app = App()
+    files = FileCache(root)
+    slices = SliceCache(loader)
+
+    def cache_key(request):
+        return (request.path, tuple(sorted(request.query.items())))
+
+    @app.route('GET', '/api/metrics')
+    async def metrics(request):
+        return slices.get(cache_key(request), catalogue).response(request)
+
+    @app.route('GET', '/api/metrics/{key}')
+    async def metric(request):
+        def build(index):
+            entry = index.metrics.get(request.params['key'])
+            if entry is None:
+                raise HTTPError(404, f"Unknown metric '{request.params['key']}'")
+            return {'key': entry['key'], 'name': entry['name'], 'source_field': entry['source_field'],
+                    'latest': entry['latest'], 'points': select_points(entry, request.query)}
+        return slices.get(cache_key(request), build).response(request)
+
+    @app.route('GET', '/api/sales/{dimension}/{member}')
+    async def sales(request):
+        def build(index):
+            entry = index.sales_entry(request.params['dimension'], request.params['member'])
+            if entry is None:
+                raise HTTPError(404, f"Unknown {request.params['dimension']} '{request.params['member']}'")
+            return {'dimension': entry['dimension'], 'member': entry['member'], 'latest': entry['latest'],
+                    'points': select_points(entry, request.query)}
+        return slices.get(cache_key(request), build).response(request)
+
+    @app.route('GET', '/api/periods/{period}')
+    async def period(request):
+        label = request.params['period'].upper()
+        if not _PERIOD_LABEL_RE.match(label):
+            raise HTTPError(400, 'Periods look like FY2024 or FY2025-Q2')
+        return slices.get(cache_key(request), lambda index: period_slice(index, label)).response(request)
+
+    async def from_warehouse(request, lookup):
+        # sqlite reads happen off the event loop
+        body = await asyncio.get_running_loop().run_in_executor(None, lambda: json.dumps(
+            warehouse_lookup(warehouse_path, lookup), separators=(',', ':'), default=str,
+        ).encode('utf-8'))
+        return Representations(body, 'application/json').response(request)
+
+    @app.route('GET', '/api/facts')
+    async def period_facts(request):
+        form, fy = request.query.get('form'), _fiscal_year(request.query)
+        if not form:
+            raise HTTPError(400, "'form' is required, e.g. form=10-Q")
+        fp = request.query.get('fp')
+        fp = fp.upper() if fp else None
+        return await from_warehouse(request, lambda warehouse: {
+            'form': form, 'fy': fy, 'fp': fp,
+            'facts': warehouse.facts_for_period(form, fy, fp, request.query.get('concept')),
+        })
+
+    @app.route('GET', '/api/facts/{concept}')
+    async def concept_facts(request):
+        concept, unit = request.params['concept'], request.query.get('unit', 'USD')
+        start, end = _date_bound(request.query, 'start'), _date_bound(request.query, 'end')
+        return await from_warehouse(request, lambda warehouse: {
+            'concept': concept, 'unit': unit,
+            'facts': warehouse.concept_series(concept, request.query.get('form'), start, end, unit),
+        })
+
+    @app.route('GET', '/api/facts/{concept}/latest')
+    async def latest_fact(request):
+        concept = request.params['concept']
+
+        def lookup(warehouse):
+            fact = warehouse.latest(concept, request.query.get('form'), request.query.get('unit', 'USD'))
+            if fact is None:
+                raise HTTPError(404, f"No facts for '{concept}'")
+            return fact
+        return await from_warehouse(request, lookup)
+
+    @app.route('GET', '/api/filings/{accession}')
+    async def filing(request):
+        accession = request.params['accession']
+
+        def lookup(warehouse):
+            facts, rows = warehouse.facts_for_accession(accession), warehouse.filing_rows(accession)
+            if not facts and not rows:
+                raise HTTPError(404, f"Nothing recorded for accession '{accession}'")
+            return {'accession': accession, 'facts': facts, 'rows': rows}
+        return await from_warehouse(request, lookup)
+
+    if feed is not None:
+        @app.route('GET', '/events')
+        async def events(request):
+            return StreamResponse(feed.stream(request.headers.get('last-event-id')),
+                                  headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    @app.route('GET', '/')
+    async def index_page(request):
+        return await static(request, INDEX_PAGE)
+
+    @app.route('GET', '/{path:path}')
+    async def static_file(request):
+        return await static(request, request.params['path'])
+
+    async def static(request, relative):
+        path = files.resolve(relative)
+        if path is None:
+            raise HTTPError(404)
+        try:
+            # Reading and compressing a changed file happens off the event loop
+            return await asyncio.get_running_loop().run_in_executor(
+                None, lambda: files.get(path).response(request),
+            )
+        except FileNotFoundError:
+            raise HTTPError(404)
+
+    return app
+
+
+async def run(host, port, reload_interval):
+    loader = IndexLoader()
+    loader.reload_if_changed()
+    feed = ChangeFeed()
+    tasks = [asyncio.ensure_future(task) for task in
+             (loader.watch(reload_interval), feed.watch(reload_interval), feed.heartbeat())]
+    try:
+        await serve(create_app(loader, feed=feed), host, port)
+    finally:
+        feed.close()
+        for task in tasks:
+            task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the dashboards and their data with caching and compression')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to bind')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help='Seconds between checks for changed data files')
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.reload_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Local SQLite warehouse of companyfacts, filing table rows and the sales series.
+
+Historical questions ("every 10-Q revenue fact since 2015", "everything
+reported in accession X") otherwise mean re-reading and re-processing the
+JSON outputs. The warehouse loads them once into indexed tables:
+
+    facts         one row per companyfacts fact (taxonomy, concept, unit, start, end, val, fy, fp, form, ...)
+    filing_rows   tidy 10-K/10-Q extractor rows with resolved fiscal periods
+    sales_series  the consolidated series from sales_series.py, derived Q4 included
+
+The database is rebuilt in full on every load: the rows are inserted with
+executemany inside a single transaction into a temporary file, the indexes are
+built once at the end, and the file is renamed over the old one. Readers
+therefore never see a half-loaded warehouse.
+
+Usage: python scripts/fact_warehouse.py [--db data/facts.sqlite]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from sales_series import (
+    SALES_SERIES_PATH, SOURCES, TEN_K_SUMMARY_PATH, TEN_Q_REGION_PATH, TEN_Q_SUMMARY_PATH, load_filings,
+    load_series, normalize_member, parse_period_label
+)
+
+WAREHOUSE_PATH = Path(__file__).resolve().parent.parent / 'data' / 'facts.sqlite'
+
+SCHEMA = """
+CREATE TABLE facts (
+    taxonomy TEXT NOT NULL,
+    concept TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    start TEXT,
+    "end" TEXT NOT NULL,
+    val REAL NOT NULL,
+    fy INTEGER,
+    fp TEXT,
+    form TEXT,
+    accession TEXT,
+    filed TEXT,
+    frame TEXT
+);
+CREATE TABLE filing_rows (
+    form TEXT NOT NULL,
+    section TEXT NOT NULL,
+    accession TEXT,
+    filed TEXT,
+    dimension TEXT NOT NULL,
+    member TEXT,
+    label TEXT,
+    period TEXT,
+    fiscal_year INTEGER,
+    fiscal_period TEXT,
+    "end" TEXT,
+    net_sales REAL,
+    percent_change REAL
+);
+CREATE TABLE sales_series (
+    dimension TEXT NOT NULL,
+    member TEXT NOT NULL,
+    period TEXT NOT NULL,
+    fiscal_year INTEGER NOT NULL,
+    fiscal_period TEXT NOT NULL,
+    "end" TEXT,
+    net_sales REAL,
+    percent_change REAL,
+    form TEXT,
+    accession TEXT,
+    filed TEXT,
+    derived INTEGER NOT NULL
+);
+"""
+
+# Built after the bulk insert. The facts indexes carry the columns the query
+# API selects, so those lookups are answered from the index alone.
+INDEXES = """
+CREATE INDEX idx_facts_concept_end ON facts (concept, "end", start, val, unit, fy, fp, form, accession, filed);
+CREATE INDEX idx_facts_form_period ON facts (form, fy, fp, concept, "end", start, val, unit, accession, filed);
+CREATE INDEX idx_facts_accession ON facts (accession, concept, "end", start, val, unit, fy, fp, form, filed);
+CREATE INDEX idx_filing_rows_accession ON filing_rows (accession);
+CREATE INDEX idx_filing_rows_period ON filing_rows (form, fiscal_year, fiscal_period);
+CREATE INDEX idx_sales_series_member ON sales_series (dimension, member, fiscal_year, fiscal_period);
+CREATE INDEX idx_sales_series_period ON sales_series (fiscal_year, fiscal_period);
+"""
+
+FACT_COLUMNS = ('taxonomy', 'concept', 'unit', 'start', 'end', 'val', 'fy', 'fp', 'form', 'accession', 'filed', 'frame')
+FACT_SELECT = 'concept, unit, start, "end", val, fy, fp, form, accession, filed'
+FILING_ROW_COLUMNS = ('form', 'section', 'accession', 'filed', 'dimension', 'member', 'label', 'period',
+                      'fiscal_year', 'fiscal_period', 'end', 'net_sales', 'percent_change')
+SALES_SERIES_COLUMNS = ('dimension', 'member', 'period', 'fiscal_year', 'fiscal_period', 'end', 'net_sales',
+                        'percent_change', 'form', 'accession', 'filed', 'derived')
+
+
+def _insert_sql(table, columns):
+    names = ', '.join(f'"{c}"' for c in columns)
+    return f'INSERT INTO {table} ({names}) VALUES ({", ".join("?" * len(columns))})'
+
+
+# --- Row builders ---
+
+def iter_fact_rows(companyfacts):
+    """Flatten companyfacts {'facts': {taxonomy: {concept: {'units': {unit: [fact, ...]}}}}}."""
+    for taxonomy, concepts in (companyfacts or {}).get('facts', {}).items():
+        for concept, body in concepts.items():
+            for unit, facts in body.get('units', {}).items():
+                for fact in facts:
+                    if fact.get('end') is None or fact.get('val') is None:
+                        continue
+                    yield (taxonomy, concept, unit, fact.get('start'), fact['end'], fact['val'], fact.get('fy'),
+                           fact.get('fp'), fact.get('form'), fact.get('accn'), fact.get('filed'), fact.get('frame'))
+
+
+def iter_filing_rows(filings, form):
+    for filing in filings:
+        for section, dimension in SOURCES.items():
+            for row in filing.get(section) or []:
+                if 'year' in row:
+                    period, (fiscal_year, fiscal_period, end) = str(row['year']), (row['year'], 'FY', None)
+                else:
+                    period = row.get('period')
+                    fiscal_year, fiscal_period, end = parse_period_label(period) or (None, None, None)
+                yield (form, section, filing.get('accession'), filing.get('date'), dimension,
+                       normalize_member(row.get(dimension)), row.get(dimension), period, fiscal_year,
+                       fiscal_period, end, row.get('net_sales'), row.get('percent_change'))
+
+
+def iter_series_rows(series):
+    for record in series:
+        yield tuple(int(bool(record.get(c))) if c == 'derived' else record.get(c) for c in SALES_SERIES_COLUMNS)
+
+
+# --- Build ---
+
+def build_warehouse(path=WAREHOUSE_PATH, companyfacts=None, ten_k=(), ten_q=(), ten_q_region=(), series=()):
+    """Rebuild the warehouse at `path` from scratch. Returns {table: row count}."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.sqlite.tmp')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=OFF')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('BEGIN')
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.executemany(_insert_sql('facts', FACT_COLUMNS), iter_fact_rows(companyfacts))
+            conn.executemany(_insert_sql('filing_rows', FILING_ROW_COLUMNS), iter_filing_rows(ten_k, '10-K'))
+            conn.executemany(_insert_sql('filing_rows', FILING_ROW_COLUMNS), iter_filing_rows(ten_q, '10-Q'))
+            conn.executemany(_insert_sql('filing_rows', FILING_ROW_COLUMNS), iter_filing_rows(ten_q_region, '10-Q'))
+            conn.executemany(_insert_sql('sales_series', SALES_SERIES_COLUMNS), iter_series_rows(series))
+            for statement in INDEXES.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute('COMMIT')
+            conn.execute('ANALYZE')
+            counts = {
+                table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('facts', 'filing_rows', 'sales_series')
+            }
+        finally:
+            conn.close()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return counts
+
+
+# --- Query API ---
+
+class FactWarehouse:
+    """Read-side helpers over a built warehouse. Rows come back as dicts."""
+
+    def __init__(self, path=WAREHOUSE_PATH):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def query(self, sql, params=()):
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def concept_series(self, concept, form=None, start=None, end=None, unit='USD'):
+        """Facts for one concept ordered by period end, optionally limited to a form and an end-date range."""
+        sql = f'SELECT {FACT_SELECT} FROM facts WHERE concept = ? AND unit = ?'
+        params = [concept, unit]
+        if start:
+            sql += ' AND "end" >= ?'
+            params.append(start)
+        if end:
+            sql += ' AND "end" <= ?'
+            params.append(end)
+        if form:
+            sql += ' AND form = ?'
+            params.append(form)
+        return self.query(sql + ' ORDER BY "end", filed', params)
+
+    def latest(self, concept, form=None, unit='USD'):
+        """Most recent fact for a concept (latest period end, then latest filing)."""
+        sql = f'SELECT {FACT_SELECT} FROM facts WHERE concept = ? AND unit = ?'
+        params = [concept, unit]
+        if form:
+            sql += ' AND form = ?'
+            params.append(form)
+        rows = self.query(sql + ' ORDER BY "end" DESC, filed DESC LIMIT 1', params)
+        return rows[0] if rows else None
+
+    def facts_for_period(self, form, fy, fp=None, concept=None):
+        """Facts reported on a form for a fiscal year (and period, e.g. 'Q2' or 'FY')."""
+        sql = f'SELECT {FACT_SELECT} FROM facts WHERE form = ? AND fy = ?'
+        params = [form, fy]
+        if fp:
+            sql += ' AND fp = ?'
+            params.append(fp)
+        if concept:
+            sql += ' AND concept = ?'
+            params.append(concept)
+        return self.query(sql, params)
+
+    def facts_for_accession(self, accession):
+        return self.query(f'SELECT {FACT_SELECT} FROM facts WHERE accession = ? ORDER BY concept, "end"', [accession])
+
+    def filing_rows(self, accession):
+        return self.query('SELECT * FROM filing_rows WHERE accession = ?', [accession])
+
+
+def populate_from_outputs(companyfacts, path=WAREHOUSE_PATH):
+    """Build the warehouse from companyfacts plus the extractor and series outputs on disk."""
+    try:
+        series = load_series(SALES_SERIES_PATH)
+    except FileNotFoundError:
+        series = []
+    return build_warehouse(
+        path,
+        companyfacts=companyfacts,
+        ten_k=load_filings(TEN_K_SUMMARY_PATH),
+        ten_q=load_filings(TEN_Q_SUMMARY_PATH),
+        ten_q_region=load_filings(TEN_Q_REGION_PATH),
+        series=series,
+    )
+
+
+def main():
+    from apple_sec_data_parser import AppleSECDataParser
+
+    parser = argparse.ArgumentParser(description="Build the SQLite fact warehouse")
+    parser.add_argument('--db', type=str, default=str(WAREHOUSE_PATH), help='Warehouse database path')
+    args = parser.parse_args()
+    sec = AppleSECDataParser()
+    if not sec.fetch_sec_data():
+        return
+    counts = populate_from_outputs(sec.raw_data, args.db)
+    print(f"Warehouse written to {args.db}: " + ', '.join(f"{n} {table}" for table, n in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
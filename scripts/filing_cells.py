@@ -0,0 +1,133 @@
+"""
+Cell normalization for tables scraped from 10-K/10-Q filings.
+
+`normalize_table` classifies and parses every cell of an `extract_table_data`
+matrix once, using precompiled patterns, and returns typed numpy arrays
+(value, kind) that the extractors index into instead of re-cleaning the same
+strings cell by cell. Amounts are expressed in the table's unit: a cell with
+its own scale word is converted, so '$1.2 billion' in an '(In millions)'
+table reads 1200.0, and in a table without a unit hint 1.2e9.
+
+Handled formats:
+  - '$', ',' and whitespace around numbers:  '$ 1,234.5'  -> 1234.5
+  - parentheses as negatives:                '(15)'       -> -15.0
+  - percentages, with or without parens:     '(2)%'       -> -2.0 (KIND_PERCENT)
+  - em/en dashes as reported zeros:          '—'          -> 0.0  (KIND_DASH)
+  - scale hints, per cell or per table:      '$1.2 billion', '(In millions)'
+"""
+
+import re
+
+import numpy as np
+
+KIND_EMPTY = 0
+KIND_TEXT = 1
+KIND_NUMBER = 2
+KIND_PERCENT = 3
+KIND_DASH = 4
+
+# Kinds that carry a usable numeric value
+VALUE_KINDS = (KIND_NUMBER, KIND_PERCENT, KIND_DASH)
+
+SCALE_WORDS = {
+    'thousand': 1_000,
+    'million': 1_000_000,
+    'billion': 1_000_000_000,
+}
+
+_NUMBER_RE = re.compile(
+    r'^(?P<open>\()?\s*\$?\s*(?P<sign>-)?\s*\$?\s*'
+    r'(?P<num>\d[\d,]*(?:\.\d+)?|\.\d+)\s*'
+    r'(?P<pct>%)?\s*'
+    r'(?:(?P<scale>thousand|million|billion)s?)?\s*'
+    r'(?P<close>\))?\s*(?P<pct_after>%)?$',
+    re.IGNORECASE,
+)
+_DASH_RE = re.compile(r'^\$?\s*[—–−-]+\s*%?$')
+_SCALE_HINT_RE = re.compile(r'\bin (thousand|million|billion)s\b', re.IGNORECASE)
+
+
+def parse_cell(text):
+    """Classify one cell. Returns (value, kind, scale); value is None for non-numeric kinds."""
+    if isinstance(text, (int, float)):
+        return float(text), KIND_NUMBER, 1
+    if not isinstance(text, str):
+        return None, KIND_EMPTY, 1
+    text = text.strip()
+    if not text:
+        return None, KIND_EMPTY, 1
+    match = _NUMBER_RE.match(text)
+    if match:
+        value = float(match.group('num').replace(',', ''))
+        if match.group('sign') or (match.group('open') and match.group('close')):
+            value = -value
+        if match.group('pct') or match.group('pct_after'):
+            return value, KIND_PERCENT, 1
+        scale = match.group('scale')
+        return value, KIND_NUMBER, SCALE_WORDS[scale.lower()] if scale else 1
+    if _DASH_RE.match(text):
+        return 0.0, KIND_DASH, 1
+    return None, KIND_TEXT, 1
+
+
+class NormalizedTable:
+    """
+    Parsed view of a table. `values` and `kinds` are (rows x width) arrays
+    padded to the widest row; padding cells are KIND_EMPTY with a NaN value.
+    `scale_hint` is the table's unit ('(In millions)' -> 1_000_000, else 1).
+    `rows` keeps the original strings for label and marker lookups.
+    """
+
+    def __init__(self, rows, values, kinds, scale_hint):
+        self.rows = rows
+        self.values = values
+        self.kinds = kinds
+        self.scale_hint = scale_hint
+
+    def kind(self, r, c):
+        if c < 0 or c >= self.kinds.shape[1]:
+            return KIND_EMPTY
+        return int(self.kinds[r, c])
+
+    def value(self, r, c, kinds=VALUE_KINDS):
+        """Parsed value at (r, c) if its kind is in `kinds`, else None."""
+        if self.kind(r, c) not in kinds:
+            return None
+        return float(self.values[r, c])
+
+    def text(self, r, c):
+        row = self.rows[r]
+        return row[c] if 0 <= c < len(row) else None
+
+
+def normalize_table(table_data):
+    """Parse every cell of `table_data` in one pass."""
+    n_rows = len(table_data)
+    width = max((len(row) for row in table_data), default=0)
+    values = np.full((n_rows, width), np.nan, dtype=np.float64)
+    kinds = np.full((n_rows, width), KIND_EMPTY, dtype=np.int8)
+    scales = np.ones((n_rows, width), dtype=np.int64)
+    # colspan expansion repeats the same strings many times per table
+    parsed = {}
+    scale_hint = 1
+    for r, row in enumerate(table_data):
+        for c, cell in enumerate(row):
+            result = parsed.get(cell) if isinstance(cell, str) else None
+            if result is None:
+                result = parse_cell(cell)
+                if isinstance(cell, str):
+                    parsed[cell] = result
+                    if result[1] == KIND_TEXT and scale_hint == 1:
+                        hint = _SCALE_HINT_RE.search(cell)
+                        if hint:
+                            scale_hint = SCALE_WORDS[hint.group(1).lower()]
+            value, kind, scale = result
+            kinds[r, c] = kind
+            scales[r, c] = scale
+            if value is not None:
+                values[r, c] = value
+    # Amounts with their own unit ('$1.2 billion') are converted to the table's unit
+    own_unit = (kinds == KIND_NUMBER) & (scales != 1)
+    if own_unit.any():
+        values[own_unit] *= scales[own_unit] / scale_hint
+    return NormalizedTable(table_data, values, kinds, scale_hint)
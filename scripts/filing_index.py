@@ -0,0 +1,188 @@
+"""
+Full-history filing index built from the SEC submissions API.
+
+`submissions/CIK##########.json` only inlines the most recent ~1000 filings
+under `filings.recent`; older filings live in the shard files listed under
+`filings.files`. This module merges both into one in-memory index that every
+extractor filters by form type, instead of each script fetching the
+submissions JSON itself and silently stopping at `recent`.
+
+Responses are cached in data/filing_index/. The main submissions JSON is
+revalidated with If-None-Match / If-Modified-Since, so an unchanged index
+costs a single 304. Shards cover closed date ranges and never change once
+written, so they are only downloaded once, concurrently.
+"""
+
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+from instrumentation import count, span
+from log_setup import get_logger
+
+CIK = '320193'  # Apple
+HEADERS = {'User-Agent': "apple-dashboard@example.com"}
+SUBMISSIONS_BASE_URL = 'https://data.sec.gov/submissions/'
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent.parent / 'data' / 'filing_index'
+FIELDS = ('accessionNumber', 'filingDate', 'reportDate', 'form', 'primaryDocument')
+
+log = get_logger('filing_index')
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def conditional_get(url, cache_path, session=None, headers=HEADERS):
+    """
+    GET `url` as JSON, revalidating against the copy cached at `cache_path`.
+
+    Returns (data, changed). On 304 the cached copy is returned with
+    changed=False. If the request fails and a cached copy exists, that copy
+    is used so the index keeps working offline.
+    """
+    cache_path = Path(cache_path)
+    meta_path = cache_path.with_name(cache_path.name + '.meta')
+    request_headers = dict(headers)
+    cached = cache_path.exists()
+    if cached and meta_path.exists():
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+    http = session or requests
+    try:
+        with span('fetch', url=url):
+            resp = http.get(url, headers=request_headers, timeout=30)
+        count('http_requests', status=resp.status_code)
+        if resp.status_code == 304 and cached:
+            with open(cache_path) as f:
+                return json.load(f), False
+        resp.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        count('http_requests', status='error')
+        if not cached:
+            raise
+        log.warning('Could not revalidate %s (%s); using cached copy', url, e)
+        with open(cache_path) as f:
+            return json.load(f), False
+    count('bytes_fetched', len(resp.content), source=cache_path.stem)
+    with span('parse', source=cache_path.stem):
+        data = resp.json()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_json(cache_path, data)
+    _write_json(meta_path, {
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+    })
+    return data, True
+
+
+class FilingIndex:
+    """
+    Column-oriented list of every filing for one CIK, newest first, one entry
+    per accession number.
+    """
+
+    def __init__(self, cik, columns):
+        self.cik = cik
+        order = sorted(range(len(columns['accessionNumber'])),
+                       key=lambda i: columns['filingDate'][i], reverse=True)
+        seen = set()
+        self.columns = {field: [] for field in FIELDS}
+        for i in order:
+            accession = columns['accessionNumber'][i]
+            if accession in seen:
+                continue
+            seen.add(accession)
+            for field in FIELDS:
+                values = columns.get(field)
+                self.columns[field].append(values[i] if values and i < len(values) else '')
+
+    @classmethod
+    def from_submissions(cls, cik, submissions, shards=()):
+        """Merge `filings.recent` with already-loaded shard payloads."""
+        columns = {field: [] for field in FIELDS}
+        for block in [submissions['filings']['recent'], *shards]:
+            n = len(block['accessionNumber'])
+            for field in FIELDS:
+                columns[field].extend(block.get(field) or [''] * n)
+        return cls(cik, columns)
+
+    def __len__(self):
+        return len(self.columns['accessionNumber'])
+
+    def accessions(self, forms=None):
+        forms = {forms} if isinstance(forms, str) else set(forms) if forms else None
+        return {
+            accession for accession, form in zip(self.columns['accessionNumber'], self.columns['form'])
+            if forms is None or form in forms
+        }
+
+    def filter(self, forms, count=None):
+        """
+        Filings of the given form type(s), newest first, as the
+        {'url', 'date', 'accession', ...} dicts the extractors iterate over.
+        """
+        forms = {forms} if isinstance(forms, str) else set(forms)
+        cols = self.columns
+        urls = []
+        for i, form in enumerate(cols['form']):
+            if form not in forms:
+                continue
+            accession = cols['accessionNumber'][i]
+            doc_url = (f'https://www.sec.gov/Archives/edgar/data/{int(self.cik)}/'
+                       f'{accession.replace("-", "")}/{cols["primaryDocument"][i]}')
+            urls.append({
+                'url': doc_url,
+                'date': cols['filingDate'][i],
+                'accession': accession,
+                'form': form,
+                'report_date': cols['reportDate'][i],
+            })
+            if count and len(urls) >= count:
+                break
+        return urls
+
+
+def fetch_filing_index(cik=CIK, index_dir=DEFAULT_INDEX_DIR, max_workers=4):
+    """Fetch (or revalidate) the submissions JSON and all of its shards."""
+    index_dir = Path(index_dir)
+    name = f'CIK{int(cik):010d}.json'
+    with requests.Session() as session:
+        submissions, _ = conditional_get(SUBMISSIONS_BASE_URL + name, index_dir / name, session)
+        shard_names = [f['name'] for f in submissions['filings'].get('files', [])]
+
+        def load_shard(shard_name):
+            path = index_dir / shard_name
+            if path.exists():
+                with open(path) as f:
+                    return json.load(f)
+            return conditional_get(SUBMISSIONS_BASE_URL + shard_name, path, session)[0]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            shards = list(pool.map(load_shard, shard_names))
+    return FilingIndex.from_submissions(cik, submissions, shards)
+
+
+_indexes = {}
+
+
+def get_filing_index(cik=CIK, refresh=False):
+    """Process-wide index, fetched once and shared by every extractor."""
+    if refresh or cik not in _indexes:
+        _indexes[cik] = fetch_filing_index(cik)
+    return _indexes[cik]
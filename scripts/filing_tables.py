@@ -0,0 +1,136 @@
+"""
+Shared helpers for tidying tables scraped from 10-K/10-Q filings.
+
+The extractors in 10-K/ and 10-Q/ turn the raw cell matrices produced by
+`extract_table_data` into long-format records. The helpers here do that in a
+single pass over the table so the cost stays linear in the number of cells.
+"""
+
+from filing_cells import normalize_table
+
+
+def is_year(val):
+    try:
+        year = int(str(val).strip())
+        return 2000 <= year <= 2100
+    except Exception:
+        return False
+
+
+def find_header_row(table_data):
+    # First row with at least one non-empty cell after the label column
+    for i, row in enumerate(table_data):
+        if len(row) > 1 and any(str(cell).strip() for cell in row[1:]):
+            return i, row
+    return 0, table_data[0] if table_data else []
+
+
+def find_year_columns(header):
+    """Return [(column index, year), ...] for every year cell in the header row."""
+    return [(i, int(str(col).strip())) for i, col in enumerate(header) if is_year(col)]
+
+
+def index_rows_by_label(table_data, clean_label, start=0):
+    """
+    Build an ordered label -> row position index in one pass.
+
+    The first row carrying a label wins, which matches the old rescanning
+    behaviour. Dict insertion order keeps the table's row order, so callers
+    get stable output between runs.
+    """
+    index = {}
+    for r in range(start, len(table_data)):
+        row = table_data[r]
+        if not row or not isinstance(row[0], str):
+            continue
+        label = clean_label(row[0].strip())
+        if label and label not in index:
+            index[label] = r
+    return index
+
+
+def tidy_multi_year_table(table_data, member_key, member_type, clean_label, value_fn,
+                          change_fn=None, include_previous=False):
+    """
+    Tidy a multi-year comparison table (label column followed by one block of
+    columns per fiscal year) into long-format records.
+
+    member_key:  name of the record field holding the row label ('product', 'region', ...)
+    member_type: type recorded for non-total rows ('product', 'region', ...)
+    value_fn:    value_fn(cells, r, year_cols, idx) -> number or None for year
+                 block idx of row r, where cells is the filing_cells.NormalizedTable
+    change_fn:   optional change_fn(cells, r, year_cols, idx) -> percent change or None
+    include_previous: attach the next (older) year block as previous_year fields
+
+    Records come out in table row order, then header year order.
+    """
+    if not table_data or len(table_data) < 2:
+        return []
+
+    header_idx, header = find_header_row(table_data)
+    year_cols = find_year_columns(header)
+    rows_by_label = index_rows_by_label(table_data, clean_label, start=header_idx+1)
+    cells = normalize_table(table_data)
+
+    tidy_rows = []
+    for label, r in rows_by_label.items():
+        row_type = 'total' if label.lower().startswith('total') else member_type
+        for idx, (col_idx, year) in enumerate(year_cols):
+            net_sales = value_fn(cells, r, year_cols, idx)
+            # Only create record if we have net sales data
+            if net_sales is None:
+                continue
+            record = {
+                "type": row_type,
+                member_key: label,
+                "year": year,
+                "net_sales": net_sales
+            }
+            if change_fn is not None:
+                percent_change = change_fn(cells, r, year_cols, idx)
+                if percent_change is not None:
+                    record["percent_change"] = percent_change
+            # Add previous year data if available
+            if include_previous and idx + 1 < len(year_cols):
+                prev_net_sales = value_fn(cells, r, year_cols, idx + 1)
+                if prev_net_sales is not None:
+                    record.update({
+                        "previous_year": year_cols[idx + 1][1],
+                        "previous_year_net_sales": prev_net_sales
+                    })
+            tidy_rows.append(record)
+    return tidy_rows
+
+
+# --- Columnar results ---
+# Extractors can hand back {field: [values...]} instead of a list of dicts.
+# Columns from many filings are merged by list concatenation, with no
+# per-record dict work, and only turned into records when written out.
+
+def new_columns(fields):
+    return {field: [] for field in fields}
+
+
+def concat_columns(column_sets):
+    """Merge column dicts from several tables/filings into one."""
+    merged = {}
+    total = 0
+    for columns in column_sets:
+        length = len(next(iter(columns.values()), []))
+        for field in columns:
+            if field not in merged:
+                # Back-fill fields that earlier column sets did not have
+                merged[field] = [None] * total
+        for field, values in merged.items():
+            values.extend(columns.get(field, [None] * length))
+        total += length
+    return merged
+
+
+def columns_to_records(columns):
+    """Turn a column dict back into records, dropping None-valued fields."""
+    fields = list(columns)
+    return [
+        {field: value for field, value in zip(fields, values) if value is not None}
+        for values in zip(*(columns[field] for field in fields))
+    ]
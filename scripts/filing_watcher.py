@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Long-running watcher that refreshes only when Apple files something.
+
+Every `--interval` (10 minutes) the watcher revalidates the submissions JSON
+with a conditional GET; while nothing is filed that is a single 304. New
+10-K, 10-Q or 8-K accession numbers launch just the pipeline stages that
+depend on them (pipeline.py skips whatever their content hashes say is
+unchanged):
+
+    10-K   extract_10k, derive_sales, warehouse, text_index, publish
+    10-Q   extract_10q, extract_10q_region, derive_sales, warehouse, text_index, publish
+    8-K    derive_dashboard, publish          (earnings releases precede the XBRL facts)
+
+companyfacts is large and only changes after a filing, so it is revalidated
+every `--facts-interval` (6 hours), and on every tick while a new 10-K/10-Q
+is not in it yet. When it changes, the dashboard and warehouse stages run.
+Both responses are cached where the pipeline's own fetch stages look, so the
+pipeline run that follows a detection revalidates them with 304s too.
+
+Seen accessions are kept in data/pipeline/watcher.json; the first run only
+records what is already filed. The stages a detection asks for stay pending
+there until a pipeline run completes all of them (every result ran or
+skipped), so a failed or interrupted run is retried on the next tick even
+though the filing is no longer new.
+
+Usage: python scripts/filing_watcher.py [--interval 600] [--facts-interval 21600] [--once]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from filing_index import CIK, DEFAULT_INDEX_DIR, SUBMISSIONS_BASE_URL, FilingIndex, conditional_get
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from output_writer import atomic_write_text, load_existing
+from pipeline import PIPELINE_DIR, RAN, SKIPPED, print_results, refresh_pipeline
+
+WATCH_STATE_PATH = PIPELINE_DIR / 'watcher.json'
+COMPANYFACTS_PATH = PIPELINE_DIR / 'companyfacts.json'
+COMPANYFACTS_URL = 'https://data.sec.gov/api/xbrl/companyfacts/CIK{cik:010d}.json'
+POLL_INTERVAL = 600
+FACTS_INTERVAL = 6 * 3600
+# Stop polling companyfacts for a filing's facts after this long (not every 10-K/10-Q is tagged at once)
+FACTS_WAIT = timedelta(days=2)
+FORM_TARGETS = {
+    '10-K': ('extract_10k', 'derive_sales', 'warehouse', 'text_index', 'publish'),
+    '10-Q': ('extract_10q', 'extract_10q_region', 'derive_sales', 'warehouse', 'text_index', 'publish'),
+    '8-K': ('derive_dashboard', 'publish'),
+}
+FACTS_TARGETS = ('derive_dashboard', 'warehouse', 'publish')
+XBRL_FORMS = ('10-K', '10-Q')
+
+log = get_logger('filing_watcher')
+
+
+def companyfacts_accessions(companyfacts):
+    """Every accession number that contributed a fact to a companyfacts payload."""
+    accessions = set()
+    for concepts in (companyfacts.get('facts') or {}).values():
+        for concept in concepts.values():
+            for records in (concept.get('units') or {}).values():
+                accessions.update(record.get('accn') for record in records)
+    accessions.discard(None)
+    return accessions
+
+
+class FilingWatcher:
+    """One check per `tick`; state survives restarts in `state_path`."""
+
+    def __init__(self, cik=CIK, forms=tuple(FORM_TARGETS), state_path=WATCH_STATE_PATH, index_dir=DEFAULT_INDEX_DIR,
+                 facts_path=COMPANYFACTS_PATH, fetch=conditional_get, pipeline=None, facts_interval=FACTS_INTERVAL):
+        self.cik = cik
+        self.forms = tuple(forms)
+        self.state_path = state_path
+        self.submissions_name = f'CIK{int(cik):010d}.json'
+        self.submissions_path = index_dir / self.submissions_name
+        self.facts_path = facts_path
+        self.fetch = fetch
+        self.pipeline = pipeline or refresh_pipeline()
+        self.facts_interval = timedelta(seconds=facts_interval)
+        self.state = load_existing(state_path) or {}
+
+    def save_state(self):
+        atomic_write_text(self.state_path, json.dumps(self.state, indent=2, sort_keys=True))
+
+    def new_filings(self):
+        """Filings of the watched forms not seen before, newest first (nothing on the very first check)."""
+        submissions, changed = self.fetch(SUBMISSIONS_BASE_URL + self.submissions_name, self.submissions_path)
+        if not changed and 'seen' in self.state:
+            return []
+        # New filings always appear in `filings.recent`; the older shards never change
+        filings = FilingIndex.from_submissions(self.cik, submissions).filter(self.forms)
+        first_check = 'seen' not in self.state
+        seen = set(self.state.get('seen', []))
+        new = [filing for filing in filings if filing['accession'] not in seen]
+        self.state['seen'] = sorted(seen | {filing['accession'] for filing in filings})
+        return [] if first_check else new
+
+    def facts_due(self, now):
+        if self.state.get('awaiting_facts'):
+            return True
+        last = self.state.get('facts_checked_at')
+        return last is None or now - datetime.fromisoformat(last) >= self.facts_interval
+
+    def check_facts(self, now):
+        """Revalidate companyfacts; True when it changed. Drops filings whose facts arrived or never will."""
+        facts, changed = self.fetch(COMPANYFACTS_URL.format(cik=int(self.cik)), self.facts_path)
+        self.state['facts_checked_at'] = now.isoformat(timespec='seconds')
+        awaiting = self.state.get('awaiting_facts', {})
+        if awaiting:
+            present = companyfacts_accessions(facts) if changed else set()
+            self.state['awaiting_facts'] = {
+                accession: since for accession, since in awaiting.items()
+                if accession not in present and now - datetime.fromisoformat(since) < FACTS_WAIT
+            }
+        return changed
+
+    def tick(self, now=None):
+        """One poll. Returns (targets, reasons); targets is empty when nothing changed."""
+        now = now or datetime.now()
+        targets, reasons = [], []
+        for filing in self.new_filings():
+            reasons.append(f"new {filing['form']} {filing['accession']} filed {filing['date']}")
+            targets.extend(FORM_TARGETS.get(filing['form'], ()))
+            if filing['form'] in XBRL_FORMS:
+                self.state.setdefault('awaiting_facts', {})[filing['accession']] = now.isoformat(timespec='seconds')
+        if self.facts_due(now) and self.check_facts(now):
+            reasons.append('companyfacts updated')
+            targets.extend(FACTS_TARGETS)
+        pending = self.state.get('pending', [])
+        if pending:
+            reasons.append(f"retrying {', '.join(pending)}")
+        targets = list(dict.fromkeys(pending + targets))
+        if targets:
+            self.state['pending'] = targets
+        self.save_state()
+        return targets, reasons
+
+    def run_once(self, now=None):
+        targets, reasons = self.tick(now)
+        if not targets:
+            return None
+        print(f"[{datetime.now().isoformat(timespec='seconds')}] {'; '.join(reasons)}")
+        print(f"Running pipeline stages: {', '.join(targets)}")
+        results = self.pipeline.run(targets)
+        print_results(results)
+        if all(result.status in (RAN, SKIPPED) for result in results):
+            self.state.pop('pending', None)
+            self.save_state()
+        else:
+            log.warning('Pipeline run did not complete; its stages will be retried on the next tick')
+        return results
+
+    def run_forever(self, interval=POLL_INTERVAL):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                # Network errors and failed stages are retried on the next tick
+                log.exception('Watch cycle failed: %s', e)
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the dashboard data when new SEC filings appear')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='Seconds between submissions checks')
+    parser.add_argument('--facts-interval', type=float, default=FACTS_INTERVAL,
+                        help='Seconds between companyfacts checks when no filing is pending')
+    parser.add_argument('--forms', nargs='+', default=list(FORM_TARGETS), choices=list(FORM_TARGETS),
+                        help='Form types that trigger a refresh')
+    parser.add_argument('--once', action='store_true', help='Check once and exit (for cron)')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    watcher = FilingWatcher(forms=args.forms, facts_interval=args.facts_interval)
+    if args.once:
+        watcher.run_once()
+    else:
+        print(f"Watching {', '.join(args.forms)} filings every {args.interval:.0f}s")
+        watcher.run_forever(args.interval)
+
+
+if __name__ == '__main__':
+    main()
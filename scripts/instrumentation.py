@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Lightweight timing, memory and counter instrumentation for the refresh.
+
+Code anywhere in the refresh marks its phases with nested spans and bumps
+counters through the module-level helpers:
+
+    with span('fetch', url=url):
+        ...
+    count('bytes_fetched', len(resp.content), source='companyfacts')
+    count('rows_dropped', n, rule='quarterly_span')
+
+Both are no-ops unless a Tracer is active, so the extractors and the parser
+cost nothing extra when run on their own. Pipeline.run activates one per
+run and writes its trace to data/pipeline/traces/<timestamp>.json: the span
+tree (start offset, seconds, thread, and with `memory=True` the tracemalloc
+peak above the span's starting allocation) plus every counter. Optionally
+the same run is written as a Prometheus textfile for node_exporter's
+textfile collector.
+
+Spans opened in worker threads nest under the thread's own open span, or
+under the run's root span. tracemalloc peaks are process-wide, so while
+stages overlap a span's peak includes its siblings' allocations; tracing
+memory also slows allocation-heavy code down noticeably, hence opt-in.
+
+Usage: python scripts/instrumentation.py [TRACE.json]   (summarizes the latest trace)
+"""
+
+import argparse
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from output_writer import atomic_write_text
+
+TRACE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'pipeline' / 'traces'
+KEEP_TRACES = 50
+METRIC_PREFIX = 'apple_refresh'
+
+_active = None
+_null_span = contextlib.nullcontext()
+
+
+def span(name, **attrs):
+    """A timing span under the active tracer; a shared no-op context when tracing is off."""
+    tracer = _active
+    if tracer is None:
+        return _null_span
+    return tracer.span(name, **attrs)
+
+
+def count(name, value=1, **labels):
+    tracer = _active
+    if tracer is not None:
+        tracer.count(name, value, **labels)
+
+
+def active_tracer():
+    return _active
+
+
+class Span:
+    __slots__ = ('name', 'attrs', 'thread', 'start', 'seconds', 'memory_start', 'peak', 'children')
+
+    def __init__(self, name, attrs, start):
+        self.name = name
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+        self.start = start
+        self.seconds = None
+        self.memory_start = None
+        self.peak = None
+        self.children = []
+
+    def to_dict(self, origin):
+        entry = {'name': self.name, 'start': round(self.start - origin, 6), 'seconds': round(self.seconds or 0.0, 6),
+                 'thread': self.thread}
+        if self.attrs:
+            entry['attrs'] = self.attrs
+        if self.peak is not None:
+            entry['peak_bytes'] = self.peak - self.memory_start
+        if self.children:
+            entry['children'] = [child.to_dict(origin) for child in self.children]
+        return entry
+
+    def walk(self, path=()):
+        path = path + (self.name,)
+        yield path, self
+        for child in self.children:
+            yield from child.walk(path)
+
+
+class Tracer:
+    """Collects one run's spans and counters while active (`with Tracer() as tracer:`)."""
+
+    def __init__(self, name='run', memory=False, **attrs):
+        self.memory = memory
+        self.started_at = datetime.now()
+        self.root = Span(name, attrs, time.perf_counter())
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._measuring = []
+        self._started_tracemalloc = False
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._previous, _active = _active, self
+        self._open(self.root)
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        self._close(self.root)
+        _active = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        return False
+
+    def _sample_peak(self):
+        # Fold the peak since the last sample into every open span, then restart peak tracking
+        _, peak = tracemalloc.get_traced_memory()
+        for open_span in self._measuring:
+            open_span.peak = max(open_span.peak, peak)
+        tracemalloc.reset_peak()
+
+    def _open(self, new_span):
+        if self.memory and tracemalloc.is_tracing():
+            with self._lock:
+                self._sample_peak()
+                new_span.memory_start = new_span.peak = tracemalloc.get_traced_memory()[0]
+                self._measuring.append(new_span)
+
+    def _close(self, closing):
+        closing.seconds = time.perf_counter() - closing.start
+        if closing in self._measuring:
+            with self._lock:
+                if tracemalloc.is_tracing():
+                    self._sample_peak()
+                self._measuring.remove(closing)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        parent = stack[-1] if stack else self.root
+        new_span = Span(name, attrs, time.perf_counter())
+        with self._lock:
+            parent.children.append(new_span)
+        self._open(new_span)
+        stack.append(new_span)
+        try:
+            yield new_span
+        finally:
+            stack.pop()
+            self._close(new_span)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter_total(self, name):
+        return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def trace(self):
+        origin = self.root.start
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'seconds': round(self.root.seconds if self.root.seconds is not None
+                             else time.perf_counter() - origin, 6),
+            'memory': self.memory,
+            'spans': self.root.to_dict(origin),
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(self.counters.items())],
+        }
+
+    def write(self, trace_dir=TRACE_DIR, keep=KEEP_TRACES):
+        """Write the trace as JSON; only the newest `keep` traces are kept. Returns the path."""
+        trace_dir = Path(trace_dir)
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        path = trace_dir / f"{self.started_at.strftime('%Y%m%dT%H%M%S%f')}.json"
+        atomic_write_text(path, json.dumps(self.trace(), indent=2, default=str))
+        for old in sorted(trace_dir.glob('*.json'))[:-keep]:
+            old.unlink()
+        return path
+
+    def prometheus(self, prefix=METRIC_PREFIX):
+        """The run in Prometheus text exposition format; spans are summed by name."""
+        seconds, peaks = {}, {}
+        for _, each in self.root.walk():
+            seconds[each.name] = seconds.get(each.name, 0.0) + (each.seconds or 0.0)
+            if each.peak is not None:
+                peaks[each.name] = max(peaks.get(each.name, 0), each.peak - each.memory_start)
+        families = [
+            ('span_seconds', 'Seconds spent in spans of this name during the last run',
+             [({'span': name}, value) for name, value in sorted(seconds.items())]),
+            ('span_peak_bytes', 'Largest tracemalloc peak above the starting allocation of a span of this name',
+             [({'span': name}, value) for name, value in sorted(peaks.items())]),
+        ]
+        counters = {}
+        for (name, labels), value in sorted(self.counters.items()):
+            counters.setdefault(name, []).append((dict(labels), value))
+        families.extend((name, f'{name} during the last run', samples) for name, samples in counters.items())
+        families.append(('last_run_timestamp_seconds', 'When the last run started',
+                         [({}, self.started_at.timestamp())]))
+        lines = []
+        for name, help_text, samples in families:
+            if not samples:
+                continue
+            metric = f'{prefix}_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} gauge')
+            for labels, value in samples:
+                lines.append(f'{metric}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Atomic, so the textfile collector never reads a half-written file."""
+        atomic_write_text(path, self.prometheus())
+        return Path(path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def print_trace(trace, min_seconds=0.01):
+    print(f"Run started {trace['started_at']}, {trace['seconds']:.2f}s")
+
+    def show(entry, depth):
+        line = f"{'  ' * depth}{entry['name']:<{max(1, 32 - 2 * depth)}} {entry['seconds']:8.3f}s"
+        if 'peak_bytes' in entry:
+            line += f"  peak +{entry['peak_bytes'] / 1e6:.1f} MB"
+        print(line)
+        for child in entry.get('children', []):
+            if child['seconds'] >= min_seconds:
+                show(child, depth + 1)
+
+    show(trace['spans'], 0)
+    if trace['counters']:
+        print('Counters:')
+        for counter in trace['counters']:
+            labels = ', '.join(f'{key}={value}' for key, value in counter['labels'].items())
+            print(f"  {counter['name']}{f' ({labels})' if labels else ''}: {counter['value']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a refresh trace')
+    parser.add_argument('trace', nargs='?', help='Trace file (default: the latest in data/pipeline/traces)')
+    parser.add_argument('--min-seconds', type=float, default=0.01, help='Hide spans shorter than this')
+    args = parser.parse_args()
+    path = Path(args.trace) if args.trace else max(TRACE_DIR.glob('*.json'), default=None)
+    if path is None:
+        parser.error(f'No traces in {TRACE_DIR}')
+    with open(path) as f:
+        print_trace(json.load(f), args.min_seconds)
+
+
+if __name__ == '__main__':
+    main()
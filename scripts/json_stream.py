@@ -0,0 +1,126 @@
+"""
+Incremental reader for large JSON documents.
+
+`iter_json_items(path, depth)` walks the containers above `depth` by hand
+and decodes each value at `depth` with `json.JSONDecoder.raw_decode`, so only
+one value (plus a read buffer) is in memory at a time:
+
+    iter_json_items('apple_sec_dashboard_data.json', depth=2)
+      -> (('company_name',), 'Apple Inc.'),
+         (('summary_metrics', 'revenue'), {...}),
+         (('time_series_data', 0), {...}), ...
+
+    iter_json_items('10-Q/10q_summary_data.json', depth=1)
+      -> ((0,), {filing}), ((1,), {filing}), ...
+
+Scalars found above `depth` are yielded with their shorter path.
+"""
+
+import json
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader:
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self, min_size=0):
+        """Read at least one more chunk; returns False at end of file."""
+        if self.eof:
+            return False
+        # Drop consumed text so the buffer stays bounded by the largest value
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+        chunk = self.f.read(max(self.chunk_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError('Unexpected end of JSON input')
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decode one complete value starting at the next non-whitespace character."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Value straddles the buffer end; grow geometrically to stay linear
+                if not self.fill(len(self.buf)):
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.fill(len(self.buf)):
+                continue
+            self.pos = end
+            return value
+
+    def items(self, path, depth):
+        if len(path) >= depth or self.peek() not in '{[':
+            yield path, self.decode()
+            return
+        if self.expect('{[') == '{':
+            if self.peek() == '}':
+                self.pos += 1
+                return
+            while True:
+                key = self.decode()
+                self.expect(':')
+                yield from self.items(path + (key,), depth)
+                if self.expect(',}') == '}':
+                    return
+        else:
+            if self.peek() == ']':
+                self.pos += 1
+                return
+            index = 0
+            while True:
+                yield from self.items(path + (index,), depth)
+                index += 1
+                if self.expect(',]') == ']':
+                    return
+
+
+def iter_json_items(path, depth, chunk_size=CHUNK_SIZE):
+    """Yield (path tuple, value) for every value at `depth` in the JSON file at `path`."""
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from _Reader(f, chunk_size).items((), depth)
+
+
+def iter_object_items(obj, depth, path=()):
+    """In-memory counterpart of `iter_json_items` for an already-decoded object."""
+    if len(path) >= depth or not isinstance(obj, (dict, list)):
+        yield path, obj
+        return
+    for key, value in (obj.items() if isinstance(obj, dict) else enumerate(obj)):
+        yield from iter_object_items(value, depth, path + (key,))
+
+
+def peek_json_type(path):
+    """'{' or '[' for the top-level container of a JSON file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return _Reader(f, 64).peek()
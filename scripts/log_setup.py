@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Leveled, per-module logging for the scripts and extractors.
+
+Modules take a named logger and log diagnostics lazily, with %-style
+arguments, so nothing is formatted unless the record is emitted:
+
+    log = get_logger('apple_sec_data_parser')
+    log.debug('%s: dropped %d duplicate rows', metric_name, dropped)
+
+Loggers live under the `apple_dashboard` hierarchy, so a level chosen for
+the dashboard does not turn on urllib3's or pandas' own debug output.
+configure_logging() installs a console handler on stderr
+(`[LEVEL] module: message`) and, optionally, a JSON-lines file sink with
+one object per record for machine analysis:
+
+    {"ts": "...", "level": "DEBUG", "logger": "extract_10q_summary_tables", "message": "...", "thread": "..."}
+
+Until configure_logging() runs, only warnings and errors reach stderr
+(Python's last-resort handler). The CLIs expose it as
+`--log-level LEVEL` and `--log-json PATH`.
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT_LOGGER = 'apple_dashboard'
+DEFAULT_LEVEL = 'WARNING'
+CONSOLE_FORMAT = '[%(levelname)s] %(module_name)s: %(message)s'
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+
+def get_logger(module):
+    """The logger for one script or module, e.g. get_logger('extract_10q_summary_tables')."""
+    return logging.getLogger(f'{ROOT_LOGGER}.{module}')
+
+
+def _module_name(logger_name):
+    prefix = ROOT_LOGGER + '.'
+    return logger_name[len(prefix):] if logger_name.startswith(prefix) else logger_name
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Module names without the shared `apple_dashboard.` prefix."""
+
+    def format(self, record):
+        record.module_name = _module_name(record.name)
+        return super().format(record)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': _module_name(record.name),
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=DEFAULT_LEVEL, jsonl_path=None):
+    """Set the dashboard loggers' level and sinks; calling it again replaces the previous setup."""
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(ConsoleFormatter(CONSOLE_FORMAT))
+    logger.addHandler(console)
+    if jsonl_path:
+        Path(jsonl_path).parent.mkdir(parents=True, exist_ok=True)
+        sink = logging.FileHandler(jsonl_path, encoding='utf-8')
+        sink.setFormatter(JsonLinesFormatter())
+        logger.addHandler(sink)
+    return logger
+
+
+def add_logging_arguments(parser):
+    parser.add_argument('--log-level', default=DEFAULT_LEVEL, type=str.upper, choices=LEVELS,
+                        help=f'Diagnostic log level (default {DEFAULT_LEVEL}; DEBUG shows per-row extraction detail)')
+    parser.add_argument('--log-json', metavar='PATH', help='Also append log records to PATH as JSON lines')
+
+
+def configure_from_args(args):
+    return configure_logging(args.log_level, args.log_json)
@@ -0,0 +1,111 @@
+"""
+Change-aware, atomic JSON output writing.
+
+Every refresh regenerates the dashboard payload with a new `last_updated`
+timestamp, so a plain overwrite always produces a diff even when no figure
+changed. `write_if_changed` canonicalizes the payload (sorted keys, values
+serialized the way the file stores them, volatile fields dropped), compares
+its SHA-256 with the file already on disk and only rewrites the file, via a
+temp file plus rename, when the data really changed.
+
+When it does write, it can also write a change summary so caches and the
+dashboard can invalidate on real changes only (the summary is also written
+when it does not exist yet, so it can always be committed alongside the data):
+
+    {"path": "apple_sec_dashboard_data.json", "hash": "...", "previous_hash": "...",
+     "changed_at": "2025-05-03T03:00:12", "sections": {
+        "summary_metrics": {"added": [], "removed": [], "changed": ["revenue"]},
+        "time_series_data": {"changed": true}}}
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+VOLATILE_FIELDS = ('last_updated',)
+
+
+def normalize(payload):
+    """Round-trip through JSON so values compare exactly as they are stored (numpy, Timestamps -> str)."""
+    return json.loads(json.dumps(payload, default=str))
+
+
+def canonical_bytes(payload, volatile=VOLATILE_FIELDS):
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k not in volatile}
+    return json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def content_hash(payload, volatile=VOLATILE_FIELDS):
+    return hashlib.sha256(canonical_bytes(payload, volatile)).hexdigest()
+
+
+def atomic_write_text(path, text):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        # mkstemp creates the file 0600; give it the usual permissions of a data file
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def diff_sections(old, new, volatile=VOLATILE_FIELDS):
+    """Per top-level section: added/removed/changed keys for dicts, a changed flag otherwise."""
+    old = old if isinstance(old, dict) else {}
+    sections = {}
+    for section in sorted(set(old) | set(new)):
+        if section in volatile:
+            continue
+        before, after = old.get(section), new.get(section)
+        if canonical_bytes(before, ()) == canonical_bytes(after, ()):
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            sections[section] = {
+                'added': sorted(set(after) - set(before)),
+                'removed': sorted(set(before) - set(after)),
+                'changed': sorted(k for k in set(before) & set(after)
+                                  if canonical_bytes(before[k], ()) != canonical_bytes(after[k], ())),
+            }
+        else:
+            sections[section] = {'changed': True}
+    return sections
+
+
+def load_existing(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_if_changed(path, payload, summary_path=None, volatile=VOLATILE_FIELDS, indent=2):
+    """
+    Write `payload` as JSON to `path` unless the file already holds the same
+    data (ignoring `volatile` top-level fields). Returns the change summary
+    dict; summary['changed'] is False when nothing was written.
+    """
+    payload = normalize(payload)
+    new_hash = content_hash(payload, volatile)
+    existing = load_existing(path)
+    previous_hash = content_hash(existing, volatile) if existing is not None else None
+    summary = {'path': str(path), 'hash': new_hash, 'previous_hash': previous_hash, 'changed': new_hash != previous_hash}
+    if not summary['changed']:
+        if summary_path and not Path(summary_path).exists():
+            atomic_write_text(summary_path, json.dumps(summary, indent=2))
+        return summary
+    atomic_write_text(path, json.dumps(payload, indent=indent))
+    summary['changed_at'] = datetime.now().isoformat(timespec='seconds')
+    summary['sections'] = diff_sections(existing, payload, volatile) if isinstance(payload, dict) else {}
+    if summary_path:
+        atomic_write_text(summary_path, json.dumps(summary, indent=2))
+    return summary
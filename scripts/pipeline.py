@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+Dependency-aware refresh pipeline.
+
+The refresh is a DAG of stages. Each stage reads named artifacts (files or
+directories) produced by upstream stages and writes its own:
+
+    fetch_companyfacts  ─> companyfacts ──> derive_dashboard ─> dashboard ──┬─> validate ─> publish
+    fetch_filing_index  ─> filings_10k ──> download_10k ─> extract_10k ─────┤
+                        └> filings_10q ──> download_10q ─┬> extract_10q ────┼─> derive_sales ─> warehouse
+                                                         └> extract_10q_region
+                           filings_10k + filings_10q ──> text_index
+
+warehouse rebuilds the SQLite fact warehouse (data/facts.sqlite, served by
+data_server.py's /api/facts and /api/filings) from companyfacts and the
+extractor and series outputs, whenever any of them changes.
+
+text_index adds the MD&A and Risk Factors text of filings not yet in
+data/text_index/ (text_index.py), so only new filings are fetched for it.
+
+Every artifact is content-hashed. A stage is skipped when the hashes of its
+inputs match the ones it last ran with and its outputs still hash to what it
+wrote; the fetch stages always run but revalidate with conditional requests,
+so an unchanged refresh is two 304s plus hashing. Stages whose inputs are
+ready run concurrently in a thread pool, and a failed stage only blocks its
+own descendants. Per-stage fingerprints are kept in data/pipeline/state.json.
+
+Every run is traced (instrumentation.py): each stage is a span, with nested
+fetch/parse/extract/derive/validate/save spans and counters from the code it
+calls, written to data/pipeline/traces/. `--trace-memory` adds tracemalloc
+peaks and `--prometheus PATH` also writes a Prometheus textfile.
+
+A new 10-Q changes only `filings_10q`, so the 10-K branch and the dashboard
+derivation are skipped and only the new filing is downloaded.
+
+Usage: python scripts/pipeline.py [--all] [--force STAGE ...] [--strict] [--trace-memory] [--prometheus PATH] [STAGE ...]
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import json
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+from apple_sec_data_parser import AppleSECDataParser
+from dashboard_shards import COMPACT_DASHBOARD_DIR, save_compact_dashboard
+from fact_warehouse import WAREHOUSE_PATH, populate_from_outputs
+from filing_index import conditional_get, fetch_filing_index
+from instrumentation import Tracer, count, span
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from output_writer import atomic_write_text, content_hash, load_existing
+from sales_series import (
+    REPO_ROOT, SALES_SERIES_PATH, TEN_K_SUMMARY_PATH, TEN_Q_REGION_PATH, TEN_Q_SUMMARY_PATH, add_derived_q4,
+    build_series, load_filings, series_to_columns
+)
+from snapshot_store import SNAPSHOT_DIR, SnapshotStore
+from text_index import TEXT_INDEX_DIR, fetch_sections, index_filings
+from table_cache import DEFAULT_CACHE_DIR, TableCache
+from validate_dashboard_json import ERROR, validate_files
+
+PIPELINE_DIR = REPO_ROOT / 'data' / 'pipeline'
+STATE_PATH = PIPELINE_DIR / 'state.json'
+DASHBOARD_PATH = REPO_ROOT / 'apple_sec_dashboard_data.json'
+CHANGE_SUMMARY_PATH = REPO_ROOT / 'data' / 'dashboard_changes.json'
+# Filings kept in the extractor outputs; None means the full history
+FILING_COUNTS = {'10-K': 5, '10-Q': 8}
+MAX_WORKERS = 4
+
+log = get_logger('pipeline')
+
+RAN, SKIPPED, FAILED, BLOCKED = 'ran', 'skipped', 'failed', 'blocked'
+
+Stage = namedtuple('Stage', ['name', 'inputs', 'outputs', 'run', 'always'], defaults=(False,))
+Stage.__doc__ = """
+name     unique stage name
+inputs   artifact names read (each produced by exactly one stage)
+outputs  {artifact name: path} written
+run      callable(); returns an optional one-line detail for the report
+always   run even when the inputs are unchanged (stages reading external sources)
+"""
+StageResult = namedtuple('StageResult', ['name', 'status', 'seconds', 'changed', 'detail'])
+
+
+class PipelineError(Exception):
+    pass
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_hash(path):
+    """sha256 of a file, of a directory's (relative path, file hash) listing, or None if missing."""
+    path = Path(path)
+    if path.is_file():
+        return _file_hash(path)
+    if not path.is_dir():
+        return None
+    digest = hashlib.sha256()
+    for child in sorted(p for p in path.rglob('*') if p.is_file()):
+        digest.update(f'{child.relative_to(path).as_posix()}\0{_file_hash(child)}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Validated stage graph plus the incremental, concurrent runner."""
+
+    def __init__(self, stages, state_path=STATE_PATH, max_workers=MAX_WORKERS, trace_dir=None, trace_memory=False,
+                 prometheus_path=None):
+        self.stages = {}
+        self.artifacts = {}
+        self.producers = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}'")
+            self.stages[stage.name] = stage
+            for artifact, path in stage.outputs.items():
+                if artifact in self.producers:
+                    raise ValueError(f"Artifact '{artifact}' is produced by both "
+                                     f"'{self.producers[artifact]}' and '{stage.name}'")
+                self.producers[artifact] = stage.name
+                self.artifacts[artifact] = Path(path)
+        self.dependencies = {}
+        for stage in stages:
+            missing = [artifact for artifact in stage.inputs if artifact not in self.producers]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' reads unknown artifact(s): {', '.join(missing)}")
+            self.dependencies[stage.name] = {self.producers[artifact] for artifact in stage.inputs}
+        self.order = self._topological_order()
+        self.state_path = Path(state_path)
+        self.max_workers = max_workers
+        self.trace_dir = Path(trace_dir) if trace_dir else self.state_path.parent / 'traces'
+        self.trace_memory = trace_memory
+        self.prometheus_path = prometheus_path
+        self.last_trace = None
+
+    def _topological_order(self):
+        order, remaining = [], dict(self.dependencies)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps - set(order)]
+            if not ready:
+                raise ValueError(f"Dependency cycle among: {', '.join(sorted(remaining))}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+        return order
+
+    def check_names(self, names):
+        unknown = [name for name in names if name not in self.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s): {', '.join(unknown)}")
+
+    def select(self, targets=None):
+        """`targets` and every stage upstream of them (all stages when targets is empty)."""
+        if not targets:
+            return set(self.stages)
+        self.check_names(targets)
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.dependencies[name])
+        return selected
+
+    def downstream(self, names):
+        """`names` and every stage that (transitively) reads their outputs."""
+        affected = set(names)
+        for name in self.order:
+            if self.dependencies[name] & affected:
+                affected.add(name)
+        return affected
+
+    def load_state(self):
+        return load_existing(self.state_path) or {}
+
+    def fingerprint(self, stage):
+        inputs = {artifact: artifact_hash(self.artifacts[artifact]) for artifact in sorted(stage.inputs)}
+        return content_hash({'stage': stage.name, 'inputs': inputs})
+
+    def output_hashes(self, stage):
+        return {artifact: artifact_hash(path) for artifact, path in stage.outputs.items()}
+
+    def is_fresh(self, stage, fingerprint, state):
+        previous = state.get(stage.name)
+        return (not stage.always and previous is not None and previous['fingerprint'] == fingerprint
+                and previous['outputs'] == self.output_hashes(stage))
+
+    def run(self, targets=None, force=()):
+        """Run the selected stages; returns StageResults in topological order. The run's trace is `last_trace`."""
+        self.check_names(force)
+        selected = self.select(targets)
+        with Tracer('pipeline', memory=self.trace_memory, targets=sorted(targets or []),
+                    force=sorted(force)) as tracer:
+            results = self._run(selected, set(force))
+        for result in results:
+            tracer.count('stages', status=result.status)
+        self.last_trace = tracer.write(self.trace_dir)
+        if self.prometheus_path:
+            tracer.write_prometheus(self.prometheus_path)
+        return results
+
+    def _run(self, selected, force):
+        state = self.load_state()
+        results, running, fingerprints = {}, {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(results) < len(selected):
+                # One pass in topological order resolves whole chains of skipped stages
+                for name in self.order:
+                    if name not in selected or name in results or name in fingerprints:
+                        continue
+                    deps = self.dependencies[name]
+                    if any(dep not in results for dep in deps):
+                        continue
+                    if any(results[dep].status in (FAILED, BLOCKED) for dep in deps):
+                        results[name] = StageResult(name, BLOCKED, 0.0, False, 'upstream stage failed')
+                        continue
+                    stage = self.stages[name]
+                    fingerprint = self.fingerprint(stage)
+                    if name not in force and self.is_fresh(stage, fingerprint, state):
+                        results[name] = StageResult(name, SKIPPED, 0.0, False, None)
+                        continue
+                    running[pool.submit(self._execute, stage)] = name
+                    fingerprints[name] = fingerprint
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = self._record(self.stages[name], fingerprints.pop(name), future.result(), state)
+        return [results[name] for name in self.order if name in results]
+
+    @staticmethod
+    def _execute(stage):
+        started = time.perf_counter()
+        with span(stage.name) as stage_span:
+            try:
+                return stage.run(), None, time.perf_counter() - started
+            except Exception as e:
+                if stage_span is not None:
+                    stage_span.attrs['error'] = str(e)
+                return None, e, time.perf_counter() - started
+
+    def _record(self, stage, fingerprint, outcome, state):
+        detail, error, seconds = outcome
+        if error is not None:
+            log.error('Stage %s failed: %s', stage.name, error)
+            return StageResult(stage.name, FAILED, seconds, False, str(error))
+        outputs = self.output_hashes(stage)
+        previous = state.get(stage.name) or {}
+        state[stage.name] = {
+            'fingerprint': fingerprint,
+            'outputs': outputs,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        # Saved after every stage, so an interrupted run keeps the stages that finished
+        atomic_write_text(self.state_path, json.dumps(state, indent=2))
+        return StageResult(stage.name, RAN, seconds, outputs != previous.get('outputs'), detail)
+
+
+# --- Refresh stages ---
+
+def write_json_if_changed(path, obj, indent=2, separators=None):
+    """Write `obj` as JSON unless the file already holds exactly that text. Returns True if written."""
+    with span('save', path=Path(path).name):
+        text = json.dumps(obj, indent=indent, separators=separators, default=str)
+        try:
+            if Path(path).read_text() == text:
+                return False
+        except OSError:
+            pass
+        atomic_write_text(path, text)
+        count('bytes_written', len(text), artifact=Path(path).name)
+        return True
+
+
+_extractor_lock = threading.Lock()
+
+
+def load_extractor(relative_path):
+    """Import an extractor script from 10-K/ or 10-Q/ (those directories are not packages)."""
+    path = REPO_ROOT / relative_path
+    name = path.stem
+    with _extractor_lock:
+        if name not in sys.modules:
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[name] = module
+    return sys.modules[name]
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def fetch_companyfacts(path):
+    parser = AppleSECDataParser()
+    _, changed = conditional_get(f'{parser.base_url}{parser.cik}.json', path, headers=parser.headers)
+    return 'new data' if changed else 'not modified'
+
+
+def fetch_filing_lists(paths, counts):
+    index = fetch_filing_index()
+    written = [form for form, path in paths.items() if write_json_if_changed(path, index.filter(form, counts.get(form)))]
+    return f"{len(index)} filings indexed; changed: {', '.join(written) or 'none'}"
+
+
+def download_filings(filings_path, manifest_path, loaders, cache_dir):
+    """Make sure every listed filing's tables are in the table cache; the manifest hashes what is cached."""
+    cache = TableCache(cache_dir)
+    manifest, failed = [], 0
+    for filing in _read_json(filings_path):
+        try:
+            tables = {}
+            for load in loaders:
+                tables.update(load(filing, cache))
+        except Exception as e:
+            failed += 1
+            log.warning('Download failed for %s: %s', filing['url'], e)
+            continue
+        manifest.append({'accession': filing['accession'], 'date': filing['date'], 'url': filing['url'],
+                         'tables': content_hash(tables)})
+    write_json_if_changed(manifest_path, manifest)
+    if failed:
+        # Not recording the stage's state means it runs (and retries the failed filings) next time
+        raise PipelineError(f"{failed} of {failed + len(manifest)} filing downloads failed")
+    return f"{len(manifest)} filings cached"
+
+
+def extract_outputs(manifest_path, output_path, specs, tidy, cache_dir):
+    """Re-tidy the cached tables of the manifest's filings into an extractor output file."""
+    cache = TableCache(cache_dir)
+    results = []
+    for filing in _read_json(manifest_path):
+        tables = cache.get_tables(filing['accession'], specs)
+        if tables is None:
+            count('filings_skipped', reason='not_cached')
+            continue
+        try:
+            with span('extract', accession=filing['accession']):
+                summary = tidy(filing['url'], tables)
+        except Exception as e:
+            count('filings_skipped', reason='extract_failed')
+            log.error('Error extracting %s: %s', filing['url'], e)
+            continue
+        if summary is not None:
+            summary['date'] = filing['date']
+            summary['accession'] = filing['accession']
+            results.append(summary)
+    write_json_if_changed(output_path, results)
+    return f"{len(results)} filings"
+
+
+def extract_merged_output(manifest_path, output_path, spec, merge, cache_dir):
+    """Like extract_outputs, but hand every filing's cached table to `merge` at once."""
+    cache = TableCache(cache_dir)
+    filing_tables = []
+    for filing in _read_json(manifest_path):
+        tables = cache.get_tables(filing['accession'], [spec])
+        if tables is None:
+            count('filings_skipped', reason='not_cached')
+            continue
+        if tables[spec] is not None:
+            filing_tables.append((filing, tables[spec]))
+    with span('extract', filings=len(filing_tables)):
+        results = merge(filing_tables)
+    write_json_if_changed(output_path, results)
+    return f"{len(results)} filings"
+
+
+def derive_dashboard(companyfacts_path, dashboard_path, summary_path):
+    parser = AppleSECDataParser()
+    with span('parse', source='companyfacts'):
+        parser.raw_data = _read_json(companyfacts_path)
+    if not parser.process_all_metrics() or not parser.save_dashboard_data(dashboard_path, summary_path=summary_path):
+        raise PipelineError('Dashboard data could not be derived from companyfacts')
+    if not parser.last_change['changed']:
+        return 'unchanged'
+    return f"changed: {', '.join(parser.last_change['sections']) or 'none'}"
+
+
+def derive_sales(output_path):
+    with span('derive', output='sales_series'):
+        records = add_derived_q4(build_series(
+            load_filings(TEN_K_SUMMARY_PATH), load_filings(TEN_Q_SUMMARY_PATH), load_filings(TEN_Q_REGION_PATH),
+        ))
+    # Same bytes as sales_series.write_series, but the file is left alone when they match
+    written = write_json_if_changed(output_path, series_to_columns(records), indent=None, separators=(',', ':'))
+    return f"{len(records)} points" + ('' if written else ' (unchanged)')
+
+
+def build_fact_warehouse(companyfacts_path, path=WAREHOUSE_PATH):
+    with span('save', output='warehouse'):
+        counts = populate_from_outputs(_read_json(companyfacts_path), path)
+    return ', '.join(f"{n} {table}" for table, n in counts.items())
+
+
+def build_text_index(filing_paths, root=TEXT_INDEX_DIR):
+    """Add listed filings that are not in the text index yet; failed fetches fail the stage so they are retried."""
+    failed = []
+
+    def fetch(url):
+        try:
+            return fetch_sections(url)
+        except Exception:
+            failed.append(url)
+            raise
+
+    with span('index', output='text_index'):
+        added = sum(index_filings(_read_json(path), form, root, fetch) for form, path in filing_paths.items())
+    if failed:
+        raise PipelineError(f"{len(failed)} filing(s) could not be fetched for the text index")
+    return f"{added} filings added"
+
+
+def validate_outputs(paths, report_path, strict=False):
+    # In-process: forking worker processes from a pipeline thread is not safe
+    with span('validate', files=len(paths)):
+        issues = validate_files(paths, max_workers=1)
+    for found in issues.values():
+        for issue in found:
+            count('validation_issues', rule=issue.rule, severity=issue.severity)
+    report = {
+        Path(path).relative_to(REPO_ROOT).as_posix(): [issue._asdict() for issue in found]
+        for path, found in issues.items()
+    }
+    write_json_if_changed(report_path, report)
+    errors = sum(issue.severity == ERROR for found in issues.values() for issue in found)
+    warnings = sum(len(found) for found in issues.values()) - errors
+    if strict and errors:
+        raise PipelineError(f"{errors} validation error(s); see {report_path}")
+    return f"{errors} error(s), {warnings} warning(s)"
+
+
+def publish(dashboard_path, compact_dir, snapshot_dir):
+    dashboard_data = _read_json(dashboard_path)
+    with span('save', output='compact_dashboard'):
+        save_compact_dashboard(dashboard_data, compact_dir)
+    with span('save', output='snapshot'):
+        entry = SnapshotStore(snapshot_dir).record(dashboard_data)
+    return f"snapshot {entry['id']}" if entry else 'snapshot unchanged'
+
+
+def refresh_stages(counts=None, cache_dir=DEFAULT_CACHE_DIR, strict=False, root=PIPELINE_DIR):
+    """The refresh DAG. `counts` overrides FILING_COUNTS ({'10-Q': None} for the full history)."""
+    counts = dict(FILING_COUNTS, **(counts or {}))
+    root = Path(root)
+    paths = {
+        'companyfacts': root / 'companyfacts.json',
+        'filings_10k': root / 'filings' / '10-K.json',
+        'filings_10q': root / 'filings' / '10-Q.json',
+        'tables_10k': root / 'tables' / '10-K.json',
+        'tables_10q': root / 'tables' / '10-Q.json',
+        'validation': root / 'validation.json',
+    }
+
+    def ten_k():
+        return load_extractor('10-K/extract_10k_summary_tables.py')
+
+    def ten_q():
+        return load_extractor('10-Q/extract_10q_summary_tables.py')
+
+    def ten_q_region():
+        return load_extractor('10-Q/extract_10q_region_tables.py')
+
+    def load_10k(filing, cache):
+        return ten_k().load_filing_tables(filing['url'], filing['accession'], filing['date'], cache)
+
+    def load_10q(filing, cache):
+        # Both 10-Q extractors read the same filing: download and parse it once for both
+        summary, region = ten_q(), ten_q_region()
+        specs = list(summary.TABLE_SPECS) + [region.REGION_TABLE_SPEC]
+        tables = cache.get_tables(filing['accession'], specs)
+        if tables is None:
+            soup = summary.parse_filing_html(summary.fetch_filing_html(filing['url']))
+            tables = summary.tables_from_soup(soup)
+            tables[region.REGION_TABLE_SPEC] = region.region_table_from_soup(soup)
+            cache.put_tables(filing['accession'], tables, form='10-Q', url=filing['url'], date=filing['date'])
+        return tables
+
+    return [
+        Stage('fetch_companyfacts', (), {'companyfacts': paths['companyfacts']},
+              lambda: fetch_companyfacts(paths['companyfacts']), always=True),
+        Stage('fetch_filing_index', (), {'filings_10k': paths['filings_10k'], 'filings_10q': paths['filings_10q']},
+              lambda: fetch_filing_lists({'10-K': paths['filings_10k'], '10-Q': paths['filings_10q']}, counts),
+              always=True),
+        Stage('download_10k', ('filings_10k',), {'tables_10k': paths['tables_10k']},
+              lambda: download_filings(paths['filings_10k'], paths['tables_10k'], [load_10k], cache_dir)),
+        Stage('download_10q', ('filings_10q',), {'tables_10q': paths['tables_10q']},
+              lambda: download_filings(paths['filings_10q'], paths['tables_10q'], [load_10q], cache_dir)),
+        Stage('extract_10k', ('tables_10k',), {'ten_k_summary': TEN_K_SUMMARY_PATH},
+              lambda: extract_outputs(paths['tables_10k'], TEN_K_SUMMARY_PATH, ten_k().TABLE_SPECS,
+                                      ten_k().tidy_10k_tables, cache_dir)),
+        Stage('extract_10q', ('tables_10q',), {'ten_q_summary': TEN_Q_SUMMARY_PATH},
+              lambda: extract_outputs(paths['tables_10q'], TEN_Q_SUMMARY_PATH, ten_q().TABLE_SPECS,
+                                      ten_q().tidy_10q_tables, cache_dir)),
+        Stage('extract_10q_region', ('tables_10q',), {'ten_q_region': TEN_Q_REGION_PATH},
+              lambda: extract_merged_output(paths['tables_10q'], TEN_Q_REGION_PATH, ten_q_region().REGION_TABLE_SPEC,
+                                            ten_q_region().region_results, cache_dir)),
+        Stage('derive_dashboard', ('companyfacts',), {'dashboard': DASHBOARD_PATH,
+                                                       'dashboard_changes': CHANGE_SUMMARY_PATH},
+              lambda: derive_dashboard(paths['companyfacts'], DASHBOARD_PATH, CHANGE_SUMMARY_PATH)),
+        Stage('derive_sales', ('ten_k_summary', 'ten_q_summary', 'ten_q_region'), {'sales_series': SALES_SERIES_PATH},
+              lambda: derive_sales(SALES_SERIES_PATH)),
+        Stage('warehouse', ('companyfacts', 'ten_k_summary', 'ten_q_summary', 'ten_q_region', 'sales_series'),
+              {'warehouse': WAREHOUSE_PATH}, lambda: build_fact_warehouse(paths['companyfacts'])),
+        Stage('text_index', ('filings_10k', 'filings_10q'), {'text_index': TEXT_INDEX_DIR},
+              lambda: build_text_index({'10-K': paths['filings_10k'], '10-Q': paths['filings_10q']})),
+        Stage('validate', ('dashboard', 'ten_k_summary', 'ten_q_summary', 'ten_q_region'),
+              {'validation': paths['validation']},
+              lambda: validate_outputs([DASHBOARD_PATH, TEN_K_SUMMARY_PATH, TEN_Q_SUMMARY_PATH, TEN_Q_REGION_PATH],
+                                       paths['validation'], strict)),
+        Stage('publish', ('dashboard', 'validation'), {'compact_dashboard': COMPACT_DASHBOARD_DIR,
+                                                        'snapshots': SNAPSHOT_DIR},
+              lambda: publish(DASHBOARD_PATH, COMPACT_DASHBOARD_DIR, SNAPSHOT_DIR)),
+    ]
+
+
+def refresh_pipeline(counts=None, strict=False, state_path=STATE_PATH, trace_memory=False, prometheus_path=None):
+    return Pipeline(refresh_stages(counts, strict=strict), state_path, trace_memory=trace_memory,
+                    prometheus_path=prometheus_path)
+
+
+def add_trace_arguments(parser):
+    parser.add_argument('--trace-memory', action='store_true', help='Record tracemalloc peaks per span (slower)')
+    parser.add_argument('--prometheus', metavar='PATH', help='Also write the run as a Prometheus textfile')
+
+
+def print_results(results):
+    for result in results:
+        line = f"  {result.name:<20} {result.status:<8} {result.seconds:6.2f}s"
+        if result.changed:
+            line += '  (outputs changed)'
+        if result.detail:
+            line += f"  {result.detail}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the incremental data refresh pipeline')
+    parser.add_argument('targets', nargs='*', help='Stages to run, with everything upstream (default: all)')
+    parser.add_argument('--all', action='store_true', help='Keep the full 10-K/10-Q history instead of the latest filings')
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help='Re-run these stages even if unchanged')
+    parser.add_argument('--strict', action='store_true', help='Fail validation (and skip publishing) on validation errors')
+    add_trace_arguments(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+    counts = {'10-K': None, '10-Q': None} if args.all else None
+    started = time.perf_counter()
+    pipeline = refresh_pipeline(counts, args.strict, trace_memory=args.trace_memory, prometheus_path=args.prometheus)
+    try:
+        results = pipeline.run(args.targets, args.force)
+    except ValueError as e:
+        parser.error(str(e))
+    print_results(results)
+    print(f"Pipeline finished in {time.perf_counter() - started:.2f}s (trace: {pipeline.last_trace})")
+    sys.exit(1 if any(result.status in (FAILED, BLOCKED) for result in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Template parsing and precomputed answers for the /ask chat backend.
+
+Chat questions are nearly always "what was X in period Y" or "how did X
+grow". Instead of scanning the data per request, `AnswerEngine` compiles
+the entities in the loaded data into one regex and answers from a table built
+when the data loads:
+
+    entities   metric names from the dashboard's metric registry plus synonyms,
+               and every product and region in the sales series (with aliases)
+    periods    'Q2 2025', '2025 Q2', 'FY24', 'second quarter of 2025', 'H1 2025', ...
+    intents    'growth' when the question asks about growth/change, else 'value'
+
+Each question parses to (intent, subject, period). Answers for every subject
+and period present in the data, and for "latest", are precomputed. Questions
+outside that table (a period that does not exist, no recognizable subject)
+are computed on demand; a question without a recognizable subject is
+searched in the filings' narrative text (text_index.py) when it is built. Either way the normalized question text is kept in an
+LRU cache, so repeated questions skip parsing too.
+"""
+
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+ParsedQuestion = namedtuple('ParsedQuestion', ['intent', 'subject', 'period'])
+
+METRIC_SYNONYMS = {
+    'revenue': ('revenue', 'revenues', 'net sales', 'sales', 'top line', 'turnover'),
+    'net_income': ('net income', 'profit', 'profits', 'earnings', 'bottom line'),
+    'total_assets': ('assets', 'total assets'),
+    'cash_and_equivalents': ('cash', 'cash equivalents', 'cash and equivalents'),
+    'research_development': ('r&d', 'research and development', 'research', 'r & d'),
+    'operating_income': ('operating income', 'operating profit', 'ebit'),
+    'shareholders_equity': ('equity', "shareholders' equity", 'stockholders equity', "stockholders' equity"),
+}
+MEMBER_ALIASES = {
+    'Wearables, Home and Accessories': ('wearables', 'wearables home and accessories', 'accessories'),
+    'Greater China': ('china',),
+    'Rest of Asia Pacific': ('asia pacific', 'rest of asia'),
+}
+# Consolidated totals are answered by the revenue metric
+SKIPPED_MEMBERS = ('Total net sales',)
+
+ORDINAL_QUARTERS = {'first': 1, 'second': 2, 'third': 3, 'fourth': 4, '1st': 1, '2nd': 2, '3rd': 3, '4th': 4}
+GROWTH_WORDS = ('grow', 'grew', 'growth', 'change', 'changed', 'increase', 'increased', 'decrease', 'decreased',
+                'decline', 'declined', 'rise', 'rose', 'fall', 'fell', 'yoy', 'year over year', 'year-over-year')
+
+_YEAR = r'(?:fy\s*|fiscal\s+(?:year\s+)?)?(?P<{name}>20\d{{2}}|\'?\d{{2}})'
+_PERIOD_RE = re.compile(
+    r'\b(?:'
+    r'(?:q(?P<q1>[1-4])|(?P<o1>first|second|third|fourth|1st|2nd|3rd|4th)\s+quarter)(?:\s+of)?\s*(?:,\s*)?'
+    + _YEAR.format(name='y1') +
+    r'|' + _YEAR.format(name='y2') + r'\s*(?:-\s*)?q(?P<q2>[1-4])'
+    r'|(?:h1|first\s+half)(?:\s+of)?\s+' + _YEAR.format(name='y3') +
+    r'|(?:fy\s*|fiscal\s+(?:year\s+)?)(?P<y4>20\d{2}|\d{2})'
+    r'|(?P<y5>20\d{2})'
+    r')\b'
+)
+# Question words dropped before a full-text search
+NARRATIVE_STOPWORDS = {
+    'what', 'does', 'did', 'do', 'is', 'are', 'was', 'were', 'the', 'a', 'an', 'about', 'say', 'said', 'apple',
+    "apple's", 'how', 'which', 'tell', 'me', 'any', 'of', 'in', 'on', 'for', 'to',
+}
+SECTION_NAMES = {'mda': "Management's Discussion and Analysis", 'risk_factors': 'Risk Factors'}
+_GROWTH_RE = re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in GROWTH_WORDS) + r')\b')
+_SPACE_RE = re.compile(r'\s+')
+CACHE_SIZE = 4096
+
+
+def format_usd(value):
+    if abs(value) >= 1e9:
+        return f'${value / 1e9:,.2f}B'
+    if abs(value) >= 1e6:
+        return f'${value / 1e6:,.1f}M'
+    return f'${value:,.0f}'
+
+
+def normalize_question(question):
+    return _SPACE_RE.sub(' ', question.lower()).strip(' ?!.')
+
+
+def _year(text):
+    text = text.lstrip("'")
+    return int(text) if len(text) == 4 else 2000 + int(text)
+
+
+def parse_period(text):
+    """The first fiscal period named in normalized `text`, as a period label, or None."""
+    match = _PERIOD_RE.search(text)
+    if not match:
+        return None
+    groups = match.groupdict()
+    if groups['y1']:
+        quarter = groups['q1'] or ORDINAL_QUARTERS[groups['o1']]
+        return f'FY{_year(groups["y1"])}-Q{quarter}'
+    if groups['y2']:
+        return f'FY{_year(groups["y2"])}-Q{groups["q2"]}'
+    if groups['y3']:
+        return f'FY{_year(groups["y3"])}-H1'
+    return f'FY{_year(groups["y4"] or groups["y5"])}'
+
+
+def previous_year_period(period):
+    year, _, fiscal_period = period[2:].partition('-')
+    return f'FY{int(year) - 1}' + (f'-{fiscal_period}' if fiscal_period else '')
+
+
+class AnswerEngine:
+    """Compiled entity dictionary and answer table for one DataIndex."""
+
+    def __init__(self, index, cache_size=CACHE_SIZE, text_index=None):
+        self.index = index
+        self.text_index = text_index
+        self.subjects = {}
+        surface_forms = {}
+        for key, entry in index.metrics.items():
+            subject = ('metric', key)
+            self.subjects[subject] = (entry, entry['name'])
+            for form in (entry['name'].lower(), key.replace('_', ' ')) + METRIC_SYNONYMS.get(key, ()):
+                surface_forms.setdefault(form, subject)
+        # Products and regions take precedence over metrics ("iPhone revenue" is about the iPhone)
+        self.member_forms = {}
+        for (dimension, key), entry in index.sales.items():
+            if entry['member'] in SKIPPED_MEMBERS:
+                continue
+            subject = (dimension, key)
+            self.subjects[subject] = (entry, f"{entry['member']} net sales")
+            for form in (entry['member'].lower(),) + MEMBER_ALIASES.get(entry['member'], ()):
+                self.member_forms[form] = subject
+        surface_forms.update(self.member_forms)
+        self.surface_forms = surface_forms
+        alternation = '|'.join(re.escape(form) for form in sorted(surface_forms, key=len, reverse=True))
+        self.entity_re = re.compile(r'(?<![\w&])(?:' + alternation + r')(?![\w&])') if surface_forms else None
+        self.answers = self._precompute()
+        self.answer = lru_cache(maxsize=cache_size)(self._answer)
+
+    def parse(self, text):
+        """ParsedQuestion for normalized `text`; subject is None when no entity is named."""
+        subject = None
+        if self.entity_re is not None:
+            found = [self.surface_forms[m.group(0)] for m in self.entity_re.finditer(text)]
+            members = [s for s in found if s[0] != 'metric']
+            subject = (members or found or [None])[0]
+        intent = 'growth' if _GROWTH_RE.search(text) else 'value'
+        return ParsedQuestion(intent, subject, parse_period(text))
+
+    def _precompute(self):
+        answers = {}
+        for subject, (entry, _) in self.subjects.items():
+            for period in list(entry['periods']) + [None]:
+                for intent in ('value', 'growth'):
+                    parsed = ParsedQuestion(intent, subject, period)
+                    answers[parsed] = self.compute(parsed)
+        return answers
+
+    def _answer(self, text):
+        parsed = self.parse(text)
+        answer = self.answers.get(parsed)
+        if answer is None and parsed.subject is None and self.text_index is not None:
+            answer = self.narrative(text)
+        return answer if answer is not None else self.compute(parsed)
+
+    def ask(self, question):
+        return self.answer(normalize_question(question))
+
+    # --- Answer templates ---
+
+    def compute(self, parsed):
+        if parsed.subject is None:
+            return self.help_text()
+        entry, name = self.subjects[parsed.subject]
+        period = parsed.period or entry['latest']
+        point = entry['points'].get(period)
+        if point is None:
+            return self.missing(entry, name, period)
+        if parsed.intent == 'growth':
+            return self.growth(entry, name, point)
+        return f"{name} for {point['period']} was {format_usd(point['value'])} ({self.source(point)})."
+
+    def growth(self, entry, name, point):
+        prior_period = previous_year_period(point['period'])
+        prior = entry['points'].get(prior_period)
+        if prior is None or not prior['value']:
+            return (f"{name} for {point['period']} was {format_usd(point['value'])}; "
+                    f"I don't have {prior_period} to compare it with.")
+        change = (point['value'] - prior['value']) / abs(prior['value']) * 100
+        verb = 'grew' if change >= 0 else 'declined'
+        return (f"{name} {verb} {abs(change):.1f}% year over year in {point['period']}, "
+                f"from {format_usd(prior['value'])} in {prior_period} to {format_usd(point['value'])}.")
+
+    def narrative(self, text):
+        """Best-matching MD&A / risk factor passage for a question with no metric in it, or None."""
+        query = ' '.join(word for word in text.split() if word.strip('"') not in NARRATIVE_STOPWORDS)
+        try:
+            hits = self.text_index.search(query, limit=1)
+            snippet = self.text_index.snippet(hits[0], query) if hits else None
+        except OSError:
+            # Segments merged away under an index that is about to be reloaded
+            return None
+        if not hits:
+            return None
+        hit = hits[0]
+        return f"From the {hit.form} filed {hit.date} ({SECTION_NAMES.get(hit.section, hit.section)}): {snippet}"
+
+    @staticmethod
+    def source(point):
+        if point.get('derived'):
+            return 'derived as the 10-K annual figure less Q1-Q3'
+        detail = point.get('form') or 'filing'
+        if point.get('end'):
+            detail += f", period ended {point['end']}"
+        return detail
+
+    @staticmethod
+    def missing(entry, name, period):
+        nearby = [p for p in entry['periods'] if p.startswith(period.split('-')[0])]
+        if nearby:
+            return f"I don't have {name} for {period}. Available for that year: {', '.join(nearby)}."
+        if entry['periods']:
+            first, last = entry['periods'][0], entry['periods'][-1]
+            return f"I don't have {name} for {period}. Data covers {first} to {last}."
+        return f"I don't have any {name} data."
+
+    def help_text(self):
+        metrics = ', '.join(entry['name'] for entry, _ in (self.subjects[s] for s in self.subjects if s[0] == 'metric'))
+        return ("I can answer questions about " + (metrics or 'the dashboard metrics')
+                + " and net sales by product or region, e.g. \"What was iPhone revenue in Q2 2025?\" "
+                  "or \"How did Services grow in FY2024?\"")
+
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Reconcile table-scraped filing figures against XBRL companyfacts.
+
+The 10-K/10-Q extractors scrape net sales out of filing HTML tables, while
+AppleSECDataParser reads the same figures as tagged XBRL facts. This stage
+hash-joins the two on (fiscal year, fiscal period, concept) and reports every
+scraped value that disagrees with the tagged fact by more than a tolerance.
+
+Both sides are indexed in one pass each, so the check is linear in the
+history size and cheap enough to run on every refresh.
+
+Usage: python scripts/reconcile_xbrl.py [--tolerance 0.001]
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from sales_series import (
+    TEN_K_SUMMARY_PATH, TEN_Q_REGION_PATH, TEN_Q_SUMMARY_PATH, build_series, fiscal_period_for, load_filings
+)
+
+# Scraped line item -> us-gaap concept it should equal
+MEMBER_CONCEPTS = {
+    'Total net sales': 'RevenueFromContractWithCustomerExcludingAssessedTax',
+}
+# Filing tables report amounts in millions of dollars
+TABLE_SCALE = 1_000_000
+DEFAULT_TOLERANCE = 0.001  # relative
+ROUNDING_SLACK = 0.5 * TABLE_SCALE  # tables round to the nearest million
+
+
+def period_months(start, end):
+    days = (end - start).days + 1
+    return int(round(days / 30.44))
+
+
+def index_companyfacts(companyfacts, concepts):
+    """
+    {(fiscal_year, fiscal_period, concept): fact} for the given concepts.
+
+    Fiscal periods come from each fact's own start/end dates rather than its
+    'fy'/'fp' tags, which describe the filing that reported the fact. The most
+    recently filed fact wins, matching the scraped series' precedence.
+    """
+    index = {}
+    us_gaap = companyfacts.get('facts', {}).get('us-gaap', {})
+    for concept in concepts:
+        for fact in us_gaap.get(concept, {}).get('units', {}).get('USD', []):
+            if not fact.get('start') or not fact.get('end'):
+                continue
+            try:
+                start = datetime.strptime(fact['start'], '%Y-%m-%d').date()
+                end = datetime.strptime(fact['end'], '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            fiscal_year, fiscal_period = fiscal_period_for(end, period_months(start, end))
+            if fiscal_period is None:
+                continue
+            key = (fiscal_year, fiscal_period, concept)
+            current = index.get(key)
+            if current is None or (fact.get('filed') or '') >= (current.get('filed') or ''):
+                index[key] = fact
+    return index
+
+
+def reconcile(series, companyfacts, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare scraped series points with companyfacts.
+
+    Returns {'checked', 'matched', 'mismatches', 'unmatched'}; each mismatch
+    records both values, the relative difference and both accession numbers.
+    """
+    facts = index_companyfacts(companyfacts, set(MEMBER_CONCEPTS.values()))
+    report = {'checked': 0, 'matched': 0, 'mismatches': [], 'unmatched': []}
+    for point in series:
+        concept = MEMBER_CONCEPTS.get(point['member'])
+        if concept is None or point.get('derived'):
+            continue
+        report['checked'] += 1
+        key = (point['fiscal_year'], point['fiscal_period'], concept)
+        fact = facts.get(key)
+        if fact is None:
+            report['unmatched'].append({
+                'dimension': point['dimension'], 'member': point['member'],
+                'period': point['period'], 'concept': concept, 'accession': point['accession'],
+            })
+            continue
+        scraped = point['net_sales'] * TABLE_SCALE
+        tagged = float(fact['val'])
+        diff = abs(scraped - tagged)
+        if diff <= max(ROUNDING_SLACK, tolerance * abs(tagged)):
+            report['matched'] += 1
+            continue
+        report['mismatches'].append({
+            'dimension': point['dimension'],
+            'member': point['member'],
+            'period': point['period'],
+            'concept': concept,
+            'scraped': scraped,
+            'xbrl': tagged,
+            'relative_diff': round(diff / abs(tagged), 6) if tagged else None,
+            'accession': point['accession'],
+            'xbrl_accession': fact.get('accn'),
+        })
+    return report
+
+
+def print_report(report):
+    print(f"Reconciled {report['checked']} scraped values against XBRL: "
+          f"{report['matched']} matched, {len(report['mismatches'])} mismatched, "
+          f"{len(report['unmatched'])} without a matching fact")
+    for m in report['mismatches']:
+        print(f"  [MISMATCH] {m['dimension']}/{m['member']} {m['period']}: "
+              f"scraped {m['scraped']:,.0f} vs XBRL {m['xbrl']:,.0f} ({m['relative_diff']:.2%}) "
+              f"[{m['accession']} vs {m['xbrl_accession']}]")
+
+
+def load_scraped_series():
+    return build_series(
+        load_filings(TEN_K_SUMMARY_PATH),
+        load_filings(TEN_Q_SUMMARY_PATH),
+        load_filings(TEN_Q_REGION_PATH),
+    )
+
+
+def main():
+    from apple_sec_data_parser import AppleSECDataParser
+
+    parser = argparse.ArgumentParser(description="Reconcile scraped filing tables against XBRL companyfacts")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Relative tolerance (default 0.001)')
+    args = parser.parse_args()
+    sec = AppleSECDataParser()
+    if not sec.fetch_sec_data():
+        return False
+    report = reconcile(load_scraped_series(), sec.raw_data, args.tolerance)
+    print_report(report)
+    return not report['mismatches']
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -4,38 +4,56 @@ Quick script to refresh Apple SEC data for the dashboard.
 Run this script to update the dashboard with the latest financial data.
 """
 
+import argparse
+import json
 import sys
-import os
-from apple_sec_data_parser import AppleSECDataParser
+import time
+from pipeline import (
+    BLOCKED, DASHBOARD_PATH, FAILED, PIPELINE_DIR, add_trace_arguments, print_results, refresh_pipeline
+)
+from log_setup import add_logging_arguments, configure_from_args, get_logger
+from reconcile_xbrl import load_scraped_series, print_report, reconcile
 
-# Update data file references to use the new data/ subfolder
-DASHBOARD_DATA_PATH = './apple_sec_dashboard_data.json'
+log = get_logger('refresh_data')
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Refresh Apple SEC data for the dashboard")
+    arg_parser.add_argument('--all', action='store_true', help='Keep the full 10-K/10-Q history instead of the latest filings')
+    arg_parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help='Re-run these pipeline stages even if unchanged')
+    arg_parser.add_argument('--strict', action='store_true', help='Do not publish when validation finds errors')
+    add_trace_arguments(arg_parser)
+    add_logging_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    configure_from_args(args)
     print("🍎 Apple Financial Dashboard - Data Refresh")
     print("=" * 50)
     
-    # Initialize parser
-    parser = AppleSECDataParser()
-    
     try:
-        print("📡 Fetching latest SEC data from EDGAR API...")
-        if not parser.fetch_sec_data():
-            print("❌ Failed to fetch SEC data")
-            return False
-        
-        print("⚙️  Processing financial metrics...")
-        if not parser.process_all_metrics():
-            print("❌ Failed to process metrics")
+        # Fetch -> download -> extract -> derive -> validate -> publish; unchanged stages are skipped
+        print("⚙️  Running refresh pipeline...")
+        started = time.perf_counter()
+        counts = {'10-K': None, '10-Q': None} if args.all else None
+        pipeline = refresh_pipeline(counts, args.strict, trace_memory=args.trace_memory,
+                                    prometheus_path=args.prometheus)
+        results = pipeline.run(force=args.force)
+        print_results(results)
+        print(f"⏱️  Pipeline finished in {time.perf_counter() - started:.2f}s (trace: {pipeline.last_trace})")
+        failed = [result.name for result in results if result.status in (FAILED, BLOCKED)]
+        if failed:
+            print(f"❌ Stages did not complete: {', '.join(failed)}")
             return False
         
-        print("💾 Saving dashboard data...")
-        if not parser.save_dashboard_data():
-            print("❌ Failed to save data")
-            return False
+        # Cross-check scraped filing tables against the XBRL facts; report only
+        print("🔎 Reconciling filing tables with XBRL facts...")
+        try:
+            with open(PIPELINE_DIR / 'companyfacts.json') as f:
+                print_report(reconcile(load_scraped_series(), json.load(f)))
+        except Exception as e:
+            log.warning('Reconciliation skipped: %s', e)
         
         # Display summary
-        dashboard_data = parser.generate_dashboard_data()
+        with open(DASHBOARD_PATH) as f:
+            dashboard_data = json.load(f)
         print("\n✅ Data refresh completed successfully!")
         print(f"📊 Company: {dashboard_data['company_name']}")
         print(f"📈 Metrics processed: {len(dashboard_data['summary_metrics'])}")
@@ -43,8 +61,8 @@ def main():
         
         print("\n💰 Latest Financial Snapshot:")
         for key, metric in dashboard_data['summary_metrics'].items():
-            value_billions = metric['latest_value'] / 1000000000
-            print(f"  • {metric['name']}: ${value_billions:.1f}B ({metric['latest_year']}) [{metric['growth_rate']:+.1f}%]")
+            value_billions = float(metric['latest_value']) / 1000000000
+            print(f"  • {metric['name']}: ${value_billions:.1f}B ({metric['latest_year']}) [{float(metric['growth_rate']):+.1f}%]")
         
         print(f"\n🎯 Dashboard ready! Open demo.html to view the updated data.")
         return True
@@ -55,4 +73,4 @@ def main():
 
 if __name__ == "__main__":
     success = main()
-    sys.exit(0 if success else 1) 
\ No newline at end of file
+    sys.exit(0 if success else 1) 
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Consolidate the per-filing 10-K/10-Q extractor outputs into one series.
+
+`10k_summary_data.json`, `10q_summary_data.json` and `10q_region_data.json`
+are lists of per-filing blobs, and every filing repeats the prior-year
+comparatives. This stage merges all of them into a single long-format series
+keyed by (dimension, member, period):
+
+    dimension  'product' or 'region'
+    member     canonical line item, e.g. 'iPhone', 'Greater China', 'Total net sales'
+    period     fiscal period, e.g. 'FY2024', 'FY2025-Q2', 'FY2025-H1', 'FY2024-9M'
+
+When several filings report the same key, the most recently filed one wins,
+so restated comparatives replace the originals. Apple files no Q4 10-Q, so Q4 points
+are derived as the 10-K annual figure minus Q1-Q3 and flagged with
+derived=True. The result is written as a
+compact columnar JSON artifact (data/sales_series.json) that a chart can
+consume directly.
+
+Usage: python scripts/sales_series.py [--output data/sales_series.json]
+"""
+
+import argparse
+import json
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TEN_K_SUMMARY_PATH = REPO_ROOT / '10-K' / '10k_summary_data.json'
+TEN_Q_SUMMARY_PATH = REPO_ROOT / '10-Q' / '10q_summary_data.json'
+TEN_Q_REGION_PATH = REPO_ROOT / '10-Q' / '10q_region_data.json'
+SALES_SERIES_PATH = REPO_ROOT / 'data' / 'sales_series.json'
+
+SERIES_VERSION = 1
+SERIES_FIELDS = (
+    'dimension', 'member', 'period', 'fiscal_year', 'fiscal_period', 'end',
+    'net_sales', 'percent_change', 'form', 'accession', 'filed', 'derived'
+)
+
+# Filing section -> series dimension
+SOURCES = {
+    'products_and_services': 'product',
+    'segment_operating': 'region',
+    'region_operating': 'region',
+}
+
+MONTHS_TO_PERIOD = {3: 'Q', 6: 'H1', 9: '9M', 12: 'FY'}
+FISCAL_PERIOD_ORDER = {'Q1': 1, 'Q2': 2, 'H1': 3, 'Q3': 4, '9M': 5, 'Q4': 6, 'FY': 7}
+
+_PERIOD_LABEL_RE = re.compile(r'(Three|Six|Nine|Twelve) Months Ended\s+(\w+ \d{1,2}, \d{4})', re.IGNORECASE)
+_MONTH_WORDS = {'three': 3, 'six': 6, 'nine': 9, 'twelve': 12}
+_FOOTNOTE_RE = re.compile(r'(?:\s*\(\d+\))+\s*$')
+# Long labels are table notes ("Portion of total net sales that was ..."), not line items
+MAX_MEMBER_LENGTH = 60
+
+
+def fiscal_period_for(end, months):
+    """
+    Map a period end date and length to Apple's fiscal (year, period).
+
+    Apple's fiscal year ends on the last Saturday of September, and quarter
+    ends drift by a few days each year. Stepping back a week before bucketing
+    by calendar month keeps an end date like January 1 in the December quarter.
+    """
+    anchor = end - timedelta(days=7)
+    fiscal_year = anchor.year + 1 if anchor.month >= 10 else anchor.year
+    quarter = ((anchor.month - 10) % 12) // 3 + 1
+    period = MONTHS_TO_PERIOD.get(months)
+    if period == 'Q':
+        period = f'Q{quarter}'
+    return fiscal_year, period
+
+
+def period_key(fiscal_year, fiscal_period):
+    return f'FY{fiscal_year}' if fiscal_period == 'FY' else f'FY{fiscal_year}-{fiscal_period}'
+
+
+def parse_period_label(label):
+    """'Three Months Ended March 29, 2025' -> (2025, 'Q2', '2025-03-29'); None for change columns."""
+    if not label or 'change' in label.lower():
+        return None
+    match = _PERIOD_LABEL_RE.search(label)
+    if not match:
+        return None
+    try:
+        end = datetime.strptime(match.group(2), '%B %d, %Y').date()
+    except ValueError:
+        return None
+    fiscal_year, fiscal_period = fiscal_period_for(end, _MONTH_WORDS[match.group(1).lower()])
+    if fiscal_period is None:
+        return None
+    return fiscal_year, fiscal_period, end.isoformat()
+
+
+def normalize_member(name):
+    """'iPhone ®' -> 'iPhone', 'Americas:' -> 'Americas', 'Wearables, ... (1)' -> 'Wearables, ...'."""
+    if not isinstance(name, str):
+        return None
+    name = name.replace('®', '').replace('™', '')
+    name = _FOOTNOTE_RE.sub('', name)
+    name = re.sub(r'\s+', ' ', name).strip().rstrip(':').strip()
+    if not name or len(name) > MAX_MEMBER_LENGTH:
+        return None
+    return name
+
+
+def member_key(name):
+    """Case/punctuation-insensitive key for matching members across filings."""
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def iter_filing_records(filings, form):
+    """Yield series records for every usable row in a list of per-filing blobs."""
+    for filing in filings:
+        for section, dimension in SOURCES.items():
+            for row in filing.get(section) or []:
+                member = normalize_member(row.get(dimension))
+                if member is None or row.get('net_sales') is None:
+                    continue
+                if 'year' in row:
+                    fiscal_year, fiscal_period, end = int(row['year']), 'FY', None
+                else:
+                    parsed = parse_period_label(row.get('period'))
+                    if parsed is None:
+                        continue
+                    fiscal_year, fiscal_period, end = parsed
+                yield {
+                    'dimension': dimension,
+                    'member': member,
+                    'period': period_key(fiscal_year, fiscal_period),
+                    'fiscal_year': fiscal_year,
+                    'fiscal_period': fiscal_period,
+                    'end': end,
+                    'net_sales': row['net_sales'],
+                    'percent_change': row.get('percent_change'),
+                    'form': form,
+                    'accession': filing.get('accession'),
+                    'filed': filing.get('date'),
+                    'derived': False,
+                }
+
+
+def sort_key(record):
+    return (record['dimension'], record['member'], record['fiscal_year'],
+            FISCAL_PERIOD_ORDER.get(record['fiscal_period'], 99))
+
+
+def build_series(ten_k_filings=(), ten_q_filings=(), ten_q_region_filings=()):
+    """
+    Merge filings into one deduplicated series, latest filing first in precedence.
+    Returns records sorted by (dimension, member, fiscal year, fiscal period).
+    """
+    records = []
+    records.extend(iter_filing_records(ten_k_filings, '10-K'))
+    records.extend(iter_filing_records(ten_q_filings, '10-Q'))
+    records.extend(iter_filing_records(ten_q_region_filings, '10-Q'))
+    # Stable sort by filing date, so later filings overwrite earlier ones below
+    records.sort(key=lambda r: (r['filed'] or '', r['accession'] or ''))
+    series = {}
+    display_names = {}
+    for record in records:
+        key = member_key(record['member'])
+        # Keep the spelling used by the latest filing
+        display_names[(record['dimension'], key)] = record['member']
+        series[(record['dimension'], key, record['period'])] = record
+    for (dimension, key, _), record in series.items():
+        record['member'] = display_names[(dimension, key)]
+    return sorted(series.values(), key=sort_key)
+
+
+def add_derived_q4(records):
+    """
+    Derive Q4 = FY - (Q1 + Q2 + Q3) for every (dimension, member, fiscal year)
+    that has a 10-K annual figure, all three 10-Q quarters and no reported Q4.
+
+    Runs as one grouped pandas join over the whole series. Derived points
+    carry the 10-K's accession and filing date and are flagged derived=True.
+    """
+    if not records:
+        return records
+    df = pd.DataFrame(records)
+    df['member_key'] = df['member'].map(member_key)
+    keys = ['dimension', 'member_key', 'fiscal_year']
+    quarters = (
+        df[df['fiscal_period'].isin(['Q1', 'Q2', 'Q3'])]
+        .groupby(keys)
+        .agg(quarter_sum=('net_sales', 'sum'), quarter_count=('fiscal_period', 'nunique'))
+    )
+    annual = df[df['fiscal_period'] == 'FY'].set_index(keys)[['member', 'net_sales', 'accession', 'filed']]
+    reported_q4 = df[df['fiscal_period'] == 'Q4'].set_index(keys).index
+    joined = annual.join(quarters, how='inner')
+    joined = joined[(joined['quarter_count'] == 3) & ~joined.index.isin(reported_q4)]
+    if joined.empty:
+        return records
+    joined['q4'] = joined['net_sales'] - joined['quarter_sum']
+    derived = [
+        {
+            'dimension': row.dimension,
+            'member': row.member,
+            'period': period_key(int(row.fiscal_year), 'Q4'),
+            'fiscal_year': int(row.fiscal_year),
+            'fiscal_period': 'Q4',
+            'end': None,
+            'net_sales': float(row.q4),
+            'percent_change': None,
+            'form': '10-K',
+            'accession': row.accession,
+            'filed': row.filed,
+            'derived': True,
+        }
+        for row in joined.reset_index().itertuples(index=False)
+    ]
+    return sorted(records + derived, key=sort_key)
+
+
+def series_to_columns(records):
+    return {
+        'version': SERIES_VERSION,
+        'fields': list(SERIES_FIELDS),
+        'rows': [[record.get(field) for field in SERIES_FIELDS] for record in records],
+    }
+
+
+def columns_to_series(payload):
+    fields = payload['fields']
+    return [dict(zip(fields, row)) for row in payload['rows']]
+
+
+def load_filings(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def load_series(path=SALES_SERIES_PATH):
+    with open(path) as f:
+        return columns_to_series(json.load(f))
+
+
+def write_series(records, path=SALES_SERIES_PATH):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(series_to_columns(records), f, separators=(',', ':'))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate 10-K/10-Q extractor outputs into one sales series")
+    parser.add_argument('--output', type=str, default=str(SALES_SERIES_PATH), help='Output JSON file')
+    parser.add_argument('--columnar', choices=['parquet', 'arrow'], help='Also export the series as a columnar dataset (requires pyarrow)')
+    args = parser.parse_args()
+    records = add_derived_q4(build_series(
+        load_filings(TEN_K_SUMMARY_PATH),
+        load_filings(TEN_Q_SUMMARY_PATH),
+        load_filings(TEN_Q_REGION_PATH),
+    ))
+    out_path = write_series(records, args.output)
+    print(f"Saved {len(records)} series points to {out_path}")
+    if args.columnar:
+        from columnar_export import export_sales_series
+        print(f"Columnar series saved to {export_sales_series(records, file_format=args.columnar)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Versioned history of dashboard snapshots with delta compression.
+
+Each refresh overwrites `apple_sec_dashboard_data.json`, so "what did the
+dashboard show on date X" otherwise means digging through git history. The
+store keeps every distinct refresh under data/snapshots/:
+
+    manifest.json                 {"version", "checkpoint_every", "snapshots": [entry, ...]}
+    <id>.checkpoint.json.gz       the full flattened state
+    <id>.delta.json.gz            {"base": <id>, "set": [[key, value], ...], "removed": [key, ...]}
+
+Ids are the time taken to the second (20250701T030000); further snapshots
+within the same second get -2, -3, ... so ids, and the SSE event ids the
+change feed derives from them, stay unique.
+
+A snapshot is the dashboard payload flattened into keyed entries. Facts are
+keyed ["fact", metric, series, start, end, form] with {"val", "fy"} as the
+value; per-metric metadata and the other top-level sections are stored whole.
+A delta only holds the entries that are new or changed against the state
+reconstructed from the previous snapshot (plus removed keys); every
+`checkpoint_every`-th snapshot is a full checkpoint, so a read never replays
+more than that many deltas.
+
+    store = SnapshotStore()
+    store.record(dashboard_data)              # no-op when nothing changed
+    store.reconstruct('2025-06-01')           # the payload as of that date
+    store.diff('2025-01-01', '2025-06-01')    # {"added", "removed", "changed"}
+
+Usage: python scripts/snapshot_store.py list | show DATE | diff DATE_A DATE_B
+"""
+
+import argparse
+import gzip
+import json
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from output_writer import VOLATILE_FIELDS, atomic_write_text, content_hash, normalize
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / 'data' / 'snapshots'
+SNAPSHOT_VERSION = 1
+CHECKPOINT_EVERY = 10
+SERIES_KEYS = ('data', 'annual_data', 'quarterly_data')
+FACT_KEY_FIELDS = ('start', 'end', 'form')
+
+
+# --- Flattening ---
+
+def fact_key(metric, series, record):
+    return ('fact', metric, series) + tuple(record.get(field) for field in FACT_KEY_FIELDS)
+
+
+def flatten(payload):
+    """Dashboard payload -> {key tuple: JSON value}. Volatile field values are dropped."""
+    payload = normalize(payload)
+    raw_metrics = payload.get('raw_metrics') or {}
+    state = {('layout',): {
+        'keys': list(payload),
+        'raw_metrics': list(raw_metrics),
+    }}
+    for key, value in payload.items():
+        if key not in VOLATILE_FIELDS and key != 'raw_metrics':
+            state[('section', key)] = value
+    for metric, meta in raw_metrics.items():
+        state[('metric', metric)] = {key: value for key, value in meta.items() if key not in SERIES_KEYS}
+        for series in SERIES_KEYS:
+            for record in meta.get(series) or []:
+                state[fact_key(metric, series, record)] = {
+                    field: value for field, value in record.items() if field not in FACT_KEY_FIELDS
+                }
+    return state
+
+
+def _fact_order(key):
+    start, end, form = key[3:]
+    return end or '', start or '', form or ''
+
+
+def unflatten(state, last_updated=None):
+    """Inverse of `flatten`; volatile fields get `last_updated`. Series come back ordered by end, start, form."""
+    layout = state.get(('layout',), {'keys': [], 'raw_metrics': []})
+    facts = {}
+    for key in sorted((k for k in state if k[0] == 'fact'), key=_fact_order):
+        facts.setdefault((key[1], key[2]), []).append(key)
+    raw_metrics = {}
+    for metric in layout['raw_metrics']:
+        meta = dict(state.get(('metric', metric), {}))
+        for series in SERIES_KEYS:
+            records = []
+            for key in facts.get((metric, series), []):
+                record = {field: value for field, value in zip(FACT_KEY_FIELDS, key[3:]) if value is not None}
+                record.update(state[key])
+                records.append(record)
+            meta[series] = records
+        raw_metrics[metric] = meta
+    payload = {}
+    for key in layout['keys']:
+        if key in VOLATILE_FIELDS:
+            payload[key] = last_updated
+        elif key == 'raw_metrics':
+            payload[key] = raw_metrics
+        else:
+            payload[key] = state.get(('section', key))
+    return payload
+
+
+def diff_states(old, new):
+    """Compare two flattened states; keys are returned as lists, sorted."""
+    changed = [key for key in old.keys() & new.keys() if old[key] != new[key]]
+    return {
+        'added': [list(key) for key in sorted(new.keys() - old.keys(), key=_sort_key)],
+        'removed': [list(key) for key in sorted(old.keys() - new.keys(), key=_sort_key)],
+        'changed': [
+            {'key': list(key), 'before': old[key], 'after': new[key]}
+            for key in sorted(changed, key=_sort_key)
+        ],
+    }
+
+
+def _sort_key(key):
+    return tuple('' if part is None else str(part) for part in key)
+
+
+# --- Storage ---
+
+def _to_datetime(value):
+    """'2025-06-01', '2025-06-01T03:41:53.833092' or a datetime -> datetime."""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+@lru_cache(maxsize=64)
+def _read_gz_text(path, mtime):
+    with gzip.open(path, 'rt') as f:
+        return f.read()
+
+
+class SnapshotStore:
+    """Append-only snapshot history rooted at `root`."""
+
+    def __init__(self, root=SNAPSHOT_DIR, checkpoint_every=CHECKPOINT_EVERY):
+        self.root = Path(root)
+        self.checkpoint_every = checkpoint_every
+        self.manifest_path = self.root / 'manifest.json'
+
+    def snapshots(self):
+        """Manifest entries, oldest first."""
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)['snapshots']
+        except FileNotFoundError:
+            return []
+
+    def _load(self, entry):
+        path = self.root / entry['file']
+        return json.loads(_read_gz_text(str(path), path.stat().st_mtime_ns))
+
+    def _write_gz_json(self, name, obj):
+        path = self.root / name
+        path.write_bytes(gzip.compress(json.dumps(obj, separators=(',', ':')).encode('utf-8'), mtime=0))
+
+    def _state_at(self, index, snapshots):
+        """Rebuild the flattened state of snapshots[index] from its nearest checkpoint."""
+        start = index
+        while snapshots[start]['kind'] != 'checkpoint':
+            start -= 1
+        state = {tuple(key): value for key, value in self._load(snapshots[start])['entries']}
+        for entry in snapshots[start + 1:index + 1]:
+            delta = self._load(entry)
+            for key in delta['removed']:
+                state.pop(tuple(key), None)
+            for key, value in delta['set']:
+                state[tuple(key)] = value
+        return state
+
+    def _index_as_of(self, as_of, snapshots):
+        """Index of the latest snapshot taken at or before `as_of` (a date means end of that day)."""
+        if isinstance(as_of, str) and len(as_of) == 10:
+            as_of = f'{as_of}T23:59:59.999999'
+        as_of = _to_datetime(as_of)
+        index = None
+        for i, entry in enumerate(snapshots):
+            if _to_datetime(entry['taken_at']) <= as_of:
+                index = i
+        if index is None:
+            raise LookupError(f"No snapshot at or before {as_of.isoformat()}")
+        return index
+
+    def record(self, payload, taken_at=None):
+        """
+        Append `payload` as a new snapshot unless it matches the latest one
+        (ignoring last_updated). Returns the new manifest entry, or None.
+        """
+        payload = normalize(payload)
+        snapshots = self.snapshots()
+        digest = content_hash(payload)
+        if snapshots and snapshots[-1]['hash'] == digest:
+            return None
+        taken_at = _to_datetime(taken_at or payload.get('last_updated') or datetime.now())
+        if snapshots and taken_at <= _to_datetime(snapshots[-1]['taken_at']):
+            raise ValueError(f"Snapshot at {taken_at.isoformat()} is not newer than the latest snapshot")
+        self.root.mkdir(parents=True, exist_ok=True)
+        state = flatten(payload)
+        snapshot_id = taken_at.strftime('%Y%m%dT%H%M%S')
+        if snapshots and snapshots[-1]['id'].partition('-')[0] == snapshot_id:
+            # Several snapshots within one second: number them so ids (and file names) stay unique
+            snapshot_id = f"{snapshot_id}-{int(snapshots[-1]['id'].partition('-')[2] or 1) + 1}"
+        since_checkpoint = 0
+        for entry in reversed(snapshots):
+            if entry['kind'] == 'checkpoint':
+                break
+            since_checkpoint += 1
+        entry = {'id': snapshot_id, 'taken_at': taken_at.isoformat(), 'hash': digest, 'entries': len(state)}
+        if not snapshots or since_checkpoint + 1 >= self.checkpoint_every:
+            entry.update(kind='checkpoint', file=f'{snapshot_id}.checkpoint.json.gz')
+            entries = [[list(key), state[key]] for key in sorted(state, key=_sort_key)]
+            self._write_gz_json(entry['file'], {'entries': entries})
+        else:
+            previous = self._state_at(len(snapshots) - 1, snapshots)
+            changes = diff_states(previous, state)
+            entry.update(kind='delta', file=f'{snapshot_id}.delta.json.gz', base=snapshots[-1]['id'],
+                         added=len(changes['added']), changed=len(changes['changed']),
+                         removed=len(changes['removed']))
+            self._write_gz_json(entry['file'], {
+                'base': snapshots[-1]['id'],
+                'set': [[key, state[tuple(key)]] for key in changes['added']]
+                       + [[c['key'], c['after']] for c in changes['changed']],
+                'removed': changes['removed'],
+            })
+        snapshots.append(entry)
+        # Manifest last, so it never lists a snapshot file that is not written yet
+        atomic_write_text(self.manifest_path, json.dumps({
+            'version': SNAPSHOT_VERSION, 'checkpoint_every': self.checkpoint_every, 'snapshots': snapshots,
+        }, indent=2))
+        return entry
+
+    def state(self, as_of):
+        snapshots = self.snapshots()
+        return self._state_at(self._index_as_of(as_of, snapshots), snapshots)
+
+    def reconstruct(self, as_of):
+        """The dashboard payload as it was at `as_of`; last_updated is the snapshot time."""
+        snapshots = self.snapshots()
+        index = self._index_as_of(as_of, snapshots)
+        return unflatten(self._state_at(index, snapshots), snapshots[index]['taken_at'])
+
+    def diff(self, date_a, date_b):
+        """Entries added, removed and changed between the snapshots in effect at two dates."""
+        snapshots = self.snapshots()
+        index_a = self._index_as_of(date_a, snapshots)
+        index_b = self._index_as_of(date_b, snapshots)
+        result = diff_states(self._state_at(index_a, snapshots), self._state_at(index_b, snapshots))
+        result['from'] = snapshots[index_a]['id']
+        result['to'] = snapshots[index_b]['id']
+        return result
+
+
+def record_snapshot(payload, root=SNAPSHOT_DIR):
+    return SnapshotStore(root).record(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the dashboard snapshot history")
+    parser.add_argument('--root', type=str, default=str(SNAPSHOT_DIR), help='Snapshot directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='List snapshots')
+    show = commands.add_parser('show', help='Print the dashboard payload as of a date')
+    show.add_argument('as_of')
+    diff = commands.add_parser('diff', help='Print what changed between two dates')
+    diff.add_argument('date_a')
+    diff.add_argument('date_b')
+    args = parser.parse_args()
+    store = SnapshotStore(args.root)
+    if args.command == 'list':
+        for entry in store.snapshots():
+            detail = (f"+{entry['added']} ~{entry['changed']} -{entry['removed']}"
+                      if entry['kind'] == 'delta' else f"{entry['entries']} entries")
+            print(f"{entry['id']}  {entry['kind']:<10}  {detail}")
+    elif args.command == 'show':
+        print(json.dumps(store.reconstruct(args.as_of), indent=2))
+    else:
+        print(json.dumps(store.diff(args.date_a, args.date_b), indent=2))
+
+
+if __name__ == '__main__':
+    main()
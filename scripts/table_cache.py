@@ -0,0 +1,101 @@
+"""
+On-disk cache of raw filing table matrices.
+
+The extractors spend nearly all their time downloading and parsing filing
+HTML. This cache keeps the `extract_table_data` output for each
+(accession, table spec) so tidy logic can be re-run over the whole filing
+history without touching the network or BeautifulSoup.
+
+One gzip-compressed JSON file is stored per accession:
+
+    data/table_cache/0000320193-24-000123.json.gz
+    {"version": 1, "accession": ..., "form": "10-K", "url": ..., "date": ...,
+     "tables": {"10-K:products_and_services": [[...], ...], ...}}
+
+A spec whose table was not found is stored as null so it is not re-fetched.
+Bump CACHE_VERSION when `extract_table_data` output changes shape; entries
+written with another version are ignored.
+"""
+
+import gzip
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from instrumentation import count
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'data' / 'table_cache'
+
+_ARCHIVE_PATH_RE = re.compile(r'/Archives/edgar/data/\d+/(\d{10})(\d{2})(\d{6})/')
+
+
+def accession_from_url(url):
+    """'.../data/320193/000032019324000123/x.htm' -> '0000320193-24-000123' (or None)."""
+    match = _ARCHIVE_PATH_RE.search(url or '')
+    return '-'.join(match.groups()) if match else None
+
+
+class TableCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def path_for(self, accession):
+        return self.cache_dir / f"{accession}.json.gz"
+
+    def load(self, accession):
+        """Return the cache entry for an accession, or None if missing or stale."""
+        path = self.path_for(accession)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('version') != CACHE_VERSION:
+            return None
+        return entry
+
+    def get_tables(self, accession, specs):
+        """Return {spec: matrix-or-None} if every spec is cached, else None."""
+        if not accession:
+            return None
+        entry = self.load(accession)
+        tables = entry.get('tables', {}) if entry is not None else {}
+        if not all(spec in tables for spec in specs):
+            count('table_cache', result='miss')
+            return None
+        count('table_cache', result='hit')
+        return {spec: tables[spec] for spec in specs}
+
+    def put_tables(self, accession, tables, **meta):
+        """Merge `tables` (and url/form/date metadata) into the accession's entry."""
+        if not accession:
+            return
+        entry = self.load(accession) or {'version': CACHE_VERSION, 'accession': accession, 'tables': {}}
+        entry.update({k: v for k, v in meta.items() if v is not None})
+        entry['tables'].update(tables)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(accession)
+        # Write to a temp file and rename so a crash never leaves a torn entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+                f.write(json.dumps(entry, separators=(',', ':')).encode('utf-8'))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def entries(self, form=None):
+        """Yield cached entries, newest filing date first, optionally for one form type."""
+        if not self.cache_dir.exists():
+            return
+        entries = []
+        for path in self.cache_dir.glob('*.json.gz'):
+            entry = self.load(path.name[:-len('.json.gz')])
+            if entry is not None and (form is None or entry.get('form') == form):
+                entries.append(entry)
+        entries.sort(key=lambda e: e.get('date') or '', reverse=True)
+        yield from entries
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Full-text BM25 index over the narrative sections of 10-K/10-Q filings.
+
+The extractors keep only a few tables from each filing; this stage keeps the
+text of Management's Discussion and Analysis and Risk Factors so keyword and
+phrase questions can be answered across the whole filing history. Each
+(accession, section) is one document. The index lives in data/text_index/:
+
+    manifest.json           {"version", "next_segment", "segments": [...],
+                             "docs": [{id, accession, form, date, url, section, length, segment}, ...],
+                             "empty": [accession, ...]}   (indexed, but no section was found)
+    <segment>.terms.json    {term: offset} into the segment's postings
+    <segment>.postings      uint32 array; at each term's offset:
+                            n_docs, then per doc: doc_id, tf, pos_1 .. pos_tf
+    <segment>.text.json.gz  {doc_id: section text}, only read to build snippets
+
+Segments are immutable: every `commit` of newly indexed accessions writes one
+new segment, so updates are incremental per accession, and segments are merged
+once there are more than MAX_SEGMENTS. Postings are memory-mapped, so opening
+the index reads only the term dictionaries.
+
+    index = TextIndex()
+    index.search('supply chain "foreign exchange"', limit=5)
+
+Usage: python scripts/text_index.py search "QUERY" | stats | compact
+"""
+
+import argparse
+import gzip
+import json
+import math
+import mmap
+import re
+import sys
+from array import array
+from collections import Counter, defaultdict, namedtuple
+from pathlib import Path
+
+from log_setup import get_logger
+from output_writer import atomic_write_text
+from table_cache import accession_from_url
+
+TEXT_INDEX_DIR = Path(__file__).resolve().parent.parent / 'data' / 'text_index'
+TEXT_INDEX_VERSION = 1
+MAX_SEGMENTS = 8
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SECTION_TITLES = {
+    'risk_factors': re.compile(r'risk\s+factors', re.IGNORECASE),
+    'mda': re.compile(r'management.{0,3}s\s+discussion\s+and\s+analysis', re.IGNORECASE),
+}
+_ITEM_HEADING_RE = re.compile(r'^[ \t]*item[ \t\xa0]+(\d{1,2}[a-c]?)\b[.:]?[ \t\xa0]*(.*)$', re.IGNORECASE | re.MULTILINE)
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_QUERY_RE = re.compile(r'"([^"]+)"|(\S+)')
+# Elements that start a new line in html_to_text; everything else is inline
+BLOCK_TAGS = ('address', 'article', 'blockquote', 'body', 'br', 'center', 'dd', 'div', 'dl', 'dt', 'h1', 'h2',
+              'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'ol', 'p', 'pre', 'section', 'tr', 'ul')
+# A table-of-contents line is not a section
+MIN_SECTION_TOKENS = 200
+
+log = get_logger('text_index')
+
+Hit = namedtuple('Hit', ['doc_id', 'score', 'accession', 'form', 'date', 'section', 'url'])
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower().replace('’', "'"))
+
+
+# --- Section extraction ---
+
+def html_to_text(html):
+    """
+    Plain text with one line per block element. Inline runs are joined with a
+    space, so a heading split across spans ('<span>Item 1A.</span><span>Risk
+    Factors</span>') stays on one line for split_sections.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'lxml')
+    for table in soup.find_all('table'):
+        table.decompose()
+    for block in soup.find_all(BLOCK_TAGS):
+        block.insert_before('\n')
+        block.insert_after('\n')
+    return soup.get_text(separator=' ')
+
+
+def split_sections(text):
+    """
+    {section: text} for the Risk Factors and MD&A items in a filing's plain
+    text. Items run from one "Item N." heading to the next; the longest
+    candidate wins, which skips the table of contents.
+    """
+    headings = list(_ITEM_HEADING_RE.finditer(text))
+    sections = {}
+    for i, heading in enumerate(headings):
+        title = heading.group(2)
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        for section, pattern in SECTION_TITLES.items():
+            if pattern.search(title):
+                body = text[heading.end():end].strip()
+                if len(body) > len(sections.get(section, '')):
+                    sections[section] = body
+    return {section: re.sub(r'\s+', ' ', body) for section, body in sections.items()
+            if len(tokenize(body)) >= MIN_SECTION_TOKENS}
+
+
+# --- Segments ---
+
+def write_segment(root, name, documents):
+    """documents: [(doc_id, text)]. Writes the three segment files; returns {doc_id: length}."""
+    postings = defaultdict(list)
+    lengths = {}
+    for doc_id, text in documents:
+        positions = defaultdict(list)
+        tokens = tokenize(text)
+        lengths[doc_id] = len(tokens)
+        for position, token in enumerate(tokens):
+            positions[token].append(position)
+        for token, token_positions in positions.items():
+            postings[token].append((doc_id, token_positions))
+    data = array('I')
+    terms = {}
+    for term in sorted(postings):
+        terms[term] = len(data)
+        entries = postings[term]
+        data.append(len(entries))
+        for doc_id, positions in entries:
+            data.append(doc_id)
+            data.append(len(positions))
+            data.extend(positions)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    root = Path(root)
+    with open(root / f'{name}.postings', 'wb') as f:
+        data.tofile(f)
+    atomic_write_text(root / f'{name}.terms.json', json.dumps(terms, separators=(',', ':')))
+    with gzip.open(root / f'{name}.text.json.gz', 'wt', encoding='utf-8') as f:
+        json.dump({str(doc_id): text for doc_id, text in documents}, f, separators=(',', ':'))
+    return lengths
+
+
+class Segment:
+    def __init__(self, root, name):
+        self.root = Path(root)
+        self.name = name
+        with open(self.root / f'{name}.terms.json') as f:
+            self.terms = json.load(f)
+        path = self.root / f'{name}.postings'
+        self.file = open(path, 'rb')
+        if path.stat().st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.data = memoryview(self.map).cast('I')
+        else:
+            self.map = None
+            self.data = memoryview(array('I'))
+        self._texts = None
+
+    def postings(self, term, positions=False):
+        """{doc_id: tf} for `term` in this segment, or {doc_id: [positions]} with positions=True."""
+        offset = self.terms.get(term)
+        if offset is None:
+            return {}
+        data = self.data
+        result = {}
+        cursor = offset + 1
+        for _ in range(data[offset]):
+            doc_id, tf = data[cursor], data[cursor + 1]
+            result[doc_id] = data[cursor + 2:cursor + 2 + tf].tolist() if positions else tf
+            cursor += 2 + tf
+        return result
+
+    def texts(self):
+        if self._texts is None:
+            with gzip.open(self.root / f'{self.name}.text.json.gz', 'rt', encoding='utf-8') as f:
+                self._texts = {int(doc_id): text for doc_id, text in json.load(f).items()}
+        return self._texts
+
+    def close(self):
+        self.data.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+# --- Index ---
+
+def parse_query(query):
+    """'supply "foreign exchange"' -> (['supply'], [['foreign', 'exchange']])."""
+    terms, phrases = [], []
+    for phrase, word in _QUERY_RE.findall(query):
+        tokens = tokenize(phrase or word)
+        if phrase and len(tokens) > 1:
+            phrases.append(tokens)
+        else:
+            terms.extend(tokens)
+    return terms, phrases
+
+
+def _phrase_count(position_lists):
+    """Occurrences of consecutive positions across the phrase's per-term position lists."""
+    following = [set(positions) for positions in position_lists[1:]]
+    return sum(
+        1 for start in position_lists[0]
+        if all(start + offset + 1 in positions for offset, positions in enumerate(following))
+    )
+
+
+class TextIndex:
+    """Reader and incremental writer for the on-disk index."""
+
+    def __init__(self, root=TEXT_INDEX_DIR):
+        self.root = Path(root)
+        self.manifest_path = self.root / 'manifest.json'
+        self.pending = []
+        self.pending_empty = []
+        self.reload()
+
+    def reload(self):
+        try:
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {'version': TEXT_INDEX_VERSION, 'next_segment': 0, 'segments': [], 'docs': []}
+        self.docs = {doc['id']: doc for doc in self.manifest['docs']}
+        # Filings without a Risk Factors or MD&A section count as indexed, so they are not fetched again
+        self.accessions = {doc['accession'] for doc in self.manifest['docs']} | set(self.manifest.get('empty', []))
+        self.avg_length = (sum(doc['length'] for doc in self.docs.values()) / len(self.docs)) if self.docs else 0
+        self.segments = [Segment(self.root, name) for name in self.manifest['segments']]
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    # --- Writing ---
+
+    def has(self, accession):
+        return (accession in self.accessions or accession in self.pending_empty
+                or any(doc['accession'] == accession for doc in self.pending))
+
+    def add_filing(self, accession, sections, form=None, date=None, url=None):
+        """Queue a filing's sections ({section: text}); written by the next commit()."""
+        if self.has(accession):
+            return 0
+        if not sections:
+            self.pending_empty.append(accession)
+        for section, text in sections.items():
+            self.pending.append({'accession': accession, 'form': form, 'date': date, 'url': url,
+                                 'section': section, 'text': text})
+        return len(sections)
+
+    def _next_segment_name(self):
+        number = self.manifest.get('next_segment', 0)
+        self.manifest['next_segment'] = number + 1
+        return f'seg-{number:05d}'
+
+    def commit(self):
+        """Write queued filings as one new segment, merging segments when there are too many."""
+        if not self.pending and not self.pending_empty:
+            return None
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.pending_empty:
+            self.manifest.setdefault('empty', []).extend(self.pending_empty)
+            self.pending_empty = []
+        if not self.pending:
+            self._write_manifest()
+            return None
+        name = self._next_segment_name()
+        next_id = max(self.docs, default=-1) + 1
+        documents = []
+        for offset, doc in enumerate(self.pending):
+            doc_id = next_id + offset
+            documents.append((doc_id, doc['text']))
+            meta = {key: value for key, value in doc.items() if key != 'text'}
+            meta.update(id=doc_id, segment=name)
+            self.manifest['docs'].append(meta)
+        lengths = write_segment(self.root, name, documents)
+        for doc in self.manifest['docs'][-len(documents):]:
+            doc['length'] = lengths[doc['id']]
+        self.manifest['segments'].append(name)
+        self.pending = []
+        self._write_manifest()
+        if len(self.manifest['segments']) > MAX_SEGMENTS:
+            self.compact()
+        return name
+
+    def compact(self):
+        """Merge every segment into one; doc ids are kept."""
+        if len(self.manifest['segments']) <= 1:
+            return
+        documents = []
+        for segment in self.segments:
+            documents.extend(segment.texts().items())
+        documents.sort()
+        old = list(self.manifest['segments'])
+        name = self._next_segment_name()
+        write_segment(self.root, name, documents)
+        self.manifest['segments'] = [name]
+        for doc in self.manifest['docs']:
+            doc['segment'] = name
+        self._write_manifest()
+        for segment_name in old:
+            for suffix in ('.terms.json', '.postings', '.text.json.gz'):
+                (self.root / f'{segment_name}{suffix}').unlink()
+
+    def _write_manifest(self):
+        atomic_write_text(self.manifest_path, json.dumps(self.manifest, separators=(',', ':')))
+        self.close()
+        self.reload()
+
+    # --- Reading ---
+
+    def postings(self, term, positions=False):
+        merged = {}
+        for segment in self.segments:
+            merged.update(segment.postings(term, positions))
+        return merged
+
+    def search(self, query, limit=10):
+        """BM25-ranked hits; every quoted phrase must occur in a hit."""
+        terms, phrases = parse_query(query)
+        if not self.docs or not (terms or phrases):
+            return []
+        n_docs = len(self.docs)
+        phrase_terms = {term for phrase in phrases for term in phrase}
+        positions = {term: self.postings(term, positions=True) for term in phrase_terms}
+        term_postings = {term: self.postings(term) for term in set(terms) - phrase_terms}
+        term_postings.update({term: {d: len(p) for d, p in postings.items()} for term, postings in positions.items()})
+        candidates = None
+        phrase_counts = []
+        for phrase in phrases:
+            lists = [positions[term] for term in phrase]
+            docs = set(lists[0]).intersection(*lists[1:])
+            counts = {doc_id: _phrase_count([postings[doc_id] for postings in lists]) for doc_id in docs}
+            counts = {doc_id: count for doc_id, count in counts.items() if count}
+            phrase_counts.append((phrase, counts))
+            candidates = set(counts) if candidates is None else candidates & set(counts)
+        scores = Counter()
+        scored_terms = [(term, term_postings[term]) for term in terms]
+        scored_terms += [(' '.join(phrase), counts) for phrase, counts in phrase_counts]
+        for _, postings in scored_terms:
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                length_norm = 1 - BM25_B + BM25_B * self.docs[doc_id]['length'] / self.avg_length
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+        hits = []
+        for doc_id, score in scores.most_common(limit):
+            doc = self.docs[doc_id]
+            hits.append(Hit(doc_id, round(score, 4), doc['accession'], doc.get('form'), doc.get('date'),
+                            doc['section'], doc.get('url')))
+        return hits
+
+    def snippet(self, hit, query, width=240):
+        """Text around the first query match in a hit's document."""
+        segment = next(s for s in self.segments if s.name == self.docs[hit.doc_id]['segment'])
+        text = segment.texts()[hit.doc_id]
+        terms, phrases = parse_query(query)
+        needles = [' '.join(phrase) for phrase in phrases] + terms
+        lowered = text.lower()
+        start = min((i for i in (lowered.find(needle) for needle in needles) if i >= 0), default=0)
+        begin = max(0, start - width // 3)
+        if begin:
+            # Start on a word boundary
+            begin = text.find(' ', begin) + 1 or begin
+        return ('...' if begin else '') + text[begin:begin + width].strip() + '...'
+
+
+# --- Indexing filings ---
+
+def filing_sections(html):
+    return split_sections(html_to_text(html))
+
+
+def fetch_sections(url, session=None):
+    import requests
+    from filing_index import HEADERS
+
+    response = (session or requests).get(url, headers=HEADERS, timeout=60)
+    response.raise_for_status()
+    return filing_sections(response.text)
+
+
+def collect_sections(prefetched):
+    """An extractor `on_html(url, html)` hook that keeps each downloaded filing's sections in `prefetched`."""
+    def on_html(url, html):
+        try:
+            prefetched[url] = filing_sections(html)
+        except Exception as e:
+            # index_filings downloads it again instead
+            log.warning('Could not split narrative sections of %s: %s', url, e)
+    return on_html
+
+
+def index_filings(filings, form, root=TEXT_INDEX_DIR, fetch=fetch_sections, prefetched=None):
+    """
+    Add the narrative sections of every filing ({'url', 'accession', 'date'})
+    not yet in the index; one new segment per call. `prefetched` maps URLs to
+    sections already taken from HTML the caller downloaded; only the other
+    filings are fetched. Returns the number of filings added.
+    """
+    prefetched = prefetched or {}
+    index = TextIndex(root)
+    added = 0
+    for filing in filings:
+        accession = filing.get('accession') or accession_from_url(filing.get('url'))
+        if not accession or index.has(accession):
+            continue
+        try:
+            sections = prefetched.get(filing['url'])
+            if sections is None:
+                sections = fetch(filing['url'])
+        except Exception as e:
+            log.warning('Text index skipped %s: %s', accession, e)
+            continue
+        if index.add_filing(accession, sections, form=form, date=filing.get('date'), url=filing.get('url')):
+            added += 1
+    index.commit()
+    index.close()
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the filing narrative text index")
+    parser.add_argument('--root', type=str, default=str(TEXT_INDEX_DIR), help='Index directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    search = commands.add_parser('search', help='BM25 search; quote phrases')
+    search.add_argument('query')
+    search.add_argument('--limit', type=int, default=10)
+    commands.add_parser('stats', help='Documents, segments and terms')
+    commands.add_parser('compact', help='Merge all segments into one')
+    args = parser.parse_args()
+    index = TextIndex(args.root)
+    if args.command == 'search':
+        for hit in index.search(args.query, args.limit):
+            print(f"{hit.score:8.3f}  {hit.form or '':5} {hit.date or '':10}  {hit.accession}  {hit.section}")
+            print(f"          {index.snippet(hit, args.query)}")
+    elif args.command == 'stats':
+        terms = sum(len(segment.terms) for segment in index.segments)
+        print(f"{len(index.docs)} documents from {len(index.accessions)} filings, "
+              f"{len(index.segments)} segments, {terms} segment terms")
+    else:
+        index.compact()
+        print(f"Compacted into {index.manifest['segments']}")
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,33 @@
-import json
+"""
+Validation rules for the dashboard JSON and the 10-K/10-Q extractor outputs.
+
+`validate(data)` walks a dashboard payload once and feeds every summary
+metric, quarterly metric, time series entry and raw metric entry to each
+rule's hooks. Rules keep only the state they need (seen periods, per-year
+quarterly sums) and report structured `Issue`s, so the refresh pipeline can
+validate the payload in-process and the CLI can print the same messages.
+
+`validate_path(path)` runs the same rules over a file without loading it:
+the file is streamed one metric (dashboard) or one filing (extractor list)
+at a time, so memory stays bounded by the largest single metric or filing.
+`validate_files(paths)` checks several files in parallel processes.
+
+Usage: python scripts/validate_dashboard_json.py [paths ...] [--workers N]
+"""
+
+import argparse
 import re
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
+
+from json_stream import iter_json_items, iter_object_items, peek_json_type
+from sales_series import SOURCES, TEN_K_SUMMARY_PATH, TEN_Q_REGION_PATH, TEN_Q_SUMMARY_PATH, parse_period_label
 
 # Update data file references to use the new data/ subfolder
 DASHBOARD_DATA_PATH = './apple_sec_dashboard_data.json'
 
-# Load the JSON file
-with open(DASHBOARD_DATA_PATH, 'r') as f:
-    data = json.load(f)
-
-issues = []
-current_year = datetime.now().year
-
 # Define balance sheet metrics
 BALANCE_SHEET_METRICS = {
     'total_assets': 'Total Assets',
@@ -20,25 +35,15 @@ BALANCE_SHEET_METRICS = {
     'shareholders_equity': 'Shareholders Equity'
 }
 
-def check_type_consistency(section, key, expected_type):
-    values = []
-    for metric, v in section.items():
-        val = v.get(key)
-        if val is not None:
-            values.append(type(val))
-            if not isinstance(val, expected_type):
-                issues.append(f"Type inconsistency in {metric}.{key}: {val} ({type(val)})")
-    return values
-
-def check_negative_values(section, key):
-    for metric, v in section.items():
-        val = v.get(key)
-        if val is not None:
-            try:
-                if float(val) < 0:
-                    issues.append(f"Negative value in {metric}.{key}: {val}")
-            except Exception:
-                pass
+METRIC_SECTIONS = ('summary_metrics', 'quarterly_metrics')
+RAW_ENTRY_LISTS = ('data', 'annual_data', 'quarterly_data')
+DEFAULT_PATHS = (DASHBOARD_DATA_PATH, TEN_K_SUMMARY_PATH, TEN_Q_SUMMARY_PATH, TEN_Q_REGION_PATH)
+
+ERROR = 'error'
+WARNING = 'warning'
+
+Issue = namedtuple('Issue', ['rule', 'path', 'severity', 'message'])
+
 
 def check_date_format(date_str):
     # Accepts 'YYYY-MM-DD' or 'YYYY-MM-DD 00:00:00'
@@ -46,11 +51,12 @@ def check_date_format(date_str):
         return False
     return True
 
+
 def check_date_range(start_date, end_date, is_balance_sheet=False):
     # For balance sheet metrics, we only need to check end date
     if is_balance_sheet:
         return check_date_format(str(end_date))
-    
+
     try:
         start = datetime.strptime(str(start_date).split()[0], '%Y-%m-%d')
         end = datetime.strptime(str(end_date).split()[0], '%Y-%m-%d')
@@ -58,248 +64,502 @@ def check_date_range(start_date, end_date, is_balance_sheet=False):
     except Exception:
         return False
 
-def check_dates(section, key):
-    for metric, v in section.items():
-        val = v.get(key)
-        if val is not None and not check_date_format(str(val)):
-            issues.append(f"Inconsistent date format in {metric}.{key}: {val}")
-
-def check_time_series_years(time_series):
-    years = set()
-    for entry in time_series:
-        years.add(entry.get('year'))
-    all_years = list(sorted(years))
-    missing = []
-    if all_years:
-        for y in range(int(min(all_years)), int(max(all_years))+1):
-            if y not in years:
-                missing.append(y)
-    if missing:
-        issues.append(f"Missing years in time_series_data: {missing}")
-
-def check_raw_metrics(raw_metrics):
-    for metric, meta in raw_metrics.items():
+
+def is_negative(val):
+    try:
+        return float(val) < 0
+    except Exception:
+        return False
+
+
+def is_after_year(val, year):
+    try:
+        return float(val) > year
+    except Exception:
+        return False
+
+
+# --- Rules ---
+
+class Rule:
+    """
+    Base class for validation rules. Hooks yield (path, message) pairs, or
+    (path, message, severity) to override the rule's default severity; a
+    rule overrides only the hooks it needs. A rule instance holds state for a
+    single traversal, so `validate` builds fresh ones each run.
+    """
+    name = 'rule'
+    severity = ERROR
+
+    def section_metric(self, section, metric, values, path):
+        return ()
+
+    def time_series_entry(self, entry, path):
+        return ()
+
+    def begin_raw_metric(self, metric, path):
+        return ()
+
+    def raw_entry(self, metric, kind, entry, path):
+        return ()
+
+    def end_raw_metric(self, metric, meta, path):
+        return ()
+
+    def filing(self, index, filing, path):
+        return ()
+
+    def filing_row(self, filing, section, row, path):
+        return ()
+
+    def finish(self):
+        return ()
+
+
+class FieldTypeRule(Rule):
+    name = 'field_type'
+
+    def __init__(self, section, key, expected_type):
+        self.section, self.key, self.expected_type = section, key, expected_type
+
+    def section_metric(self, section, metric, values, path):
+        val = values.get(self.key)
+        if section == self.section and val is not None and not isinstance(val, self.expected_type):
+            yield f"{path}.{self.key}", f"Type inconsistency in {metric}.{self.key}: {val} ({type(val)})"
+
+
+class NonNegativeFieldRule(Rule):
+    name = 'non_negative_field'
+
+    def __init__(self, section, key):
+        self.section, self.key = section, key
+
+    def section_metric(self, section, metric, values, path):
+        val = values.get(self.key)
+        if section == self.section and val is not None and is_negative(val):
+            yield f"{path}.{self.key}", f"Negative value in {metric}.{self.key}: {val}"
+
+
+class DateFieldRule(Rule):
+    name = 'date_field'
+
+    def __init__(self, section, key):
+        self.section, self.key = section, key
+
+    def section_metric(self, section, metric, values, path):
+        val = values.get(self.key)
+        if section == self.section and val is not None and not check_date_format(str(val)):
+            yield f"{path}.{self.key}", f"Inconsistent date format in {metric}.{self.key}: {val}"
+
+
+class TimeSeriesYearsRule(Rule):
+    name = 'time_series_years'
+    severity = WARNING
+
+    def __init__(self):
+        self.years = set()
+
+    def time_series_entry(self, entry, path):
+        self.years.add(entry.get('year'))
+        return ()
+
+    def finish(self):
+        years = sorted(y for y in self.years if y is not None)
+        if years:
+            missing = [y for y in range(int(years[0]), int(years[-1]) + 1) if y not in self.years]
+            if missing:
+                yield 'time_series_data', f"Missing years in time_series_data: {missing}"
+
+
+class RawEntryRule(Rule):
+    """Date format, date range, duplicate period and sign checks on raw_metrics.*.data."""
+    name = 'raw_entry'
+
+    def begin_raw_metric(self, metric, path):
+        self.seen_periods = set()
+        return ()
+
+    def raw_entry(self, metric, kind, entry, path):
+        if kind != 'data':
+            return
         is_balance_sheet = metric in BALANCE_SHEET_METRICS
-        seen_periods = set()
-        for entry in meta['data']:
-            start = entry.get('start')
-            end = entry.get('end')
-            
-            # For balance sheet metrics, we only validate end date
-            if not is_balance_sheet:
-                # Check for null start dates in non-balance sheet metrics
-                if start is None:
-                    issues.append(f"Null start date in {metric} for period ending {end}")
-                elif not check_date_format(str(start)):
-                    issues.append(f"Inconsistent date format in {metric} start: {start}")
-            if not check_date_format(str(end)):
-                issues.append(f"Inconsistent date format in {metric} end: {end}")
-            
-            if not is_balance_sheet and not check_date_range(start, end):
-                issues.append(f"Invalid date range in {metric}: start {start} is after end {end}")
-            
-            period = (start, end)
-            if period in seen_periods:
-                issues.append(f"Duplicate period in {metric}: {period}")
-            seen_periods.add(period)
-            val = entry.get('val')
-            if val is not None:
-                try:
-                    if float(val) < 0:
-                        issues.append(f"Negative value in {metric} period {period}: {val}")
-                except Exception:
-                    pass
+        start = entry.get('start')
+        end = entry.get('end')
 
-def check_growth_rates(metric_data):
-    for metric, meta in metric_data.items():
-        if 'growth_rates' not in meta:
-            continue
-        
+        # For balance sheet metrics, we only validate end date
+        if not is_balance_sheet:
+            # Check for null start dates in non-balance sheet metrics
+            if start is None:
+                yield path, f"Null start date in {metric} for period ending {end}"
+            elif not check_date_format(str(start)):
+                yield path, f"Inconsistent date format in {metric} start: {start}"
+        if not check_date_format(str(end)):
+            yield path, f"Inconsistent date format in {metric} end: {end}"
+
+        if not is_balance_sheet and not check_date_range(start, end):
+            yield path, f"Invalid date range in {metric}: start {start} is after end {end}"
+
+        period = (start, end)
+        if period in self.seen_periods:
+            yield path, f"Duplicate period in {metric}: {period}"
+        self.seen_periods.add(period)
+        val = entry.get('val')
+        if val is not None and is_negative(val):
+            yield path, f"Negative value in {metric} period {period}: {val}"
+
+
+class NullStartDateRule(Rule):
+    """Flow metrics need start dates in their annual and quarterly series."""
+    name = 'null_start_date'
+
+    def raw_entry(self, metric, kind, entry, path):
+        if kind != 'data' and metric not in BALANCE_SHEET_METRICS and entry.get('start') is None:
+            yield path, f"Null start date in {metric} {kind} for period ending {entry.get('end')}"
+
+
+class GrowthRateRule(Rule):
+    name = 'growth_rate'
+
+    def begin_raw_metric(self, metric, path):
+        self.points = []
+        return ()
+
+    def raw_entry(self, metric, kind, entry, path):
+        if kind == 'data':
+            self.points.append((entry['end'], entry['val']))
+        return ()
+
+    def end_raw_metric(self, metric, meta, path):
+        growth_rates = meta.get('growth_rates')
+        if growth_rates is None:
+            return
         # Sort data by date for comparison
-        data_points = sorted(meta['data'], key=lambda x: x['end'])
-        growth_rates = meta['growth_rates']
-        
-        # Verify growth rates match the data
-        for i in range(1, len(data_points)):
-            prev_val = float(data_points[i-1]['val'])
-            curr_val = float(data_points[i]['val'])
+        points = sorted(self.points, key=lambda p: p[0])
+        for i in range(1, min(len(points), len(growth_rates) + 1)):
+            prev_val = float(points[i - 1][1])
+            curr_val = float(points[i][1])
             if prev_val == 0:
                 continue
             expected_growth = ((curr_val - prev_val) / prev_val) * 100
-            actual_growth = growth_rates[i-1]['growth_rate']
-            
+            actual_growth = growth_rates[i - 1]['growth_rate']
+
             # Allow for small floating point differences
             if abs(expected_growth - actual_growth) > 0.01:
-                issues.append(f"Inconsistent growth rate in {metric}: expected {expected_growth:.2f}%, got {actual_growth:.2f}%")
-
-def check_future_years():
-    # Check summary_metrics
-    for metric, v in data.get('summary_metrics', {}).items():
-        year = v.get('latest_year')
-        if year is not None and float(year) > current_year:
-            issues.append(f"Future year in summary_metrics.{metric}: {year}")
-    # Check quarterly_metrics
-    for metric, v in data.get('quarterly_metrics', {}).items():
+                yield (f"{path}.growth_rates[{i - 1}]",
+                       f"Inconsistent growth rate in {metric}: expected {expected_growth:.2f}%, got {actual_growth:.2f}%")
+
+
+class AnnualQuarterlyRule(Rule):
+    """Four reported quarters must sum to the annual figure of the same fiscal year."""
+    name = 'annual_quarterly'
+
+    def begin_raw_metric(self, metric, path):
+        self.quarters = defaultdict(lambda: [0, 0.0])  # fy -> [count, sum]
+        self.annual = {}  # fy -> (end, value) of the first annual entry
+        return ()
+
+    def raw_entry(self, metric, kind, entry, path):
+        fy = entry.get('fy')
+        if fy is None or metric in BALANCE_SHEET_METRICS:
+            return ()
+        if kind == 'quarterly_data':
+            totals = self.quarters[fy]
+            totals[0] += 1
+            totals[1] += float(entry['val'])
+        elif kind == 'annual_data' and fy not in self.annual:
+            self.annual[fy] = (entry.get('end'), entry['val'])
+        return ()
+
+    def end_raw_metric(self, metric, meta, path):
+        for year, (count, quarter_sum) in self.quarters.items():
+            annual_end, annual_val = self.annual.get(year, (None, None))
+            if count != 4 or not annual_end:  # Only check complete years
+                continue
+            annual_val = float(annual_val)
+            if abs(quarter_sum - annual_val) > 0.01:  # Allow for small floating point differences
+                yield path, (f"Inconsistent annual/quarterly data in {metric} for year {year}: "
+                             f"sum of quarters ({quarter_sum}) != annual value ({annual_val})")
+
+
+class FutureYearRule(Rule):
+    name = 'future_year'
+
+    def __init__(self, current_year=None):
+        self.current_year = current_year or datetime.now().year
+
+    def section_metric(self, section, metric, values, path):
+        if section == 'summary_metrics':
+            year = values.get('latest_year')
+            if year is not None and is_after_year(year, self.current_year):
+                yield f"{path}.latest_year", f"Future year in summary_metrics.{metric}: {year}"
+            return
         for key in ['latest_quarterly_period', 'latest_annual_period']:
-            period = v.get(key)
+            period = values.get(key)
             if period:
                 try:
                     y = int(str(period)[:4])
-                    if y > current_year:
-                        issues.append(f"Future year in quarterly_metrics.{metric}.{key}: {period}")
                 except Exception:
-                    pass
+                    continue
+                if y > self.current_year:
+                    yield f"{path}.{key}", f"Future year in quarterly_metrics.{metric}.{key}: {period}"
         for key in ['latest_quarterly_value', 'latest_annual_value']:
-            year = v.get(key)
-            if year is not None and isinstance(year, (int, float)) and year > current_year:
-                issues.append(f"Future year in quarterly_metrics.{metric}.{key}: {year}")
-    # Check time_series_data
-    for entry in data.get('time_series_data', []):
+            year = values.get(key)
+            if year is not None and isinstance(year, (int, float)) and year > self.current_year:
+                yield f"{path}.{key}", f"Future year in quarterly_metrics.{metric}.{key}: {year}"
+
+    def time_series_entry(self, entry, path):
         year = entry.get('year')
-        if year is not None and float(year) > current_year:
-            issues.append(f"Future year in time_series_data: {year}")
-    # Check raw_metrics
-    for metric, meta in data.get('raw_metrics', {}).items():
-        for entry in meta.get('data', []):
-            fy = entry.get('fy')
-            if fy is not None and float(fy) > current_year:
-                issues.append(f"Future year in raw_metrics.{metric}.data: {fy}")
-        for entry in meta.get('annual_data', []):
-            fy = entry.get('fy')
-            if fy is not None and float(fy) > current_year:
-                issues.append(f"Future year in raw_metrics.{metric}.annual_data: {fy}")
-        for entry in meta.get('quarterly_data', []):
-            fy = entry.get('fy')
-            if fy is not None and float(fy) > current_year:
-                issues.append(f"Future year in raw_metrics.{metric}.quarterly_data: {fy}")
-
-def check_year_type():
-    # Check summary_metrics
-    for metric, v in data.get('summary_metrics', {}).items():
-        year = v.get('latest_year')
-        if year is not None and not isinstance(year, int):
-            issues.append(f"Non-integer year in summary_metrics.{metric}: {year} ({type(year)})")
-    # Check quarterly_metrics (only check *_period fields for year type, not *_value fields)
-    for metric, v in data.get('quarterly_metrics', {}).items():
-        for key in ['latest_quarterly_period', 'latest_annual_period']:
-            period = v.get(key)
-            if period:
-                try:
-                    y = int(str(period)[:4])
-                    if not isinstance(y, int):
-                        issues.append(f"Non-integer year in quarterly_metrics.{metric}.{key}: {period} ({type(y)})")
-                except Exception:
-                    pass
-        # Do NOT check *_value fields here (they are amounts, not years)
-    # Check time_series_data
-    for entry in data.get('time_series_data', []):
+        if year is not None and is_after_year(year, self.current_year):
+            yield path, f"Future year in time_series_data: {year}"
+
+    def raw_entry(self, metric, kind, entry, path):
+        fy = entry.get('fy')
+        if fy is not None and is_after_year(fy, self.current_year):
+            yield path, f"Future year in raw_metrics.{metric}.{kind}: {fy}"
+
+
+class YearTypeRule(Rule):
+    name = 'year_type'
+
+    def section_metric(self, section, metric, values, path):
+        # *_period fields in quarterly_metrics always yield an int prefix, and
+        # *_value fields are amounts, not years
+        year = values.get('latest_year')
+        if section == 'summary_metrics' and year is not None and not isinstance(year, int):
+            yield f"{path}.latest_year", f"Non-integer year in summary_metrics.{metric}: {year} ({type(year)})"
+
+    def time_series_entry(self, entry, path):
         year = entry.get('year')
         if year is not None and not isinstance(year, int):
-            issues.append(f"Non-integer year in time_series_data: {year} ({type(year)})")
-    # Check raw_metrics
-    for metric, meta in data.get('raw_metrics', {}).items():
-        for entry in meta.get('data', []):
-            fy = entry.get('fy')
-            if fy is not None and not isinstance(fy, int):
-                issues.append(f"Non-integer year in raw_metrics.{metric}.data: {fy} ({type(fy)})")
-        for entry in meta.get('annual_data', []):
-            fy = entry.get('fy')
-            if fy is not None and not isinstance(fy, int):
-                issues.append(f"Non-integer year in raw_metrics.{metric}.annual_data: {fy} ({type(fy)})")
-        for entry in meta.get('quarterly_data', []):
-            fy = entry.get('fy')
-            if fy is not None and not isinstance(fy, int):
-                issues.append(f"Non-integer year in raw_metrics.{metric}.quarterly_data: {fy} ({type(fy)})")
-
-def check_annual_quarterly_consistency(raw_metrics):
-    for metric, meta in raw_metrics.items():
-        is_balance_sheet = metric in BALANCE_SHEET_METRICS
-        if is_balance_sheet:
-            continue  # Skip consistency check for balance sheet metrics
-            
-        annual_data = {entry['end']: entry['val'] for entry in meta.get('annual_data', [])}
-        quarterly_data = meta.get('quarterly_data', [])
-        
-        # Group quarterly data by fiscal year
-        quarterly_by_year = defaultdict(list)
-        for entry in quarterly_data:
-            fy = entry.get('fy')
-            if fy is not None:
-                quarterly_by_year[fy].append(entry)
-        
-        # Check if sum of quarters matches annual data
-        for year, quarters in quarterly_by_year.items():
-            if len(quarters) == 4:  # Only check complete years
-                annual_end = None
-                for entry in meta.get('annual_data', []):
-                    if entry.get('fy') == year:
-                        annual_end = entry['end']
-                        annual_val = float(entry['val'])
-                        break
-                
-                if annual_end:
-                    quarter_sum = sum(float(q['val']) for q in quarters)
-                    if abs(quarter_sum - annual_val) > 0.01:  # Allow for small floating point differences
-                        issues.append(f"Inconsistent annual/quarterly data in {metric} for year {year}: "
-                                    f"sum of quarters ({quarter_sum}) != annual value ({annual_val})")
-
-def check_null_start_dates(raw_metrics):
-    """Check for null start dates in annual and quarterly data"""
-    for metric, meta in raw_metrics.items():
-        is_balance_sheet = metric in BALANCE_SHEET_METRICS
-        
-        # Skip balance sheet metrics as they don't need start dates
-        if is_balance_sheet:
+            yield path, f"Non-integer year in time_series_data: {year} ({type(year)})"
+
+    def raw_entry(self, metric, kind, entry, path):
+        fy = entry.get('fy')
+        if fy is not None and not isinstance(fy, int):
+            yield path, f"Non-integer year in raw_metrics.{metric}.{kind}: {fy} ({type(fy)})"
+
+
+def default_rules(current_year=None):
+    """The dashboard checks, in the order their issues are reported."""
+    return [
+        FieldTypeRule('summary_metrics', 'latest_year', (int, float, str)),
+        NonNegativeFieldRule('summary_metrics', 'latest_value'),
+        DateFieldRule('summary_metrics', 'latest_period'),
+        FieldTypeRule('quarterly_metrics', 'latest_quarterly_period', str),
+        NonNegativeFieldRule('quarterly_metrics', 'latest_quarterly_value'),
+        DateFieldRule('quarterly_metrics', 'latest_quarterly_period'),
+        NonNegativeFieldRule('quarterly_metrics', 'latest_annual_value'),
+        DateFieldRule('quarterly_metrics', 'latest_annual_period'),
+        TimeSeriesYearsRule(),
+        RawEntryRule(),
+        NullStartDateRule(),
+        GrowthRateRule(),
+        AnnualQuarterlyRule(),
+        FutureYearRule(current_year),
+        YearTypeRule(),
+    ]
+
+
+# --- Extractor output rules ---
+
+class FilingMetadataRule(Rule):
+    name = 'filing_metadata'
+
+    def __init__(self):
+        self.accessions = set()
+
+    def filing(self, index, filing, path):
+        for key in ('url', 'date', 'accession'):
+            if not filing.get(key):
+                yield path, f"Missing {key} in filing {index}"
+        accession = filing.get('accession')
+        if accession and accession in self.accessions:
+            yield path, f"Duplicate filing {accession}"
+        self.accessions.add(accession)
+
+
+def row_period(row):
+    return row.get('year') if 'year' in row else row.get('period')
+
+
+class FilingRowRule(Rule):
+    """Every row needs a member, a known period and a non-negative net sales amount."""
+    name = 'filing_row'
+
+    def filing_row(self, filing, section, row, path):
+        dimension = SOURCES[section]
+        accession = filing.get('accession')
+        member = row.get(dimension)
+        period = row_period(row)
+        if not member:
+            yield path, f"Missing {dimension} in {accession} {section}"
+        if 'year' in row:
+            if not isinstance(period, int):
+                yield path, f"Non-integer year in {accession} {section}: {period} ({type(period)})"
+        elif not isinstance(period, str) or (
+                'change' not in period.lower() and parse_period_label(period) is None):
+            yield path, f"Unrecognized period in {accession} {section}: {period}"
+        net_sales = row.get('net_sales')
+        if isinstance(period, str) and 'change' in period.lower():
+            return  # percent-change columns carry no amount
+        if not isinstance(net_sales, (int, float)):
+            yield path, f"Missing net sales for {member} {period} in {accession}"
+        elif net_sales < 0:
+            yield path, f"Negative net sales for {member} {period} in {accession}: {net_sales}"
+
+
+class DuplicateRowRule(Rule):
+    """A (member, period) pair should appear once per filing section; conflicting values are errors."""
+    name = 'duplicate_row'
+
+    def filing(self, index, filing, path):
+        self.seen = {}
+        return ()
+
+    def filing_row(self, filing, section, row, path):
+        dimension = SOURCES[section]
+        key = (section, row.get(dimension), row_period(row))
+        if key not in self.seen:
+            self.seen[key] = row.get('net_sales')
+            return
+        accession = filing.get('accession')
+        if self.seen[key] == row.get('net_sales'):
+            yield path, f"Repeated {dimension} row in {accession}: {key[1]} / {key[2]}", WARNING
+        else:
+            yield path, (f"Conflicting {dimension} rows in {accession}: {key[1]} / {key[2]} "
+                         f"({self.seen[key]} vs {row.get('net_sales')})")
+
+
+def filing_rules():
+    """Checks for the per-filing lists written by the 10-K/10-Q extractors."""
+    return [FilingMetadataRule(), FilingRowRule(), DuplicateRowRule()]
+
+
+# --- Traversal ---
+
+class Validator:
+    """Dispatches each visited node to every rule and collects their issues per rule."""
+
+    def __init__(self, rules=None):
+        self.rules = default_rules() if rules is None else rules
+        self.found = {id(rule): [] for rule in self.rules}
+
+    def _collect(self, rule, results):
+        for path, message, *severity in results or ():
+            self.found[id(rule)].append(Issue(rule.name, path, severity[0] if severity else rule.severity, message))
+
+    def section_metric(self, section, metric, values):
+        path = f"{section}.{metric}"
+        for rule in self.rules:
+            self._collect(rule, rule.section_metric(section, metric, values, path))
+
+    def time_series_entry(self, index, entry):
+        path = f"time_series_data[{index}]"
+        for rule in self.rules:
+            self._collect(rule, rule.time_series_entry(entry, path))
+
+    def raw_metric(self, metric, meta):
+        path = f"raw_metrics.{metric}"
+        for rule in self.rules:
+            self._collect(rule, rule.begin_raw_metric(metric, path))
+        for kind in RAW_ENTRY_LISTS:
+            for i, entry in enumerate(meta.get(kind) or []):
+                entry_path = f"{path}.{kind}[{i}]"
+                for rule in self.rules:
+                    self._collect(rule, rule.raw_entry(metric, kind, entry, entry_path))
+        for rule in self.rules:
+            self._collect(rule, rule.end_raw_metric(metric, meta, path))
+
+    def filing(self, index, filing, name='filings'):
+        path = f"{name}[{index}]"
+        for rule in self.rules:
+            self._collect(rule, rule.filing(index, filing, path))
+        for section in SOURCES:
+            for i, row in enumerate(filing.get(section) or []):
+                row_path = f"{path}.{section}[{i}]"
+                for rule in self.rules:
+                    self._collect(rule, rule.filing_row(filing, section, row, row_path))
+
+    def finish(self):
+        for rule in self.rules:
+            self._collect(rule, rule.finish())
+        return [issue for rule in self.rules for issue in self.found[id(rule)]]
+
+
+def validate_dashboard_items(items, rules=None):
+    """Validate a stream of depth-2 (path, value) dashboard items."""
+    validator = Validator(rules)
+    for path, value in items:
+        if len(path) < 2:
             continue
-            
-        # Check annual data
-        for entry in meta.get('annual_data', []):
-            start = entry.get('start')
-            end = entry.get('end')
-            if start is None:
-                issues.append(f"Null start date in {metric} annual_data for period ending {end}")
-        
-        # Check quarterly data
-        for entry in meta.get('quarterly_data', []):
-            start = entry.get('start')
-            end = entry.get('end')
-            if start is None:
-                issues.append(f"Null start date in {metric} quarterly_data for period ending {end}")
+        section, key = path[0], path[1]
+        if section in METRIC_SECTIONS:
+            validator.section_metric(section, key, value)
+        elif section == 'time_series_data':
+            validator.time_series_entry(key, value)
+        elif section == 'raw_metrics':
+            validator.raw_metric(key, value)
+    return validator.finish()
 
-def main():
-    print("--- Validating summary_metrics ---")
-    check_type_consistency(data['summary_metrics'], 'latest_year', (int, float, str))
-    check_negative_values(data['summary_metrics'], 'latest_value')
-    check_dates(data['summary_metrics'], 'latest_period')
 
-    print("--- Validating quarterly_metrics ---")
-    check_type_consistency(data['quarterly_metrics'], 'latest_quarterly_period', str)
-    check_negative_values(data['quarterly_metrics'], 'latest_quarterly_value')
-    check_dates(data['quarterly_metrics'], 'latest_quarterly_period')
-    check_negative_values(data['quarterly_metrics'], 'latest_annual_value')
-    check_dates(data['quarterly_metrics'], 'latest_annual_period')
+def validate_filing_items(items, rules=None, name='filings'):
+    """Validate a stream of depth-1 (path, filing) items from an extractor output list."""
+    validator = Validator(filing_rules() if rules is None else rules)
+    for path, filing in items:
+        validator.filing(path[0], filing, name)
+    return validator.finish()
+
+
+def validate(data, rules=None):
+    """Validate a dashboard payload in one traversal. Returns a list of Issues."""
+    return validate_dashboard_items(iter_object_items(data, 2), rules)
+
 
-    print("--- Validating time_series_data ---")
-    check_time_series_years(data.get('time_series_data', []))
+def validate_filings(filings, rules=None):
+    """Validate an in-memory extractor output list."""
+    return validate_filing_items(iter_object_items(filings, 1), rules)
 
-    print("--- Validating raw_metrics ---")
-    check_raw_metrics(data['raw_metrics'])
-    check_null_start_dates(data['raw_metrics'])
-    check_growth_rates(data['raw_metrics'])
-    check_annual_quarterly_consistency(data['raw_metrics'])
 
-    print("--- Checking for future years ---")
-    check_future_years()
+def validate_path(path, rules=None):
+    """Stream-validate a dashboard (object) or extractor output (list) file."""
+    path = str(path)
+    if peek_json_type(path) == '[':
+        return validate_filing_items(iter_json_items(path, 1), rules, Path(path).name)
+    return validate_dashboard_items(iter_json_items(path, 2), rules)
 
-    print("--- Checking for integer year fields ---")
-    check_year_type()
 
+def validate_files(paths, max_workers=None):
+    """Validate files in parallel processes. Returns {path: [Issue, ...]} in input order."""
+    paths = [str(p) for p in paths]
+    if len(paths) == 1 or max_workers == 1:
+        return {path: validate_path(path) for path in paths}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(paths, pool.map(validate_path, paths)))
+
+
+def validate_file(path=DASHBOARD_DATA_PATH, rules=None):
+    return validate_path(path, rules)
+
+
+def print_issues(issues):
     print("\n--- Issues found ---")
     if issues:
         for issue in issues:
-            print(issue)
+            print(issue.message)
     else:
         print("No issues found. JSON structure is valid.")
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate dashboard and 10-K/10-Q extractor JSON files")
+    parser.add_argument('paths', nargs='*', default=[str(p) for p in DEFAULT_PATHS], help='JSON files to validate')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    args = parser.parse_args()
+    paths = [p for p in args.paths if Path(p).exists()]
+    for path, issues in validate_files(paths, args.workers).items():
+        print(f"--- Validating {path} ---")
+        print_issues(issues)
+
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Shared pipeline modules live in scripts/ alongside the CLI entrypoints
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'scripts'))
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+
+from ask_server import build_index, close_index, create_app
+from async_http import start_server
+from data_index import DataIndex, IndexLoader
+from question_parser import AnswerEngine
+from test_text_index import filing_text
+from text_index import index_filings, split_sections
+
+DASHBOARD = {
+    'last_updated': '2025-06-21T03:41:53',
+    'raw_metrics': {
+        'revenue': {'metric_name': 'Total Revenue', 'data': [
+            {'start': '2023-10-01', 'end': '2024-09-28', 'val': 391035000000, 'form': '10-K'},
+            {'start': '2024-12-29', 'end': '2025-03-29', 'val': 95359000000, 'form': '10-Q'},
+        ]},
+        'total_assets': {'metric_name': 'Total Assets', 'data': [
+            {'end': '2024-09-28', 'val': 364980000000, 'form': '10-K'},
+            {'end': '2025-03-29', 'val': 331233000000, 'form': '10-Q'},
+        ]},
+    },
+}
+TEN_Q = [{'accession': 'q1', 'date': '2025-05-02', 'products_and_services': [
+    {'product': 'iPhone ®', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 46841.0},
+    {'product': 'iPhone ®', 'period': 'Six Months Ended March 29, 2025', 'net_sales': 115979.0},
+]}]
+
+
+def write_sources(tmp_path, dashboard=DASHBOARD):
+    paths = {'dashboard': tmp_path / 'dashboard.json', 'ten_q': tmp_path / '10q.json'}
+    paths['dashboard'].write_text(json.dumps(dashboard))
+    paths['ten_q'].write_text(json.dumps(TEN_Q))
+    return paths
+
+
+def test_index_periods_and_answers():
+    index = DataIndex(DASHBOARD, ten_q=TEN_Q)
+    assert index.metrics['revenue']['periods'] == ['FY2024', 'FY2025-Q2']
+    assert index.metrics['total_assets']['periods'] == ['FY2024', 'FY2025-Q2']
+    assert index.sales_point('product', 'iphone')['period'] == 'FY2025-Q2'
+    engine = AnswerEngine(index)
+    assert engine.ask('What was iPhone revenue?') == \
+        'iPhone net sales for FY2025-Q2 was $46.84B (10-Q, period ended 2025-03-29).'
+    assert engine.ask('total revenue in fy2024').startswith('Total Revenue for FY2024 was $391.04B')
+    assert "don't have Total Assets for FY2023" in engine.ask('assets 2023')
+
+
+def test_loader_swaps_index_when_files_change(tmp_path):
+    paths = write_sources(tmp_path)
+    loader = IndexLoader(paths)
+    assert loader.reload_if_changed()
+    first = loader.index
+    assert not loader.reload_if_changed()
+    paths['dashboard'].write_text('{not json')
+    os.utime(paths['dashboard'], ns=(1, 1))
+    assert not loader.reload_if_changed()
+    assert loader.index is first
+    updated = json.loads(json.dumps(DASHBOARD))
+    updated['raw_metrics']['revenue']['data'][1]['val'] = 1
+    paths['dashboard'].write_text(json.dumps(updated))
+    assert loader.reload_if_changed()
+    assert loader.index.metric_point('revenue')['value'] == 1
+
+
+
+def test_reload_closes_the_replaced_text_index(tmp_path):
+    paths = write_sources(tmp_path)
+    index_filings([{'url': 'k1', 'accession': 'k1'}], '10-K', tmp_path, lambda url: split_sections(filing_text()))
+    paths['text_index'] = tmp_path / 'manifest.json'
+    loader = IndexLoader(paths, build=build_index, retire=close_index)
+    loader.reload_if_changed()
+    first = loader.index.engine.text_index
+    assert first.segments
+    paths['dashboard'].write_text(json.dumps(dict(DASHBOARD, last_updated='2025-06-22T03:41:53')))
+    os.utime(paths['dashboard'], ns=(1, 1))
+    assert loader.reload_if_changed()
+    assert first.segments == [] and loader.index.engine.text_index.segments
+    loader.index.engine.text_index.close()
+
+async def post(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode()
+    length = int(head.lower().split('content-length:')[1].split('\r\n')[0])
+    body = await reader.readexactly(length)
+    writer.close()
+    return head, body
+
+
+def test_ask_endpoint_over_http(tmp_path):
+    loader = IndexLoader(write_sources(tmp_path), build=build_index)
+    loader.reload_if_changed()
+
+    async def scenario():
+        server = await start_server(create_app(loader))
+        port = server.sockets[0].getsockname()[1]
+        body = json.dumps({'question': 'iPhone sales q2 2025'}).encode()
+        head, reply = await post(port, b'POST /ask HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        preflight, _ = await post(port, b'OPTIONS /ask HTTP/1.1\r\n\r\n')
+        bad, bad_reply = await post(port, b'POST /ask HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}')
+        server.close()
+        await server.wait_closed()
+        return head, reply, preflight, bad, bad_reply
+
+    head, reply, preflight, bad, bad_reply = asyncio.run(scenario())
+    assert head.startswith('HTTP/1.1 200') and 'Access-Control-Allow-Origin: *' in head
+    assert json.loads(reply)['answer'].startswith('iPhone net sales for FY2025-Q2')
+    assert preflight.startswith('HTTP/1.1 204') and 'Access-Control-Allow-Methods' in preflight
+    assert bad.startswith('HTTP/1.1 400') and 'answer' in json.loads(bad_reply)
@@ -0,0 +1,38 @@
+from backfill_log import BackfillLog, select_filings
+
+FILINGS = [{'url': f'https://sec.example/{n}.htm', 'accession': f'a{n}', 'date': f'2025-0{n}-01'} for n in (3, 2, 1)]
+
+
+def run(log, filings, broken=(), crash_after=None, **flags):
+    processed = []
+    for filing in select_filings(log, filings, **flags):
+        if crash_after is not None and len(processed) == crash_after:
+            with open(log.path, 'a') as f:
+                f.write('{"key": "a1", "stat')  # killed mid-write
+            return processed
+        processed.append(filing['accession'])
+        if filing['accession'] in broken:
+            log.record_failure(filing, ValueError('no revenue table'))
+        else:
+            log.record_success(filing, {'accession': filing['accession'], 'date': filing['date']})
+    return processed
+
+
+def test_resume_and_retry_failures(tmp_path):
+    log = BackfillLog.for_output('10q_summary_data.json', tmp_path)
+    assert log.path.name == '10q_summary_data.jsonl'
+    assert run(log, FILINGS, broken=('a2',), crash_after=2) == ['a3', 'a2']
+    assert log.completed() == {'a3'}
+
+    assert run(log, FILINGS, broken=('a2',), resume=True) == ['a2', 'a1']
+    assert [entry['status'] for entry in log.entries()] == ['ok', 'failed', 'failed', 'ok']
+    assert [f['accession'] for f in log.failures()] == ['a2']
+    assert log.failures()[0]['error'] == 'no revenue table'
+
+    assert run(log, [], retry_failures=True) == ['a2']
+    assert log.failures() == []
+    assert [r['accession'] for r in log.results()] == ['a3', 'a2', 'a1']
+
+    # A fresh run starts a new log
+    assert run(log, FILINGS[:1]) == ['a3']
+    assert [r['accession'] for r in log.results()] == ['a3']
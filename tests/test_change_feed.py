@@ -0,0 +1,55 @@
+import asyncio
+
+from async_http import start_server
+from change_feed import RESYNC, ChangeFeed
+from data_index import IndexLoader
+from data_server import create_app
+from snapshot_store import SnapshotStore
+from test_snapshot_store import make_payload
+
+
+def test_new_snapshots_are_summarized(tmp_path):
+    store = SnapshotStore(tmp_path)
+    store.record(make_payload(1, [10]))
+    feed = ChangeFeed(store)
+    assert feed.new_changes() == []
+    store.record(make_payload(2, [10, 20]))
+    [summary] = feed.new_changes()
+    assert (summary['snapshot'], summary['previous']) == ('20250702T030000', '20250701T030000')
+    assert summary['metrics'] == ['revenue'] and summary['sections'] == ['summary_metrics']
+    assert summary['new_periods'] == ['FY2020-Q3']
+    assert summary['shards'] == ['data/dashboard/summary.json', 'data/dashboard/metrics/revenue.json']
+    feed.publish_change(summary)
+    assert feed.replay('20250702T030000') == []
+    assert feed.replay('20250701T000000') == [RESYNC]
+
+
+def test_events_stream_over_http(tmp_path):
+    store = SnapshotStore(tmp_path / 'snapshots')
+    store.record(make_payload(1, [10]))
+    feed = ChangeFeed(store)
+
+    async def scenario():
+        server = await start_server(create_app(IndexLoader({}), tmp_path, feed))
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /events HTTP/1.1\r\n\r\n')
+        head = (await reader.readuntil(b'\r\n\r\n')).decode()
+        retry = await reader.readuntil(b'\n\n')
+        store.record(make_payload(2, [10, 20]))
+        for summary in feed.new_changes():
+            feed.publish_change(summary)
+        event = await reader.readuntil(b'\n\n')
+        feed.close()
+        rest = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return head, retry, event, rest
+
+    head, retry, event, rest = asyncio.run(scenario())
+    assert head.startswith('HTTP/1.1 200') and 'Content-Type: text/event-stream' in head
+    assert 'Content-Length' not in head and 'Connection: close' in head
+    assert retry == b'retry: 5000\n\n' and rest == b''
+    assert event.startswith(b'id: 20250702T030000\nevent: change\ndata: {"snapshot":"20250702T030000"')
+    assert not feed.subscribers
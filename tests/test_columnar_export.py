@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+from columnar_export import export_facts, export_filing_tables, export_sales_series, read_dataset
+
+
+def test_facts_are_typed_and_partitioned_by_metric(tmp_path):
+    raw_metrics = {
+        'revenue': {'source_field': 'Revenues', 'data': [
+            {'start': '2023-10-01', 'end': '2024-09-28 00:00:00', 'val': '391035000000', 'fy': 2024, 'form': '10-K'},
+        ]},
+        'total_assets': {'source_field': 'Assets', 'data': [
+            {'end': '2024-09-28', 'val': 364980000000, 'fy': 2024, 'form': '10-K'},
+        ]},
+    }
+    root = export_facts(raw_metrics, tmp_path)
+    assert sorted(p.name for p in root.iterdir()) == ['metric=revenue', 'metric=total_assets']
+    table = read_dataset('facts', tmp_path).to_table().sort_by('val')
+    assert table.schema.field('val').type == pa.int64()
+    assert table.schema.field('end').type == pa.date32()
+    rows = table.to_pylist()
+    assert rows[0]['start'] is None and rows[0]['metric'] == 'total_assets'
+    assert rows[1]['val'] == 391035000000 and rows[1]['end'] == datetime.date(2024, 9, 28)
+
+
+def test_filing_tables_replace_only_their_partitions(tmp_path):
+    summary = [{'accession': 'a1', 'date': '2025-05-02', 'products_and_services': [
+        {'product': 'iPhone ®', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 46841.0},
+    ]}]
+    region = [{'accession': 'a1', 'date': '2025-05-02', 'region_operating': [
+        {'region': 'Americas', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 40315.0},
+        {'region': 'Americas', 'period': 'Three Months Ended Change March 30, 2024', 'net_sales': None},
+    ]}]
+    export_filing_tables(summary, '10-Q', tmp_path, 'arrow')
+    export_filing_tables(region, '10-Q', tmp_path, 'arrow')
+    export_filing_tables(region[:0], '10-Q', tmp_path, 'arrow')
+    rows = read_dataset('filing_tables', tmp_path, 'arrow').to_table().to_pylist()
+    by_member = {(r['member'], r['fiscal_period']): r for r in rows}
+    assert set(by_member) == {('iPhone', 'Q2'), ('Americas', 'Q2'), ('Americas', None)}
+    assert by_member[('iPhone', 'Q2')]['end'] == datetime.date(2025, 3, 29)
+    assert by_member[('iPhone', 'Q2')]['section'] == 'products_and_services'
+
+
+def test_sales_series_export(tmp_path):
+    records = [{'dimension': 'product', 'member': 'iPhone', 'period': 'FY2024-Q4', 'fiscal_year': 2024,
+                'fiscal_period': 'Q4', 'end': None, 'net_sales': 46222.0, 'form': '10-K',
+                'accession': 'k', 'filed': '2024-11-01', 'derived': True}]
+    export_sales_series(records, tmp_path)
+    [row] = read_dataset('sales_series', tmp_path).to_table().to_pylist()
+    assert row['derived'] is True and row['filed'] == datetime.date(2024, 11, 1) and row['form'] == '10-K'
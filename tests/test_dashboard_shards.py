@@ -0,0 +1,32 @@
+import gzip
+import json
+
+from dashboard_shards import compact_dashboard, compact_metric, expand_metric, load_compact_dashboard, save_compact_dashboard
+
+
+def test_compact_metric_stores_each_record_once():
+    annual = {'start': '2023-10-01', 'end': '2024-09-28', 'val': 391035000000, 'fy': 2024, 'form': '10-K'}
+    quarter = {'start': '2024-09-29', 'end': '2024-12-28', 'val': 124300000000, 'fy': 2025, 'form': '10-Q'}
+    meta = {'metric_name': 'Total Revenue', 'data': [annual, quarter], 'annual_data': [dict(annual)],
+            'quarterly_data': [dict(quarter)], 'growth_rates': []}
+    shard = compact_metric(meta)
+    assert len(shard['records']) == 2
+    assert (shard['data'], shard['annual'], shard['quarterly']) == ([0, 1], [0], [1])
+    assert shard['meta'] == {'metric_name': 'Total Revenue', 'growth_rates': []}
+    assert expand_metric(shard) == meta
+
+
+def test_save_compact_dashboard_round_trips(tmp_path):
+    with open('./apple_sec_dashboard_data.json') as f:
+        dashboard = json.load(f)
+    summary, shards = compact_dashboard(dashboard)
+    assert 'raw_metrics' not in summary
+    assert set(summary['metric_shards']) == set(shards) == set(dashboard['raw_metrics'])
+
+    (tmp_path / 'metrics').mkdir()
+    (tmp_path / 'metrics' / 'retired.json').write_text('{}')
+    summary_path = save_compact_dashboard(dashboard, tmp_path)
+    assert not (tmp_path / 'metrics' / 'retired.json').exists()
+    with gzip.open(str(summary_path) + '.gz', 'rt') as f:
+        assert json.load(f) == json.loads(summary_path.read_text())
+    assert load_compact_dashboard(tmp_path) == dashboard
@@ -0,0 +1,140 @@
+import asyncio
+import gzip
+import json
+import os
+from types import SimpleNamespace
+
+from async_http import start_server
+from data_index import IndexLoader
+from data_server import SliceCache, create_app, negotiate_encoding
+from fact_warehouse import build_warehouse
+from test_ask_server import write_sources
+from test_fact_warehouse import CONCEPT, make_companyfacts
+
+
+async def fetch(port, path, headers=()):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    lines = [f'GET {path} HTTP/1.1', 'Connection: close'] + list(headers)
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode()
+    body = await reader.read()
+    writer.close()
+    status = int(head.split(' ')[1])
+    fields = dict(line.split(': ', 1) for line in head.strip().split('\r\n')[1:])
+    return status, fields, body
+
+
+def serve_and_fetch(loader, root, requests):
+    async def scenario():
+        server = await start_server(create_app(loader, root))
+        port = server.sockets[0].getsockname()[1]
+        replies = []
+        for path, headers in requests:
+            replies.append(await fetch(port, path, headers))
+        server.close()
+        await server.wait_closed()
+        return replies
+
+    return asyncio.run(scenario())
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding('gzip, deflate, br', ('br', 'gzip')) == 'br'
+    assert negotiate_encoding('br;q=0.5, gzip', ('br', 'gzip')) == 'gzip'
+    assert negotiate_encoding('gzip', ()) == 'identity'
+    assert negotiate_encoding(None, ('gzip',)) == 'identity'
+    assert negotiate_encoding('identity;q=0', ()) is None
+
+
+def test_slice_cache_keeps_the_most_recently_used_bodies():
+    cache = SliceCache(SimpleNamespace(index=object()), max_entries=2)
+    built = []
+
+    def build(target):
+        return lambda index: built.append(target) or {'target': target}
+
+    for target in ('a', 'b', 'a', 'c', 'a', 'b'):
+        cache.get(target, build(target))
+    assert built == ['a', 'b', 'c', 'b']
+    assert list(cache.entries) == ['a', 'b']
+
+
+def test_static_files_with_etags_and_compression(tmp_path):
+    loader = IndexLoader(write_sources(tmp_path))
+    (tmp_path / 'demo.html').write_text('<html>' + 'x' * 2000 + '</html>')
+    shard = tmp_path / 'data' / 'shard.json'
+    shard.parent.mkdir()
+    shard.write_text(json.dumps({'values': list(range(500))}))
+    # A stale precompressed sibling is ignored
+    (tmp_path / 'data' / 'shard.json.gz').write_bytes(gzip.compress(b'{"stale":true}'))
+    os.utime(tmp_path / 'data' / 'shard.json.gz', ns=(1, 1))
+    (tmp_path / '.secret.json').write_text('{}')
+
+    first = serve_and_fetch(loader, tmp_path, [('/', ()), ('/data/shard.json', ('Accept-Encoding: gzip',))])
+    (status, page_headers, page), (_, headers, body) = first
+    assert status == 200 and page.startswith(b'<html>') and page_headers['Cache-Control'] == 'no-cache'
+    assert headers['Content-Encoding'] == 'gzip' and headers['Vary'] == 'Accept-Encoding'
+    assert json.loads(gzip.decompress(body))['values'][-1] == 499
+
+    replies = serve_and_fetch(loader, tmp_path, [
+        ('/data/shard.json', ('Accept-Encoding: gzip', f"If-None-Match: {headers['ETag']}")),
+        ('/data/shard.json', (f"If-None-Match: {headers['ETag']}",)),
+        ('/.secret.json', ()),
+        ('/../etc/passwd', ()),
+    ])
+    assert [reply[0] for reply in replies] == [304, 200, 404, 404]
+    assert replies[1][1]['ETag'] != headers['ETag'] and 'Content-Encoding' not in replies[1][1]
+
+
+def test_slice_endpoints(tmp_path):
+    loader = IndexLoader(write_sources(tmp_path))
+    loader.reload_if_changed()
+    replies = serve_and_fetch(loader, tmp_path, [
+        ('/api/metrics', ()),
+        ('/api/metrics/revenue?from=FY2025', ()),
+        ('/api/metrics/revenue?to=fy2024', ()),
+        ('/api/sales/product/iphone', ()),
+        ('/api/periods/FY2025-Q2', ()),
+        ('/api/metrics/nope', ()),
+        ('/api/metrics/revenue?from=2024', ()),
+    ])
+    (_, _, catalogue), (_, headers, recent), (_, _, older), (_, _, iphone), (_, _, period) = replies[:5]
+    assert [m['key'] for m in json.loads(catalogue)['metrics']] == ['revenue', 'total_assets']
+    assert [p['period'] for p in json.loads(recent)['points']] == ['FY2025-Q2']
+    assert [p['period'] for p in json.loads(older)['points']] == ['FY2024']
+    assert headers['ETag'].startswith('"')
+    assert [p['value'] for p in json.loads(iphone)['points']] == [46841000000.0, 115979000000.0]
+    assert set(json.loads(period)['metrics']) == {'revenue', 'total_assets'}
+    assert [reply[0] for reply in replies[5:]] == [404, 400]
+
+
+def test_warehouse_endpoints(tmp_path):
+    loader = IndexLoader(write_sources(tmp_path))
+    db = tmp_path / 'facts.sqlite'
+
+    async def scenario():
+        server = await start_server(create_app(loader, tmp_path, warehouse_path=db))
+        port = server.sockets[0].getsockname()[1]
+        missing = await fetch(port, f'/api/facts/{CONCEPT}')
+        build_warehouse(db, make_companyfacts())
+        replies = [await fetch(port, path) for path in (
+            f'/api/facts/{CONCEPT}?form=10-Q&start=2024-01-01',
+            f'/api/facts/{CONCEPT}/latest',
+            '/api/facts?form=10-Q&fy=2025&fp=q1',
+            '/api/filings/0000320193-25-000008',
+            '/api/filings/nope',
+            f'/api/facts/{CONCEPT}?start=last-year',
+        )]
+        server.close()
+        await server.wait_closed()
+        return missing, replies
+
+    missing, replies = asyncio.run(scenario())
+    assert missing[0] == 503
+    (_, _, series), (_, _, latest), (_, _, period), (_, _, filing) = replies[:4]
+    assert [f['val'] for f in json.loads(series)['facts']] == [124300000000]
+    assert json.loads(latest)['end'] == '2024-12-28'
+    assert len(json.loads(period)['facts']) == 2
+    assert {f['unit'] for f in json.loads(filing)['facts']} == {'USD', 'shares'}
+    assert [reply[0] for reply in replies[4:]] == [404, 400]
@@ -0,0 +1,48 @@
+from fact_warehouse import FactWarehouse, build_warehouse
+
+CONCEPT = 'RevenueFromContractWithCustomerExcludingAssessedTax'
+
+
+def make_companyfacts():
+    facts = [
+        {'start': '2023-10-01', 'end': '2024-09-28', 'val': 391035000000, 'fy': 2024, 'fp': 'FY',
+         'form': '10-K', 'accn': '0000320193-24-000123', 'filed': '2024-11-01'},
+        {'start': '2024-09-29', 'end': '2024-12-28', 'val': 124300000000, 'fy': 2025, 'fp': 'Q1',
+         'form': '10-Q', 'accn': '0000320193-25-000008', 'filed': '2025-01-31'},
+        {'start': '2023-10-01', 'end': '2023-12-30', 'val': 119575000000, 'fy': 2025, 'fp': 'Q1',
+         'form': '10-Q', 'accn': '0000320193-25-000008', 'filed': '2025-01-31'},
+    ]
+    return {'facts': {
+        'us-gaap': {CONCEPT: {'units': {'USD': facts}}},
+        'dei': {'EntityCommonStockSharesOutstanding': {'units': {'shares': [
+            {'end': '2025-01-17', 'val': 15000000000, 'form': '10-Q', 'accn': '0000320193-25-000008'}]}}},
+    }}
+
+
+def test_build_and_query(tmp_path):
+    db = tmp_path / 'facts.sqlite'
+    ten_q = [{'accession': '0000320193-25-000008', 'date': '2025-01-31', 'products_and_services': [
+        {'product': 'iPhone ®', 'period': 'Three Months Ended December 28, 2024', 'net_sales': 69138.0}]}]
+    series = [{'dimension': 'product', 'member': 'iPhone', 'period': 'FY2024-Q4', 'fiscal_year': 2024,
+               'fiscal_period': 'Q4', 'net_sales': 46222.0, 'form': '10-K', 'derived': True}]
+    counts = build_warehouse(db, make_companyfacts(), ten_q=ten_q, series=series)
+    assert counts == {'facts': 4, 'filing_rows': 1, 'sales_series': 1}
+
+    with FactWarehouse(db) as warehouse:
+        assert [f['end'] for f in warehouse.concept_series(CONCEPT)] == ['2023-12-30', '2024-09-28', '2024-12-28']
+        assert [f['val'] for f in warehouse.concept_series(CONCEPT, form='10-Q', start='2024-01-01')] == [124300000000]
+        assert warehouse.latest(CONCEPT)['end'] == '2024-12-28'
+        assert len(warehouse.facts_for_period('10-Q', 2025, 'Q1')) == 2
+        assert {f['unit'] for f in warehouse.facts_for_accession('0000320193-25-000008')} == {'USD', 'shares'}
+        [row] = warehouse.filing_rows('0000320193-25-000008')
+        assert (row['member'], row['fiscal_year'], row['fiscal_period']) == ('iPhone', 2025, 'Q1')
+        assert warehouse.query('SELECT derived FROM sales_series WHERE member = ?', ['iPhone']) == [{'derived': 1}]
+
+
+def test_rebuild_replaces_contents(tmp_path):
+    db = tmp_path / 'facts.sqlite'
+    build_warehouse(db, make_companyfacts())
+    build_warehouse(db, {'facts': {}})
+    with FactWarehouse(db) as warehouse:
+        assert warehouse.query('SELECT COUNT(*) AS n FROM facts') == [{'n': 0}]
+    assert [p.name for p in tmp_path.iterdir()] == ['facts.sqlite']
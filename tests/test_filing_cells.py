@@ -0,0 +1,43 @@
+import math
+
+from filing_cells import (
+    KIND_DASH, KIND_EMPTY, KIND_NUMBER, KIND_PERCENT, KIND_TEXT, normalize_table, parse_cell
+)
+
+
+def test_parse_cell_formats():
+    assert parse_cell('$ 1,234.5') == (1234.5, KIND_NUMBER, 1)
+    assert parse_cell('(15)') == (-15.0, KIND_NUMBER, 1)
+    assert parse_cell('(2)%') == (-2.0, KIND_PERCENT, 1)
+    assert parse_cell('8 %') == (8.0, KIND_PERCENT, 1)
+    assert parse_cell('—') == (0.0, KIND_DASH, 1)
+    assert parse_cell('$1.2 billion') == (1.2, KIND_NUMBER, 1_000_000_000)
+    assert parse_cell('iPhone (1)') == (None, KIND_TEXT, 1)
+    assert parse_cell('') == (None, KIND_EMPTY, 1)
+
+
+def test_normalize_table_reads_table_scale_hint():
+    cells = normalize_table([
+        ['(In millions)', ''],
+        ['Mac', '$', '7,949', '5%', ''],
+    ])
+    assert cells.kinds.shape == (2, 5)
+    assert cells.value(1, 2) == 7949.0
+    assert cells.scale_hint == 1_000_000
+    assert cells.kind(0, 4) == KIND_EMPTY and math.isnan(cells.values[0, 4])
+    assert cells.value(1, 1) is None
+    assert cells.value(1, 9) is None
+
+
+def test_number_only_lookup_skips_dashes_and_percents():
+    cells = normalize_table([['Services', '$', '—', '8%', '96,169']])
+    assert cells.value(0, 2) == 0.0
+    assert cells.value(0, 2, kinds=(KIND_NUMBER,)) is None
+    assert cells.value(0, 3, kinds=(KIND_NUMBER,)) is None
+    assert cells.value(0, 4, kinds=(KIND_NUMBER,)) == 96169.0
+
+
+def test_cell_scale_words_are_converted_to_the_table_unit():
+    in_millions = normalize_table([['(In millions)'], ['Services', '$1.2 billion', '96,169']])
+    assert in_millions.value(1, 1) == 1200.0 and in_millions.value(1, 2) == 96169.0
+    assert normalize_table([['Services', '$1.2 billion']]).value(0, 1) == 1_200_000_000.0
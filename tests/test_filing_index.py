@@ -0,0 +1,71 @@
+import json
+
+from filing_index import FilingIndex, conditional_get
+
+SUBMISSIONS = {
+    'filings': {
+        'recent': {
+            'accessionNumber': ['0000320193-25-000057', '0000320193-24-000123', '0000320193-25-000001'],
+            'filingDate': ['2025-05-02', '2024-11-01', '2025-01-31'],
+            'reportDate': ['2025-03-29', '2024-09-28', '2024-12-28'],
+            'form': ['10-Q', '10-K', '8-K'],
+            'primaryDocument': ['aapl-20250329.htm', 'aapl-20240928.htm', 'x.htm'],
+        },
+        'files': [{'name': 'CIK0000320193-submissions-001.json'}],
+    }
+}
+SHARD = {
+    'accessionNumber': ['0000320193-05-000100', '0000320193-24-000123'],
+    'filingDate': ['2005-08-10', '2024-11-01'],
+    'reportDate': ['2005-06-25', '2024-09-28'],
+    'form': ['10-Q', '10-K'],
+    'primaryDocument': ['d10q.htm', 'aapl-20240928.htm'],
+}
+
+
+def test_index_merges_shards_newest_first_without_duplicates():
+    index = FilingIndex.from_submissions('320193', SUBMISSIONS, [SHARD])
+    assert len(index) == 4
+    assert [f['accession'] for f in index.filter('10-Q')] == ['0000320193-25-000057', '0000320193-05-000100']
+    assert index.filter('10-K')[0]['url'] == (
+        'https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/aapl-20240928.htm')
+    assert len(index.filter(['10-K', '10-Q'], count=2)) == 2
+    assert index.accessions('8-K') == {'0000320193-25-000001'}
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self._payload = payload
+        self.headers = headers or {}
+        self.content = b'' if payload is None else json.dumps(payload).encode()
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.sent_headers.append(headers)
+        return self.responses.pop(0)
+
+
+def test_conditional_get_revalidates_with_etag(tmp_path):
+    path = tmp_path / 'CIK0000320193.json'
+    session = FakeSession([
+        FakeResponse(200, SUBMISSIONS, {'ETag': '"abc"'}),
+        FakeResponse(304),
+    ])
+    data, changed = conditional_get('https://example/sub.json', path, session)
+    assert changed and json.loads(path.read_text()) == SUBMISSIONS
+
+    data, changed = conditional_get('https://example/sub.json', path, session)
+    assert not changed and data == SUBMISSIONS
+    assert session.sent_headers[1]['If-None-Match'] == '"abc"'
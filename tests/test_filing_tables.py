@@ -0,0 +1,51 @@
+from filing_tables import columns_to_records, concat_columns, index_rows_by_label, tidy_multi_year_table
+
+TABLE = [
+    ['', '2024', '', 'Change', '', '2023'],
+    ['iPhone (1)', '$', '201,183', '(2)', '%', '$', '200,583'],
+    ['Mac', '$', '29,984', '2', '%', '$', '29,357'],
+    ['Mac', '$', '1', '2', '%', '$', '2'],
+    ['Total net sales', '$', '391,035', '2', '%', '$', '383,285'],
+]
+
+
+def strip_footnote(label):
+    return label.replace(' (1)', '')
+
+
+def value_after_year(cells, r, year_cols, idx):
+    col_idx = year_cols[idx][0] + 1
+    if cells.text(r, col_idx) == '$':
+        col_idx += 1
+    return cells.value(r, col_idx)
+
+
+def test_index_rows_by_label_keeps_first_row_and_order():
+    index = index_rows_by_label(TABLE, strip_footnote, start=1)
+    assert index == {'iPhone': 1, 'Mac': 2, 'Total net sales': 4}
+
+
+def test_tidy_multi_year_table_is_stable_long_format():
+    rows = tidy_multi_year_table(TABLE, 'product', 'product', strip_footnote,
+                                 value_after_year, include_previous=True)
+    assert [(r['product'], r['year']) for r in rows] == [
+        ('iPhone', 2024), ('iPhone', 2023),
+        ('Mac', 2024), ('Mac', 2023),
+        ('Total net sales', 2024), ('Total net sales', 2023),
+    ]
+    assert rows[0]['previous_year_net_sales'] == 200583.0
+    assert 'previous_year' not in rows[1]
+    assert rows[-1]['type'] == 'total'
+
+
+def test_concat_columns_backfills_missing_fields():
+    merged = concat_columns([
+        {'region': ['Americas'], 'net_sales': [40315.0]},
+        {'region': ['Japan', 'Japan'], 'percent_change': [-15.0, None], 'net_sales': [None, 6262.0]},
+    ])
+    assert merged == {
+        'region': ['Americas', 'Japan', 'Japan'],
+        'net_sales': [40315.0, None, 6262.0],
+        'percent_change': [None, -15.0, None],
+    }
+    assert columns_to_records(merged)[1] == {'region': 'Japan', 'percent_change': -15.0}
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from filing_watcher import FilingWatcher
+from pipeline import StageResult
+
+
+def submissions(*filings):
+    return {'filings': {'recent': {
+        'accessionNumber': [f[0] for f in filings], 'form': [f[1] for f in filings],
+        'filingDate': [f[2] for f in filings], 'reportDate': [''] * len(filings),
+        'primaryDocument': ['doc.htm'] * len(filings),
+    }}}
+
+
+def companyfacts(*accessions):
+    return {'facts': {'us-gaap': {'Revenues': {'units': {'USD': [{'accn': a, 'val': 1} for a in accessions]}}}}}
+
+
+class FakeSEC:
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+
+    def __call__(self, url, cache_path):
+        kind = 'facts' if 'companyfacts' in url else 'submissions'
+        self.requests.append(kind)
+        data, changed = self.responses[kind]
+        self.responses[kind] = (data, False)  # revalidating again gets a 304
+        return data, changed
+
+
+class FakePipeline:
+    def __init__(self):
+        self.runs = []
+        self.status = 'ran'
+
+    def run(self, targets):
+        self.runs.append(targets)
+        return [StageResult(name, self.status, 0.0, False, None) for name in targets]
+
+
+def test_new_accessions_trigger_only_their_stages(tmp_path):
+    sec, pipeline = FakeSEC(), FakePipeline()
+    watcher = FilingWatcher(state_path=tmp_path / 'watcher.json', index_dir=tmp_path,
+                            facts_path=tmp_path / 'facts.json', fetch=sec, pipeline=pipeline)
+    now = datetime(2025, 8, 1, 12)
+    sec.responses = {'submissions': (submissions(('q1', '10-Q', '2025-05-02')), True),
+                     'facts': (companyfacts('q1'), True)}
+    # The first check records what is already filed; only the never-seen companyfacts triggers a run
+    assert watcher.tick(now) == (['derive_dashboard', 'warehouse', 'publish'], ['companyfacts updated'])
+    assert watcher.state['pending'] == ['derive_dashboard', 'warehouse', 'publish']
+    # Stages a tick asked for stay pending until a run completes them
+    watcher.run_once(now + timedelta(minutes=5))
+    assert pipeline.runs == [['derive_dashboard', 'warehouse', 'publish']] and 'pending' not in watcher.state
+    assert watcher.run_once(now + timedelta(minutes=10)) is None
+    assert sec.requests == ['submissions', 'facts', 'submissions', 'submissions']
+
+    sec.responses['submissions'] = (submissions(('q2', '10-Q', '2025-08-01'), ('q1', '10-Q', '2025-05-02'),
+                                                ('s1', 'S-8', '2025-08-01')), True)
+    later = now + timedelta(minutes=20)
+    pipeline.status = 'failed'
+    watcher.run_once(later)
+    assert pipeline.runs[-1] == ['extract_10q', 'extract_10q_region', 'derive_sales', 'warehouse', 'text_index', 'publish']
+    assert list(watcher.state['awaiting_facts']) == ['q2']
+
+    # The failed run is retried even though the submissions index is now a 304
+    pipeline.status = 'ran'
+    watcher.run_once(later + timedelta(minutes=5))
+    assert pipeline.runs[-1] == ['extract_10q', 'extract_10q_region', 'derive_sales', 'warehouse', 'text_index', 'publish']
+    assert 'pending' not in watcher.state
+
+    # While q2's facts are pending, companyfacts is revalidated on every tick
+    sec.responses['facts'] = (companyfacts('q1', 'q2'), True)
+    watcher.run_once(later + timedelta(minutes=10))
+    assert pipeline.runs[-1] == ['derive_dashboard', 'warehouse', 'publish']
+    assert watcher.state['awaiting_facts'] == {}
+    sec.requests.clear()
+    assert watcher.run_once(later + timedelta(minutes=20)) is None
+    assert sec.requests == ['submissions']
+
+    reloaded = FilingWatcher(state_path=tmp_path / 'watcher.json', index_dir=tmp_path,
+                             facts_path=tmp_path / 'facts.json', fetch=sec, pipeline=pipeline)
+    assert reloaded.state['seen'] == ['q1', 'q2']
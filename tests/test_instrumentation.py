@@ -0,0 +1,55 @@
+import json
+import threading
+
+from instrumentation import Tracer, count, span
+from pipeline import Pipeline, Stage
+
+
+def test_spans_nest_per_thread_and_counters_aggregate(tmp_path):
+    count('bytes_fetched', 10)  # no tracer: ignored
+    with Tracer('run', memory=True) as tracer:
+        with span('fetch', url='u'):
+            count('bytes_fetched', 100, source='companyfacts')
+        with span('extract') as extract:
+            blob = bytearray(2_000_000)
+            count('rows_dropped', 2, rule='quarterly_span')
+            count('rows_dropped', 3, rule='quarterly_span')
+            with span('save'):
+                del blob
+        def derive():
+            with span('derive'):
+                pass
+
+        worker = threading.Thread(target=derive)
+        worker.start()
+        worker.join()
+    assert [child.name for child in tracer.root.children] == ['fetch', 'extract', 'derive']
+    assert [child.name for child in extract.children] == ['save']
+    assert extract.peak - extract.memory_start >= 2_000_000
+    assert tracer.counter_total('rows_dropped') == 5
+
+    trace = json.loads(tracer.write(tmp_path).read_text())
+    assert trace['counters'] == [
+        {'name': 'bytes_fetched', 'labels': {'source': 'companyfacts'}, 'value': 100},
+        {'name': 'rows_dropped', 'labels': {'rule': 'quarterly_span'}, 'value': 5},
+    ]
+    assert trace['spans']['children'][1]['peak_bytes'] >= 2_000_000
+    text = tracer.write_prometheus(tmp_path / 'refresh.prom').read_text()
+    assert 'apple_refresh_rows_dropped{rule="quarterly_span"} 5\n' in text
+    assert '# TYPE apple_refresh_span_seconds gauge' in text
+
+
+def test_pipeline_run_writes_a_trace(tmp_path):
+    def fetch():
+        count('bytes_fetched', 42, source='toy')
+        (tmp_path / 'raw.txt').write_text('raw')
+
+    pipeline = Pipeline([Stage('fetch', (), {'raw': tmp_path / 'raw.txt'}, fetch, always=True)],
+                        tmp_path / 'state.json', prometheus_path=tmp_path / 'refresh.prom')
+    pipeline.run()
+    trace = json.loads(pipeline.last_trace.read_text())
+    assert pipeline.last_trace.parent == tmp_path / 'traces'
+    assert trace['spans']['name'] == 'pipeline'
+    assert [stage['name'] for stage in trace['spans']['children']] == ['fetch']
+    assert {'name': 'stages', 'labels': {'status': 'ran'}, 'value': 1} in trace['counters']
+    assert 'apple_refresh_bytes_fetched{source="toy"} 42' in (tmp_path / 'refresh.prom').read_text()
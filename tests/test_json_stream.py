@@ -0,0 +1,28 @@
+import json
+
+from json_stream import iter_json_items, iter_object_items, peek_json_type
+
+DOC = {
+    'name': 'Apple Inc.',
+    'metrics': {'revenue': {'data': [1, 2.5e3, -4]}, 'empty': {}},
+    'series': [{'year': 2023}, {'year': 2024}],
+    'none': [],
+}
+
+
+def test_iter_json_items_matches_in_memory_walk(tmp_path):
+    path = tmp_path / 'doc.json'
+    path.write_text(json.dumps(DOC, indent=2))
+    expected = list(iter_object_items(DOC, 2))
+    assert expected[:2] == [(('name',), 'Apple Inc.'), (('metrics', 'revenue'), {'data': [1, 2.5e3, -4]})]
+    # Tiny chunks force values and numbers to straddle buffer boundaries
+    for chunk_size in (1, 3, 64, 1 << 16):
+        assert list(iter_json_items(path, 2, chunk_size)) == expected
+
+
+def test_iter_json_items_top_level_list(tmp_path):
+    path = tmp_path / 'filings.json'
+    path.write_text(json.dumps([{'accession': 'a'}, {'accession': 'b'}, 12345]))
+    assert peek_json_type(path) == '['
+    assert list(iter_json_items(path, 1, chunk_size=2)) == [
+        ((0,), {'accession': 'a'}), ((1,), {'accession': 'b'}), ((2,), 12345)]
@@ -0,0 +1,42 @@
+import json
+import logging
+
+from log_setup import ROOT_LOGGER, configure_logging, get_logger
+
+
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return 'expensive'
+
+
+def test_levels_console_and_json_lines_sink(tmp_path, capsys):
+    log = get_logger('extract_10q_summary_tables')
+    path = tmp_path / 'logs' / 'run.jsonl'
+    try:
+        configure_logging('info', path)
+        log.debug('row %s', Expensive())
+        assert Expensive.formatted == 0
+        log.info('parsed %d tables', 2)
+        log.warning('missing %s', 'segment table')
+        logging.getLogger(ROOT_LOGGER).handlers[1].flush()
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [(r['level'], r['logger'], r['message']) for r in records] == [
+            ('INFO', 'extract_10q_summary_tables', 'parsed 2 tables'),
+            ('WARNING', 'extract_10q_summary_tables', 'missing segment table'),
+        ]
+        assert '[WARNING] extract_10q_summary_tables: missing segment table' in capsys.readouterr().err
+
+        configure_logging('DEBUG')
+        log.debug('row %s', Expensive())
+        assert Expensive.formatted == 1
+        assert len(logging.getLogger(ROOT_LOGGER).handlers) == 1
+    finally:
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.setLevel(logging.NOTSET)
+        root.propagate = True
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+
+from output_writer import content_hash, write_if_changed
+
+
+def make_payload(revenue=100, last_updated='2025-05-03T03:00:00'):
+    return {
+        'last_updated': last_updated,
+        'summary_metrics': {'revenue': {'latest_value': np.int64(revenue)}, 'net_income': {'latest_value': 10}},
+        'time_series_data': [{'year': 2024, 'revenue': revenue}],
+    }
+
+
+def test_content_hash_ignores_volatile_fields_and_key_order():
+    a = {'last_updated': 'x', 'b': 1, 'a': [1, 2]}
+    b = {'a': [1, 2], 'b': 1, 'last_updated': 'y'}
+    assert content_hash(a) == content_hash(b)
+    assert content_hash(a) != content_hash({**b, 'b': 2})
+
+
+def test_write_if_changed_skips_timestamp_only_changes(tmp_path):
+    path = tmp_path / 'dashboard.json'
+    summary_path = tmp_path / 'changes.json'
+    first = write_if_changed(path, make_payload(), summary_path)
+    assert first['changed'] and first['previous_hash'] is None
+    written = path.read_text()
+    assert json.loads(written)['summary_metrics']['revenue']['latest_value'] == '100'
+
+    second = write_if_changed(path, make_payload(last_updated='2025-05-04T03:00:00'), summary_path)
+    assert not second['changed']
+    assert path.read_text() == written
+    assert json.loads(summary_path.read_text())['hash'] == first['hash']
+
+    third = write_if_changed(path, make_payload(revenue=101), summary_path)
+    assert third['changed'] and third['previous_hash'] == first['hash']
+    assert third['sections'] == {
+        'summary_metrics': {'added': [], 'removed': [], 'changed': ['revenue']},
+        'time_series_data': {'changed': True},
+    }
+    assert json.loads(summary_path.read_text()) == third
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['changes.json', 'dashboard.json']
+
+
+def test_write_if_changed_creates_missing_summary(tmp_path):
+    path = tmp_path / 'dashboard.json'
+    write_if_changed(path, make_payload())
+    summary_path = tmp_path / 'changes.json'
+    result = write_if_changed(path, make_payload(), summary_path)
+    assert not result['changed']
+    assert json.loads(summary_path.read_text())['hash'] == result['hash']
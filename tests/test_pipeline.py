@@ -0,0 +1,149 @@
+import json
+import threading
+
+import pytest
+
+import pipeline
+from pipeline import (
+    BLOCKED, FAILED, RAN, SKIPPED, Pipeline, PipelineError, Stage, build_fact_warehouse, build_text_index,
+    download_filings, refresh_stages
+)
+from fact_warehouse import FactWarehouse
+from test_fact_warehouse import CONCEPT, make_companyfacts
+from test_text_index import filing_text
+from text_index import TextIndex, split_sections
+
+
+def toy_pipeline(tmp_path, source, calls, fail=()):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def step(name, output, read=None, concurrent=False):
+        def run():
+            calls.append(name)
+            if name in fail:
+                raise RuntimeError(f'{name} broke')
+            if concurrent:
+                # Both branches must be in flight at once to get past the barrier
+                barrier.wait()
+            text = source['value'] if read is None else ''.join((tmp_path / r).read_text() for r in read)
+            (tmp_path / output).write_text(f'{name}:{text}')
+        return run
+
+    stages = [
+        Stage('fetch', (), {'raw': tmp_path / 'raw.txt'}, step('fetch', 'raw.txt'), always=True),
+        Stage('left', ('raw',), {'left': tmp_path / 'left.txt'}, step('left', 'left.txt', ['raw.txt'], True)),
+        Stage('right', ('raw',), {'right': tmp_path / 'right.txt'}, step('right', 'right.txt', ['raw.txt'], True)),
+        Stage('join', ('left', 'right'), {'joined': tmp_path / 'joined.txt'},
+              step('join', 'joined.txt', ['left.txt', 'right.txt'])),
+    ]
+    return Pipeline(stages, tmp_path / 'state.json')
+
+
+def statuses(results):
+    return {result.name: result.status for result in results}
+
+
+def test_unchanged_inputs_skip_stages_and_branches_run_concurrently(tmp_path):
+    source, calls = {'value': 'v1'}, []
+    pipeline = toy_pipeline(tmp_path, source, calls)
+    assert statuses(pipeline.run()) == {'fetch': RAN, 'left': RAN, 'right': RAN, 'join': RAN}
+
+    calls.clear()
+    results = pipeline.run()
+    assert statuses(results) == {'fetch': RAN, 'left': SKIPPED, 'right': SKIPPED, 'join': SKIPPED}
+    assert calls == ['fetch'] and not results[0].changed
+
+    (tmp_path / 'joined.txt').write_text('tampered')
+    assert statuses(pipeline.run())['join'] == RAN
+
+    source['value'] = 'v2'
+    results = pipeline.run()
+    assert all(result.status == RAN and result.changed for result in results)
+    assert (tmp_path / 'joined.txt').read_text() == 'join:left:fetch:v2right:fetch:v2'
+    forced = pipeline.run(['join'], force=['left', 'right'])
+    assert statuses(forced) == {'fetch': RAN, 'left': RAN, 'right': RAN, 'join': SKIPPED}
+    assert statuses(pipeline.run(['right'])) == {'fetch': RAN, 'right': SKIPPED}
+    with pytest.raises(ValueError, match='Unknown stage'):
+        pipeline.run(force=['rigth'])
+    with pytest.raises(ValueError, match='Unknown stage'):
+        pipeline.run(['joined'])
+
+
+def test_failures_block_only_descendants(tmp_path):
+    calls = []
+    pipeline = toy_pipeline(tmp_path, {'value': 'v1'}, calls, fail=('fetch',))
+    assert statuses(pipeline.run()) == {'fetch': FAILED, 'left': BLOCKED, 'right': BLOCKED, 'join': BLOCKED}
+    assert pipeline.downstream(['left']) == {'left', 'join'}
+    with pytest.raises(ValueError, match='cycle'):
+        Pipeline([Stage('a', ('y',), {'x': tmp_path / 'x'}, None), Stage('b', ('x',), {'y': tmp_path / 'y'}, None)])
+    with pytest.raises(ValueError, match='unknown artifact'):
+        Pipeline([Stage('a', ('missing',), {}, None)])
+
+
+def test_failed_downloads_fail_the_stage_so_it_is_retried(tmp_path):
+    filings = [{'accession': f'a{n}', 'date': f'2025-0{n}-01', 'url': f'https://sec.example/{n}.htm'} for n in (1, 2)]
+    (tmp_path / 'filings.json').write_text(json.dumps(filings))
+    broken = {'a2'}
+
+    def load(filing, cache):
+        if filing['accession'] in broken:
+            raise OSError('connection reset')
+        return {'10-Q:revenue': [[filing['accession']]]}
+
+    def stage():
+        return download_filings(tmp_path / 'filings.json', tmp_path / 'manifest.json', [load], tmp_path / 'cache')
+
+    pipeline = Pipeline([Stage('download', (), {'manifest': tmp_path / 'manifest.json'}, stage)],
+                        tmp_path / 'state.json')
+    assert [r.status for r in pipeline.run()] == [FAILED]
+    assert [f['accession'] for f in json.loads((tmp_path / 'manifest.json').read_text())] == ['a1']
+    broken.clear()
+    assert [r.status for r in pipeline.run()] == [RAN]
+    assert [r.status for r in pipeline.run()] == [SKIPPED]
+    with pytest.raises(PipelineError, match='1 of 2'):
+        broken.add('a1')
+        stage()
+
+
+def test_text_index_stage_fetches_each_filing_once(tmp_path, monkeypatch):
+    filings = {'10-K': [{'accession': 'k1', 'date': '2024-11-01', 'url': 'k1.htm'}],
+               '10-Q': [{'accession': f'q{n}', 'date': '2025-01-31', 'url': f'q{n}.htm'} for n in (1, 2)]}
+    for form, listed in filings.items():
+        (tmp_path / f'{form}.json').write_text(json.dumps(listed))
+    paths = {form: tmp_path / f'{form}.json' for form in filings}
+    fetched, broken = [], {'q2.htm'}
+
+    def fetch_sections(url):
+        fetched.append(url)
+        if url in broken:
+            raise OSError('connection reset')
+        # A filing without narrative sections is recorded too
+        return {} if url == 'q1.htm' else split_sections(filing_text())
+
+    monkeypatch.setattr(pipeline, 'fetch_sections', fetch_sections)
+    with pytest.raises(PipelineError, match='1 filing'):
+        build_text_index(paths, tmp_path / 'index')
+    broken.clear()
+    assert build_text_index(paths, tmp_path / 'index') == '1 filings added'
+    assert build_text_index(paths, tmp_path / 'index') == '0 filings added'
+    assert fetched == ['k1.htm', 'q1.htm', 'q2.htm', 'q2.htm']
+    index = TextIndex(tmp_path / 'index')
+    assert index.accessions == {'k1', 'q1', 'q2'} and len(index.docs) == 4
+    index.close()
+
+
+def test_refresh_stages_declare_every_file_they_write(tmp_path):
+    stages = {stage.name: stage for stage in refresh_stages(root=tmp_path)}
+    assert set(stages['derive_dashboard'].outputs) == {'dashboard', 'dashboard_changes'}
+
+
+def test_warehouse_stage_rebuilds_from_companyfacts_and_outputs(tmp_path):
+    [stage] = [stage for stage in refresh_stages(root=tmp_path) if stage.name == 'warehouse']
+    assert set(stage.inputs) == {'companyfacts', 'ten_k_summary', 'ten_q_summary', 'ten_q_region', 'sales_series'}
+    companyfacts = tmp_path / 'companyfacts.json'
+    companyfacts.write_text(json.dumps(make_companyfacts()))
+    db = tmp_path / 'facts.sqlite'
+    assert build_fact_warehouse(companyfacts, db).startswith('4 facts, ')
+    with FactWarehouse(db) as warehouse:
+        assert warehouse.latest(CONCEPT)['end'] == '2024-12-28'
+        assert warehouse.query('SELECT COUNT(*) AS n FROM sales_series')[0]['n'] > 0
@@ -0,0 +1,57 @@
+from data_index import DataIndex
+from question_parser import AnswerEngine, ParsedQuestion, normalize_question, parse_period
+
+TEN_K = [{'accession': 'k1', 'date': '2024-11-01', 'products_and_services': [
+    {'product': 'Services', 'year': 2024, 'net_sales': 96169.0},
+    {'product': 'Services', 'year': 2023, 'net_sales': 85200.0},
+], 'segment_operating': [
+    {'region': 'Greater China', 'year': 2024, 'net_sales': 66952.0},
+]}]
+DASHBOARD = {'raw_metrics': {'net_income': {'metric_name': 'Net Income', 'data': [
+    {'start': '2023-10-01', 'end': '2024-09-28', 'val': 93736000000, 'form': '10-K'},
+]}}}
+
+
+def test_parse_period_forms():
+    assert parse_period('revenue in q2 2025') == 'FY2025-Q2'
+    assert parse_period('2025 q1 sales') == 'FY2025-Q1'
+    assert parse_period('second quarter of fiscal 2024') == 'FY2024-Q2'
+    assert parse_period('first half 2025') == 'FY2025-H1'
+    assert parse_period('profit in fy24') == 'FY2024'
+    assert parse_period('revenue in 2023') == 'FY2023'
+    assert parse_period('latest revenue') is None
+
+
+def test_engine_parses_entities_and_uses_precomputed_answers():
+    engine = AnswerEngine(DataIndex(DASHBOARD, ten_k=TEN_K))
+    parsed = engine.parse(normalize_question('How did Services revenue grow in FY2024?'))
+    assert parsed == ParsedQuestion('growth', ('product', 'services'), 'FY2024')
+    assert engine.answers[parsed] == engine.ask('How did Services revenue grow in FY2024?')
+    assert engine.ask('how did services grow in fy2024') == \
+        'Services net sales grew 12.9% year over year in FY2024, from $85.20B in FY2023 to $96.17B.'
+    assert engine.parse('china sales').subject == ('region', 'greaterchina')
+    assert engine.parse('profit in 2024').subject == ('metric', 'net_income')
+    assert ParsedQuestion('value', ('metric', 'net_income'), 'FY2030') not in engine.answers
+    assert 'Data covers FY2024 to FY2024' in engine.ask('profit in 2030')
+    engine.ask('profit in 2030')
+    assert engine.answer.cache_info().hits == 1
+    assert engine.ask('hello').startswith('I can answer questions about Net Income')
+
+
+class FakeTextIndex:
+    def search(self, query, limit):
+        from text_index import Hit
+        self.query = query
+        return [Hit(0, 1.0, 'k1', '10-K', '2024-11-01', 'risk_factors', None)]
+
+    def snippet(self, hit, query):
+        return '...tariffs could affect the Company...'
+
+
+def test_questions_without_a_subject_search_narrative_text():
+    text_index = FakeTextIndex()
+    engine = AnswerEngine(DataIndex(DASHBOARD, ten_k=TEN_K), text_index=text_index)
+    assert engine.ask('What does Apple say about tariffs?') == \
+        'From the 10-K filed 2024-11-01 (Risk Factors): ...tariffs could affect the Company...'
+    assert text_index.query == 'tariffs'
+    assert engine.ask('profit in 2024').startswith('Net Income for FY2024')
@@ -0,0 +1,48 @@
+from reconcile_xbrl import index_companyfacts, reconcile
+
+CONCEPT = 'RevenueFromContractWithCustomerExcludingAssessedTax'
+
+
+def make_facts(*facts):
+    return {'facts': {'us-gaap': {CONCEPT: {'units': {'USD': list(facts)}}}}}
+
+
+def make_point(member, fiscal_year, fiscal_period, net_sales, derived=False):
+    return {
+        'dimension': 'product', 'member': member, 'period': f'FY{fiscal_year}',
+        'fiscal_year': fiscal_year, 'fiscal_period': fiscal_period,
+        'net_sales': net_sales, 'accession': 'a-1', 'derived': derived,
+    }
+
+
+def test_index_companyfacts_uses_fact_dates_and_latest_filing():
+    facts = make_facts(
+        {'start': '2023-10-01', 'end': '2024-09-28', 'val': 391035000000, 'filed': '2024-11-01', 'accn': 'k24'},
+        {'start': '2023-10-01', 'end': '2024-09-28', 'val': 391000000000, 'filed': '2025-10-31', 'accn': 'k25'},
+        {'start': '2024-09-29', 'end': '2024-12-28', 'val': 124300000000, 'filed': '2025-01-31', 'accn': 'q1'},
+        {'end': '2024-12-28', 'val': 1},
+    )
+    index = index_companyfacts(facts, [CONCEPT])
+    assert index[(2024, 'FY', CONCEPT)]['accn'] == 'k25'
+    assert index[(2025, 'Q1', CONCEPT)]['accn'] == 'q1'
+    assert len(index) == 2
+
+
+def test_reconcile_reports_mismatches_and_unmatched():
+    facts = make_facts(
+        {'start': '2023-10-01', 'end': '2024-09-28', 'val': 391035000000, 'filed': '2024-11-01', 'accn': 'k24'},
+        {'start': '2022-09-25', 'end': '2023-09-30', 'val': 383285000000, 'filed': '2023-11-03', 'accn': 'k23'},
+    )
+    series = [
+        make_point('Total net sales', 2024, 'FY', 391035.0),
+        make_point('Total net sales', 2023, 'FY', 380000.0),
+        make_point('Total net sales', 2022, 'FY', 394328.0),
+        make_point('Total net sales', 2024, 'Q4', 94930.0, derived=True),
+        make_point('iPhone', 2024, 'FY', 201183.0),
+    ]
+    report = reconcile(series, facts)
+    assert report['checked'] == 3
+    assert report['matched'] == 1
+    [mismatch] = report['mismatches']
+    assert mismatch['period'] == 'FY2023' and mismatch['xbrl_accession'] == 'k23'
+    assert [u['period'] for u in report['unmatched']] == ['FY2022']
@@ -0,0 +1,72 @@
+import pytest
+
+pytest.importorskip('bs4')
+pytest.importorskip('lxml')
+
+from bs4 import BeautifulSoup
+
+from pipeline import load_extractor
+
+region = load_extractor('10-Q/extract_10q_region_tables.py')
+
+# Layout of the segment table in Apple's Q2 FY2025 10-Q: '$' and '%' in their own cells
+REGION_TABLE_HTML = """
+<table>
+<tr><td></td><td colspan="6">Three Months Ended</td><td colspan="6">Six Months Ended</td></tr>
+<tr><td></td><td colspan="2">March 29, 2025</td><td colspan="2">March 30, 2024</td><td colspan="2">Change</td>
+    <td colspan="2">March 29, 2025</td><td colspan="2">March 30, 2024</td><td colspan="2">Change</td></tr>
+<tr><td>Americas</td><td>$</td><td>40,315</td><td>$</td><td>37,273</td><td>8</td><td>%</td>
+    <td>$</td><td>92,277</td><td>$</td><td>87,703</td><td>5</td><td>%</td></tr>
+<tr><td>Greater China</td><td>$</td><td>16,002</td><td>$</td><td>16,372</td><td>(2)</td><td>%</td>
+    <td>$</td><td>34,515</td><td>$</td><td>37,191</td><td>(7)</td><td>%</td></tr>
+<tr><td>Total net sales</td><td>$</td><td>95,359</td><td>$</td><td>90,753</td><td>5</td><td>%</td>
+    <td>$</td><td>219,659</td><td>$</td><td>210,328</td><td>4</td><td>%</td></tr>
+</table>
+"""
+
+
+def region_table():
+    return region.extract_table_data(BeautifulSoup(REGION_TABLE_HTML, 'lxml').find('table'))
+
+
+def test_column_map_pairs_change_columns_with_prior_period():
+    period_type_row, date_row, header_row = region_table()[:3]
+    column_map = region.build_region_column_map(header_row, period_type_row, date_row)
+    assert column_map == {
+        1: ('Three Months Ended March 29, 2025', None),
+        2: ('Three Months Ended March 29, 2025', None),
+        3: ('Three Months Ended March 30, 2024', None),
+        4: ('Three Months Ended March 30, 2024', None),
+        5: ('Three Months Ended Change', 'March 30, 2024'),
+        6: ('Three Months Ended Change', 'March 30, 2024'),
+        7: ('Six Months Ended March 29, 2025', None),
+        8: ('Six Months Ended March 29, 2025', None),
+        9: ('Six Months Ended March 30, 2024', None),
+        10: ('Six Months Ended March 30, 2024', None),
+        11: ('Six Months Ended Change', 'March 30, 2024'),
+        12: ('Six Months Ended Change', 'March 30, 2024'),
+    }
+
+
+def test_region_results_merges_filings_into_per_filing_records():
+    table = region_table()
+    filings = [
+        {'url': 'https://example.com/q2.htm', 'date': '2025-05-02', 'accession': '0000320193-25-000057'},
+        {'url': 'https://example.com/q1.htm', 'date': '2025-01-31', 'accession': '0000320193-25-000008'},
+    ]
+    results = region.region_results([(filing, table) for filing in filings])
+    assert [result['accession'] for result in results] == [filing['accession'] for filing in filings]
+    records = results[0]['region_operating']
+    assert results[1]['region_operating'] == records
+    assert len(records) == 18
+    assert records[:3] == [
+        {'type': 'region', 'region': 'Americas', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 40315.0},
+        {'type': 'region', 'region': 'Americas', 'period': 'Three Months Ended March 30, 2024', 'net_sales': 37273.0},
+        {'type': 'region', 'region': 'Americas', 'period': 'Three Months Ended Change March 30, 2024',
+         'percent_change': 8.0},
+    ]
+    by_period = {(r['region'], r['period']): r for r in records}
+    assert by_period['Greater China', 'Six Months Ended Change March 30, 2024']['percent_change'] == -7.0
+    assert by_period['Total net sales', 'Six Months Ended March 29, 2025'] == {
+        'type': 'total', 'region': 'Total net sales', 'period': 'Six Months Ended March 29, 2025', 'net_sales': 219659.0,
+    }
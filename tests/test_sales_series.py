@@ -0,0 +1,61 @@
+from datetime import date
+
+from sales_series import add_derived_q4, build_series, fiscal_period_for, normalize_member, parse_period_label
+
+
+def test_fiscal_calendar():
+    assert fiscal_period_for(date(2024, 12, 28), 3) == (2025, 'Q1')
+    assert fiscal_period_for(date(2023, 1, 1), 3) == (2023, 'Q1')
+    assert fiscal_period_for(date(2025, 3, 29), 6) == (2025, 'H1')
+    assert fiscal_period_for(date(2024, 6, 29), 9) == (2024, '9M')
+    assert fiscal_period_for(date(2024, 9, 28), 3) == (2024, 'Q4')
+
+
+def test_parse_period_label_skips_change_columns():
+    assert parse_period_label('Three Months Ended March 29, 2025') == (2025, 'Q2', '2025-03-29')
+    assert parse_period_label('Three Months Ended Change March 30, 2024') is None
+
+
+def test_normalize_member():
+    assert normalize_member('iPhone ®') == 'iPhone'
+    assert normalize_member('Wearables, Home and Accessories (1)(2)') == 'Wearables, Home and Accessories'
+    assert normalize_member('Americas:') == 'Americas'
+    assert normalize_member('Portion of total net sales that was included in deferred revenue as of the '
+                            'beginning of the period') is None
+
+
+def test_build_series_prefers_latest_filing():
+    older = {'accession': 'a1', 'date': '2024-05-03', 'products_and_services': [
+        {'product': 'iPhone ®', 'period': 'Three Months Ended March 30, 2024', 'net_sales': 45900.0},
+    ]}
+    newer = {'accession': 'a2', 'date': '2025-05-02', 'products_and_services': [
+        {'product': 'iPhone', 'period': 'Three Months Ended March 30, 2024', 'net_sales': 45963.0},
+        {'product': 'iPhone', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 46841.0},
+    ]}
+    annual = {'accession': 'k1', 'date': '2024-11-01', 'segment_operating': [
+        {'type': 'region', 'region': 'Japan', 'year': 2024, 'net_sales': 25052.0, 'percent_change': 3.0},
+    ]}
+    series = build_series([annual], [newer, older])
+    assert [(r['dimension'], r['member'], r['period'], r['net_sales']) for r in series] == [
+        ('product', 'iPhone', 'FY2024-Q2', 45963.0),
+        ('product', 'iPhone', 'FY2025-Q2', 46841.0),
+        ('region', 'Japan', 'FY2024', 25052.0),
+    ]
+    assert series[-1]['percent_change'] == 3.0
+
+
+def test_add_derived_q4_subtracts_three_quarters_from_annual():
+    def point(period, fiscal_period, value, member='iPhone'):
+        return {'dimension': 'product', 'member': member, 'period': period, 'fiscal_year': 2024,
+                'fiscal_period': fiscal_period, 'end': None, 'net_sales': value, 'percent_change': None,
+                'form': '10-K' if fiscal_period == 'FY' else '10-Q', 'accession': 'k', 'filed': '2024-11-01',
+                'derived': False}
+    series = add_derived_q4([
+        point('FY2024-Q1', 'Q1', 69702.0), point('FY2024-Q2', 'Q2', 45963.0),
+        point('FY2024-Q3', 'Q3', 39296.0), point('FY2024', 'FY', 201183.0),
+        # Only two quarters for Mac: no Q4 can be derived
+        point('FY2024-Q1', 'Q1', 7780.0, 'Mac'), point('FY2024', 'FY', 29984.0, 'Mac'),
+    ])
+    derived = [p for p in series if p['derived']]
+    assert len(derived) == 1
+    assert (derived[0]['member'], derived[0]['period'], derived[0]['net_sales']) == ('iPhone', 'FY2024-Q4', 46222.0)
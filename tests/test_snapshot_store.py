@@ -0,0 +1,68 @@
+import copy
+from datetime import date, timedelta
+
+import pytest
+
+from snapshot_store import SnapshotStore
+
+
+def make_payload(day, values):
+    return {
+        'company_name': 'Apple Inc.',
+        'last_updated': f'2025-07-{day:02d}T03:00:00',
+        'summary_metrics': {'revenue': {'latest_value': str(values[-1])}},
+        'raw_metrics': {
+            'revenue': {
+                'metric_name': 'Total Revenue',
+                'data': [
+                    {'start': str(date(2020, 1, 1) + timedelta(days=91 * i)),
+                     'end': str(date(2020, 3, 28) + timedelta(days=91 * i)), 'val': val, 'fy': 2020, 'form': '10-Q'}
+                    for i, val in enumerate(values)
+                ],
+                'annual_data': [],
+                'quarterly_data': [{'end': '2024-09-28', 'val': 7, 'fy': 2024, 'form': '10-K'}],
+            },
+        },
+    }
+
+
+def test_record_reconstruct_and_diff(tmp_path):
+    store = SnapshotStore(tmp_path, checkpoint_every=3)
+    payloads = [make_payload(1, [10]), make_payload(2, [10, 20]), make_payload(3, [11, 20]),
+                make_payload(4, [11, 20, 30]), make_payload(5, [11, 30])]
+    entries = [store.record(payload) for payload in payloads]
+    assert [entry['kind'] for entry in entries] == ['checkpoint', 'delta', 'delta', 'checkpoint', 'delta']
+    assert (entries[1]['added'], entries[1]['changed'], entries[1]['removed']) == (1, 1, 0)
+
+    assert store.record(dict(payloads[-1], last_updated='2025-07-06T03:00:00')) is None
+    for payload in payloads:
+        assert store.reconstruct(payload['last_updated']) == payload
+    assert store.reconstruct('2025-07-03') == payloads[2]
+    with pytest.raises(LookupError):
+        store.reconstruct('2025-06-30')
+
+    diff = store.diff('2025-07-01', '2025-07-05')
+    assert (diff['from'], diff['to']) == ('20250701T030000', '20250705T030000')
+    assert [key[3:] for key in diff['added']] == [['2020-04-01', '2020-06-27', '10-Q']]
+    assert {tuple(c['key'][:2]) for c in diff['changed']} == {('fact', 'revenue'), ('section', 'summary_metrics')}
+
+
+def test_deltas_only_store_changed_entries(tmp_path):
+    store = SnapshotStore(tmp_path)
+    base = make_payload(1, list(range(100)))
+    store.record(base)
+    changed = copy.deepcopy(base)
+    changed['last_updated'] = '2025-07-02T03:00:00'
+    changed['raw_metrics']['revenue']['data'][5]['val'] = -1
+    entry = store.record(changed)
+    assert (entry['kind'], entry['added'], entry['changed'], entry['removed']) == ('delta', 0, 1, 0)
+    assert (tmp_path / entry['file']).stat().st_size < (tmp_path / store.snapshots()[0]['file']).stat().st_size / 4
+    assert store.reconstruct('2025-07-02') == changed
+
+
+def test_snapshots_within_one_second_get_unique_ids(tmp_path):
+    store = SnapshotStore(tmp_path)
+    ids = [store.record(make_payload(1, [1, i]), taken_at=f'2025-07-01T03:00:00.{i:06d}')['id'] for i in (1, 2, 3)]
+    assert ids == ['20250701T030000', '20250701T030000-2', '20250701T030000-3']
+    assert len(list(tmp_path.glob('*.json.gz'))) == 3
+    assert store.reconstruct('2025-07-01T03:00:00.000002')['raw_metrics']['revenue']['data'][1]['val'] == 2
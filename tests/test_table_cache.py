@@ -0,0 +1,31 @@
+import gzip
+import json
+
+from table_cache import CACHE_VERSION, TableCache, accession_from_url
+
+
+def test_accession_from_url():
+    url = 'https://www.sec.gov/Archives/edgar/data/320193/000032019324000123/aapl-20240928.htm'
+    assert accession_from_url(url) == '0000320193-24-000123'
+    assert accession_from_url('https://example.com/x.htm') is None
+
+
+def test_put_merges_specs_and_round_trips(tmp_path):
+    cache = TableCache(tmp_path)
+    cache.put_tables('0000320193-25-000057', {'10-Q:revenue': [['', '2025'], ['Mac', '7,949']]},
+                     form='10-Q', date='2025-05-02')
+    cache.put_tables('0000320193-25-000057', {'10-Q:region_segment': None}, form='10-Q')
+
+    assert cache.get_tables('0000320193-25-000057', ['10-Q:revenue', '10-Q:segment']) is None
+    tables = cache.get_tables('0000320193-25-000057', ['10-Q:revenue', '10-Q:region_segment'])
+    assert tables == {'10-Q:revenue': [['', '2025'], ['Mac', '7,949']], '10-Q:region_segment': None}
+    assert [e['date'] for e in cache.entries(form='10-Q')] == ['2025-05-02']
+    assert list(cache.entries(form='10-K')) == []
+
+
+def test_stale_version_is_ignored(tmp_path):
+    cache = TableCache(tmp_path)
+    with gzip.open(cache.path_for('a'), 'wt') as f:
+        json.dump({'version': CACHE_VERSION + 1, 'accession': 'a', 'tables': {'x': []}}, f)
+    assert cache.load('a') is None
+    assert cache.get_tables('a', ['x']) is None
@@ -0,0 +1,66 @@
+import pytest
+
+from text_index import TextIndex, filing_sections, index_filings, split_sections
+
+FILLER = ' '.join(['net sales increased due to higher services revenue'] * 40)
+
+
+def filing_text(risk_extra=''):
+    return ('Item 1A. Risk Factors 5\n'
+            'Item 7. Management’s Discussion and Analysis of Financial Condition 20\n'
+            'Item 1. Business\nThe Company designs smartphones.\n'
+            f'Item 1A. Risk Factors\n{FILLER} {risk_extra}\n'
+            'Item 1B. Unresolved Staff Comments\nNone.\n'
+            "Item 7. Management's Discussion and Analysis of Financial Condition and Results of Operations\n"
+            f'{FILLER}\nItem 7A. Quantitative and Qualitative Disclosures About Market Risk\n')
+
+
+def test_split_sections_skips_table_of_contents():
+    sections = split_sections(filing_text('tariffs and trade restrictions'))
+    assert set(sections) == {'risk_factors', 'mda'}
+    assert sections['risk_factors'].endswith('tariffs and trade restrictions')
+    assert 'Unresolved' not in sections['risk_factors'] and 'Quantitative' not in sections['mda']
+
+
+def test_incremental_segments_phrase_search_and_compaction(tmp_path):
+    texts = {'k1': filing_text('tariffs and trade restrictions'), 'q1': filing_text('trade tariffs on imports'),
+             'q2': filing_text()}
+    fetch = lambda url: split_sections(texts[url])
+    assert index_filings([{'url': 'k1', 'accession': 'k1', 'date': '2024-11-01'}], '10-K', tmp_path, fetch) == 1
+    filings = [{'url': u, 'accession': u, 'date': '2025-01-31'} for u in ('k1', 'q1', 'q2')]
+    assert index_filings(filings, '10-Q', tmp_path, fetch) == 2
+
+    index = TextIndex(tmp_path)
+    assert len(index.segments) == 2 and len(index.docs) == 6
+    assert [(h.accession, h.section) for h in index.search('"trade restrictions"')] == [('k1', 'risk_factors')]
+    ranked = index.search('tariffs trade')
+    assert {h.accession for h in ranked} == {'k1', 'q1'}
+    assert 'tariffs' in index.snippet(ranked[0], 'tariffs trade')
+    index.compact()
+    assert len(index.segments) == 1 and len(list(tmp_path.glob('*.postings'))) == 1
+    assert index.search('tariffs trade') == ranked
+    index.close()
+
+
+def test_headings_split_across_inline_elements():
+    pytest.importorskip('bs4')
+    pytest.importorskip('lxml')
+    html = ('<html><body><div><span>Item 1A.</span><span>Risk Factors</span></div>'
+            f'<div><span>The Company</span><span>faces</span> {FILLER}</div>'
+            '<table><tr><td>Item 7. Not a heading</td></tr></table>'
+            '<p><b>Item 1B.</b> Unresolved Staff Comments</p><p>None.</p></body></html>')
+    sections = filing_sections(html)
+    assert set(sections) == {'risk_factors'}
+    assert sections['risk_factors'].startswith('The Company faces net sales')
+
+
+def test_prefetched_sections_are_not_fetched_again(tmp_path):
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return split_sections(filing_text())
+
+    filings = [{'url': u, 'accession': u} for u in ('q1', 'q2')]
+    assert index_filings(filings, '10-Q', tmp_path, fetch, prefetched={'q1': split_sections(filing_text())}) == 2
+    assert fetched == ['q2']
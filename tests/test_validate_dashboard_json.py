@@ -0,0 +1,94 @@
+import json
+
+from validate_dashboard_json import Rule, validate, validate_files, validate_filings, validate_path
+
+
+def make_dashboard():
+    quarters = [
+        {'start': f'2023-{m:02d}-01', 'end': f'2023-{m + 2:02d}-28', 'val': 10, 'fy': 2023, 'form': '10-Q'}
+        for m in (1, 4, 7, 10)
+    ]
+    return {
+        'summary_metrics': {'revenue': {'latest_value': 40, 'latest_year': 2023, 'latest_period': '2023-12-28'}},
+        'quarterly_metrics': {},
+        'time_series_data': [{'year': 2021}, {'year': 2023}],
+        'raw_metrics': {'revenue': {
+            'data': [
+                {'start': '2021-01-01', 'end': '2021-12-31', 'val': 40, 'fy': 2021},
+                {'start': '2022-01-01', 'end': '2022-12-31', 'val': 40, 'fy': 2022},
+            ],
+            'annual_data': [{'start': '2023-01-01', 'end': '2023-12-28', 'val': 41, 'fy': 2023}],
+            'quarterly_data': quarters,
+            'growth_rates': [{'growth_rate': 0.0}],
+        }},
+    }
+
+
+def test_validate_reports_structured_issues():
+    data = make_dashboard()
+    data['raw_metrics']['revenue']['data'].append({'start': None, 'end': '2022-12-31', 'val': -1, 'fy': 2022.0})
+    issues = validate(data)
+    by_rule = {}
+    for issue in issues:
+        by_rule.setdefault(issue.rule, []).append(issue)
+    assert by_rule['time_series_years'][0].message == 'Missing years in time_series_data: [2022]'
+    assert by_rule['time_series_years'][0].severity == 'warning'
+    assert [i.path for i in by_rule['raw_entry']] == ['raw_metrics.revenue.data[2]'] * 3
+    assert by_rule['annual_quarterly'][0].message == (
+        'Inconsistent annual/quarterly data in revenue for year 2023: '
+        'sum of quarters (40.0) != annual value (41.0)')
+    assert by_rule['year_type'][0].path == 'raw_metrics.revenue.data[2]'
+
+
+def test_rules_are_pluggable():
+    class BigValueRule(Rule):
+        name = 'big_value'
+
+        def raw_entry(self, metric, kind, entry, path):
+            if entry['val'] > 20:
+                yield path, f"{metric} too big"
+
+    issues = validate(make_dashboard(), rules=[BigValueRule()])
+    assert [(i.rule, i.path) for i in issues] == [
+        ('big_value', 'raw_metrics.revenue.data[0]'),
+        ('big_value', 'raw_metrics.revenue.data[1]'),
+        ('big_value', 'raw_metrics.revenue.annual_data[0]'),
+    ]
+
+
+def test_validate_committed_dashboard():
+    with open('./apple_sec_dashboard_data.json') as f:
+        issues = validate(json.load(f))
+    assert all(issue.rule == 'annual_quarterly' for issue in issues)
+
+
+def test_validate_path_streams_dashboard_and_filings(tmp_path):
+    dashboard = make_dashboard()
+    dashboard_path = tmp_path / 'dashboard.json'
+    dashboard_path.write_text(json.dumps(dashboard, indent=2))
+    assert validate_path(dashboard_path) == validate(dashboard)
+
+    filings = [
+        {'url': 'u1', 'date': '2025-05-02', 'accession': 'a1', 'region_operating': [
+            {'region': 'Americas', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 40315.0},
+            {'region': 'Americas', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 40315.0},
+            {'region': 'Europe', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 1.0},
+            {'region': 'Europe', 'period': 'Three Months Ended March 29, 2025', 'net_sales': 2.0},
+            {'region': 'Japan', 'period': 'Three Months Ended Change March 30, 2024', 'net_sales': None},
+            {'region': 'Japan', 'period': 'Sometime', 'net_sales': -1.0},
+        ]},
+        {'url': 'u2', 'date': '2025-05-02', 'accession': 'a1'},
+    ]
+    filings_path = tmp_path / 'filings.json'
+    filings_path.write_text(json.dumps(filings))
+    results = validate_files([dashboard_path, filings_path], max_workers=2)
+    assert results[str(dashboard_path)] == validate(dashboard)
+    issues = results[str(filings_path)]
+    assert [i.message for i in issues] == [i.message for i in validate_filings(filings)]
+    assert [(i.rule, i.severity, i.path) for i in issues] == [
+        ('filing_metadata', 'error', 'filings.json[1]'),
+        ('filing_row', 'error', 'filings.json[0].region_operating[5]'),
+        ('filing_row', 'error', 'filings.json[0].region_operating[5]'),
+        ('duplicate_row', 'warning', 'filings.json[0].region_operating[1]'),
+        ('duplicate_row', 'error', 'filings.json[0].region_operating[3]'),
+    ]